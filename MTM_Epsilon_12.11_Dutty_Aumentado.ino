@@ -75,6 +75,18 @@ float T_des = 5.0; // Tiempo de desaceleración en segundos
 int dir_disco = HIGH; // Dirección por defecto
 int dir_bola = HIGH;
 
+// Formato de la telemetría: texto (por defecto) o tramas binarias (SET MODO=BIN)
+// Trama binaria, little-endian, 52 bytes:
+// [0xAA 0x55][secuencia uint32][millis uint32][10 x float32][CRC16-CCITT uint16]
+// Los floats van en el mismo orden que la línea de texto (Tiempo ... T_pulse_B) y el CRC
+// (polinomio 0x1021, valor inicial 0) cubre la secuencia, millis y los floats.
+// En texto la secuencia y millis van al final de la línea: "... | Seq: 12 | Millis: 3456 ms".
+// La secuencia cuenta las muestras enviadas (en ambos modos) y vuelve a 0 con SET MODO: la PC
+// la usa para detectar muestras perdidas y millis() para alinear el reloj del equipo con el suyo.
+#define TRAMA_TAM          52
+bool modo_binario = false;
+uint32_t secuencia_trama = 0;
+
 // Objeto para la celda de carga
 HX711 scale;
 
@@ -161,6 +173,53 @@ void configurarLEDC() {
     ledc_channel_config(&ledc_channel_bola);
 }
 
+uint16_t crc16_ccitt(const uint8_t *datos, size_t n) {
+    uint16_t crc = 0;
+    for (size_t i = 0; i < n; i++) {
+        crc ^= (uint16_t)datos[i] << 8;
+        for (int b = 0; b < 8; b++) {
+            crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+        }
+    }
+    return crc;
+}
+
+// Envía una muestra en el formato activo. En velocidad constante T_pulse_D/T_pulse_B van como NAN
+// (en texto se omiten, como antes)
+void enviarTelemetria(float f_pulsos_D, float duty_D_pct, float v_D, float f_pulsos_B, float duty_B_pct,
+                      float v_B, float peso, float T_pulse_D_us, float T_pulse_B_us) {
+    uint32_t secuencia = secuencia_trama++;
+    uint32_t instante = millis();
+    if (modo_binario) {
+        float valores[10] = {t_global, f_pulsos_D, duty_D_pct, v_D, f_pulsos_B, duty_B_pct, v_B, peso, T_pulse_D_us, T_pulse_B_us};
+        uint8_t trama[TRAMA_TAM];
+        trama[0] = 0xAA;
+        trama[1] = 0x55;
+        memcpy(trama + 2, &secuencia, 4);  // El ESP32 es little-endian
+        memcpy(trama + 6, &instante, 4);
+        memcpy(trama + 10, valores, sizeof(valores));
+        uint16_t crc = crc16_ccitt(trama + 2, TRAMA_TAM - 4);
+        trama[TRAMA_TAM - 2] = crc & 0xFF;
+        trama[TRAMA_TAM - 1] = crc >> 8;
+        Serial.write(trama, TRAMA_TAM);
+        return;
+    }
+    Serial.print("Tiempo: "); Serial.print(t_global, 2); Serial.print(" s");
+    Serial.print(" | Freq Disco: "); Serial.print(f_pulsos_D, 2); Serial.print(" Hz");
+    Serial.print(" | Duty Disco: "); Serial.print(duty_D_pct, 2); Serial.print("%");
+    Serial.print(" | Velocidad Disco: "); Serial.print(v_D, 2); Serial.print(" m/s");
+    Serial.print(" | Freq Bola: "); Serial.print(f_pulsos_B, 2); Serial.print(" Hz");
+    Serial.print(" | Duty Bola: "); Serial.print(duty_B_pct, 2); Serial.print("%");
+    Serial.print(" | Velocidad Bola: "); Serial.print(v_B, 2); Serial.print(" m/s");
+    Serial.print(" | Torque: "); Serial.print(peso, 2); Serial.print(" kg");
+    if (!isnan(T_pulse_D_us)) {
+        Serial.print(" | T_pulse_D: "); Serial.print(T_pulse_D_us, 2); Serial.print(" us");
+        Serial.print(" | T_pulse_B: "); Serial.print(T_pulse_B_us, 2); Serial.print(" us");
+    }
+    Serial.print(" | Seq: "); Serial.print(secuencia);
+    Serial.print(" | Millis: "); Serial.print(instante); Serial.println(" ms");
+}
+
 void actualizarFrecuencias() {
     // Incrementar el tiempo
     t_global += dt;
@@ -218,19 +277,11 @@ void actualizarFrecuencias() {
     float T_pulse_D_us = T_pulse_D * 1e6;
     float T_pulse_B_us = T_pulse_B * 1e6;
 
-    // Mostrar información cada medio segundo
-    if ((millis() - tiempo_serial) >= 500) {
+    // Mostrar información cada medio segundo (en modo binario, en cada paso de control)
+    if (modo_binario || (millis() - tiempo_serial) >= 500) {
         tiempo_serial = millis();
-        Serial.print("Tiempo: "); Serial.print(t_global, 2); Serial.print(" s");
-        Serial.print(" | Freq Disco: "); Serial.print(f_pulsos_D, 2); Serial.print(" Hz");
-        Serial.print(" | Duty Disco: "); Serial.print(((float)duty_D / duty_max) * 100, 2); Serial.print("%");
-        Serial.print(" | Velocidad Disco: "); Serial.print(v_D, 2); Serial.print(" m/s");
-        Serial.print(" | Freq Bola: "); Serial.print(f_pulsos_B, 2); Serial.print(" Hz");
-        Serial.print(" | Duty Bola: "); Serial.print(((float)duty_B / duty_max) * 100, 2); Serial.print("%");
-        Serial.print(" | Velocidad Bola: "); Serial.print(v_B, 2); Serial.print(" m/s");
-        Serial.print(" | Torque: "); Serial.print(peso, 2); Serial.print(" kg");
-        Serial.print(" | T_pulse_D: "); Serial.print(T_pulse_D_us, 2); Serial.print(" us");
-        Serial.print(" | T_pulse_B: "); Serial.print(T_pulse_B_us, 2); Serial.println(" us");
+        enviarTelemetria(f_pulsos_D, ((float)duty_D / duty_max) * 100, v_D, f_pulsos_B, ((float)duty_B / duty_max) * 100,
+                         v_B, peso, T_pulse_D_us, T_pulse_B_us);
     }
 }
 
@@ -299,19 +350,11 @@ void actualizarFrecuenciasDesaceleracion() {
     float T_pulse_D_us = T_pulse_D * 1e6;
     float T_pulse_B_us = T_pulse_B * 1e6;
 
-    // Mostrar información cada medio segundo
-    if ((millis() - tiempo_serial) >= 500) {
+    // Mostrar información cada medio segundo (en modo binario, en cada paso de control)
+    if (modo_binario || (millis() - tiempo_serial) >= 500) {
         tiempo_serial = millis();
-        Serial.print("Tiempo: "); Serial.print(t_global, 2); Serial.print(" s");
-        Serial.print(" | Freq Disco: "); Serial.print(f_pulsos_D, 2); Serial.print(" Hz");
-        Serial.print(" | Duty Disco: "); Serial.print(((float)duty_D / duty_max) * 100, 2); Serial.print("%");
-        Serial.print(" | Velocidad Disco: "); Serial.print(v_D, 2); Serial.print(" m/s");
-        Serial.print(" | Freq Bola: "); Serial.print(f_pulsos_B, 2); Serial.print(" Hz");
-        Serial.print(" | Duty Bola: "); Serial.print(((float)duty_B / duty_max) * 100, 2); Serial.print("%");
-        Serial.print(" | Velocidad Bola: "); Serial.print(v_B, 2); Serial.print(" m/s");
-        Serial.print(" | Torque: "); Serial.print(peso, 2); Serial.print(" kg");
-        Serial.print(" | T_pulse_D: "); Serial.print(T_pulse_D_us, 2); Serial.print(" us");
-        Serial.print(" | T_pulse_B: "); Serial.print(T_pulse_B_us, 2); Serial.println(" us");
+        enviarTelemetria(f_pulsos_D, ((float)duty_D / duty_max) * 100, v_D, f_pulsos_B, ((float)duty_B / duty_max) * 100,
+                         v_B, peso, T_pulse_D_us, T_pulse_B_us);
     }
 }
 
@@ -357,18 +400,11 @@ void mantenerVelocidadConstante() {
     float v_D = omega_D_temp * (R / 100.0);
     float v_B = omega_B_temp * (r / 100.0);
 
-    // Mostrar información cada medio segundo
-    if ((millis() - tiempo_serial) >= 500) {
+    // Mostrar información cada medio segundo (en modo binario, en cada paso de control)
+    if (modo_binario || (millis() - tiempo_serial) >= 500) {
         tiempo_serial = millis();
-        Serial.print("Tiempo: "); Serial.print(t_global, 2); Serial.print(" s");
-        Serial.print(" | Freq Disco: "); Serial.print(f_pulsos_D, 2); Serial.print(" Hz");
-        Serial.print(" | Duty Disco: "); Serial.print(((float)duty_D / duty_max) * 100, 2); Serial.print("%");
-        Serial.print(" | Velocidad Disco: "); Serial.print(v_D, 2); Serial.print(" m/s");
-        Serial.print(" | Freq Bola: "); Serial.print(f_pulsos_B, 2); Serial.print(" Hz");
-        Serial.print(" | Duty Bola: "); Serial.print(((float)duty_B / duty_max) * 100, 2); Serial.print("%");
-        Serial.print(" | Velocidad Bola: "); Serial.print(v_B, 2); Serial.print(" m/s");
-        Serial.print(" | Torque: "); Serial.print(peso, 2); Serial.print(" kg");
-        Serial.println();
+        enviarTelemetria(f_pulsos_D, ((float)duty_D / duty_max) * 100, v_D, f_pulsos_B, ((float)duty_B / duty_max) * 100,
+                         v_B, peso, NAN, NAN);
     }
 }
 
@@ -381,6 +417,7 @@ void setup() {
     Serial.println("Interfaz serial inicializada.");
     Serial.println("Ingrese comandos. Ejemplo:");
     Serial.println("SET PARAM=valor");
+    Serial.println("SET MODO=BIN | SET MODO=ASCII");
     Serial.println("START");
     Serial.println("STOP");
     Serial.println("STATUS");
@@ -453,6 +490,12 @@ void loop() {
             tiempo_anterior = tiempo_actual;
             mantenerVelocidadConstante();
         }
+    } else if ((tiempo_actual - tiempo_serial) >= 500) {
+        // Motores detenidos: telemetría de reposo cada medio segundo (en ambos modos), para que
+        // la interfaz mida la tara y la deriva de la celda de carga entre ensayos
+        tiempo_serial = tiempo_actual;
+        float peso = scale.get_units(5);
+        enviarTelemetria(0, 0, 0.0, 0, 0, 0.0, peso, NAN, NAN);
     }
 }
 
@@ -461,6 +504,7 @@ void procesarComando(char *comando) {
         // Procesar comandos SET
         // Ejemplo: SET R=5.4
         char *token = strtok(comando, " =");
+        token = strtok(NULL, " =");  // El primer token es "SET": los pares empiezan en el segundo
         while (token != NULL) {
             if (strcmp(token, "R") == 0) {
                 token = strtok(NULL, " =");
@@ -522,6 +566,18 @@ void procesarComando(char *comando) {
                     digitalWrite(GPIO_BOLA_DIR, dir_bola);
                     Serial.print("DIR_BOLA actualizado a: "); Serial.println(dir_bola == HIGH ? "HIGH" : "LOW");
                 }
+            } else if (strcmp(token, "MODO") == 0) {
+                token = strtok(NULL, " =");
+                if (token != NULL) {
+                    // BIN: tramas binarias; cualquier otro valor (ASCII) vuelve a las líneas de texto
+                    modo_binario = (strncmp(token, "BIN", 3) == 0);
+                    secuencia_trama = 0;
+                    Serial.print("MODO actualizado a: "); Serial.println(modo_binario ? "BIN" : "ASCII");
+                }
+            } else {
+                // Nombre desconocido: se avisa (la interfaz lo toma como rechazo) y se saltea su valor
+                Serial.print("Parametro desconocido: "); Serial.println(token);
+                token = strtok(NULL, " =");
             }
             token = strtok(NULL, " =");
         }
@@ -576,6 +632,7 @@ void procesarComando(char *comando) {
         Serial.print("T: "); Serial.println(T);
         Serial.print("DIR_DISCO: "); Serial.println(dir_disco == HIGH ? "HIGH" : "LOW");
         Serial.print("DIR_BOLA: "); Serial.println(dir_bola == HIGH ? "HIGH" : "LOW");
+        Serial.print("MODO: "); Serial.println(modo_binario ? "BIN" : "ASCII");
         Serial.println("=====================");
     } else {
         Serial.print("Comando desconocido: ");
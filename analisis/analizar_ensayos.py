@@ -0,0 +1,214 @@
+"""Análisis por lotes de los ensayos guardados (CSV de "Guardar Datos" y sesiones .mtm).
+
+Recorre un directorio (con subcarpetas), reparte los ensayos entre varios procesos y
+arma una sola tabla de resultados en CSV, en formato largo (columna `tipo`):
+  ensayo     una fila por ensayo: μ estacionario (mediana de μ en los escalones de
+             velocidad constante, sin el primer --descartar de cada escalón) y las
+             estadísticas del torque de todo el ensayo;
+  escalon    una fila por tramo consecutivo de velocidad constante (al menos
+             --min-muestras): velocidad de arrastre U, SRR, μ y estadísticas del torque;
+             en las sesiones de una secuencia automática también corta en cada cambio
+             de la columna 'Paso' y guarda el paso de la receta en `paso`;
+  stribeck   un punto de la curva de Stribeck (μ frente a U) por nivel de velocidad,
+             agrupando todas las muestras del ensayo con el disco en movimiento.
+Las velocidades se agrupan en niveles de --tolerancia m/s. μ = Torque / Peso: el peso
+sale del encabezado de la sesión .mtm o de --peso (los CSV no lo guardan).
+
+Cada ensayo se identifica por el hash de su contenido y de las opciones del análisis;
+el resultado queda en --cache y al volver a correr sobre el mismo directorio sólo se
+procesan los archivos nuevos o modificados.
+
+    python analisis/analizar_ensayos.py sesiones --peso 2.5
+    python analisis/analizar_ensayos.py datos --procesos 8 --salida resultados.csv --tolerancia 0.05
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.magnitudes import coeficiente_friccion, relacion_deslizamiento, velocidad_arrastre
+from utilidades.sesion_binaria import EXTENSION_SESION, SesionBinaria
+
+EXTENSIONES = ('.csv', EXTENSION_SESION)
+CARPETA_CACHE = '.cache_analisis'
+VERSION_ANALISIS = 2  # Cambiarla invalida la cache cuando cambia el cálculo
+COLUMNAS_RESULTADOS = ('archivo', 'tipo', 'indice', 'paso', 'inicio', 'fin', 'muestras', 'peso', 'U', 'SRR', 'mu',
+                       'mu_std', 'torque_media', 'torque_std', 'torque_min', 'torque_max', 'torque_p05', 'torque_p95')
+
+
+def hash_archivo(ruta, opciones, bloque=1 << 20):
+    resumen = hashlib.sha256(json.dumps([VERSION_ANALISIS, opciones], sort_keys=True).encode())
+    with open(ruta, 'rb') as archivo:
+        for trozo in iter(lambda: archivo.read(bloque), b''):
+            resumen.update(trozo)
+    return resumen.hexdigest()
+
+
+def leer_ensayo(ruta, peso):
+    # Columnas del ensayo como arrays y el peso aplicado (NaN si no se conoce)
+    if ruta.endswith(EXTENSION_SESION):
+        sesion = SesionBinaria(ruta)
+        columnas = {nombre: np.asarray(valores, dtype=np.float64) for nombre, valores in sesion.como_dict().items()}
+        peso_sesion = sesion.parametros.get('peso', np.nan)
+        if peso_sesion == peso_sesion and peso_sesion > 0:
+            peso = peso_sesion
+    else:
+        tabla = pd.read_csv(ruta)
+        columnas = {nombre: tabla[nombre].to_numpy(dtype=np.float64) for nombre in tabla.columns}
+    if 'Torque' not in columnas:
+        raise ValueError("el archivo no tiene la columna Torque")
+    return columnas, (peso if peso else np.nan)
+
+
+def estadisticas_torque(torque):
+    if not len(torque):
+        return dict.fromkeys(('torque_media', 'torque_std', 'torque_min', 'torque_max', 'torque_p05', 'torque_p95'), np.nan)
+    p05, p95 = np.nanpercentile(torque, [5, 95])
+    return {'torque_media': np.nanmean(torque), 'torque_std': np.nanstd(torque), 'torque_min': np.nanmin(torque),
+            'torque_max': np.nanmax(torque), 'torque_p05': p05, 'torque_p95': p95}
+
+
+def analizar(columnas, peso, tolerancia, min_muestras, descartar):
+    # Filas de resultados (dicts) de un ensayo: escalones, puntos de Stribeck y el resumen
+    torque = columnas['Torque']
+    n = len(torque)
+    mu = coeficiente_friccion(torque, peso) if peso == peso else np.full(n, np.nan)
+    filas = []
+    resumen = {'tipo': 'ensayo', 'indice': 0, 'inicio': 0, 'fin': n, 'muestras': n, 'peso': peso, 'mu_std': np.nan,
+               **estadisticas_torque(torque)}
+    if 'Velocidad Disco' not in columnas or 'Velocidad Bola' not in columnas or not n:
+        # Sin velocidades (p. ej. interfazESP32REAL.PY) sólo se resume el torque
+        resumen.update({'U': np.nan, 'SRR': np.nan, 'mu': np.nanmedian(mu) if n else np.nan})
+        return [resumen]
+
+    v_d, v_b = columnas['Velocidad Disco'], columnas['Velocidad Bola']
+    arrastre = velocidad_arrastre(v_d, v_b)
+    srr = relacion_deslizamiento(v_d, v_b)
+    nivel = np.round(np.nan_to_num(v_d) / tolerancia).astype(np.int64) * (1 << 32) + np.round(np.nan_to_num(v_b) / tolerancia).astype(np.int64)
+
+    # Escalones: tramos consecutivos del mismo nivel de velocidad, con el disco en movimiento
+    paso = np.asarray(columnas['Paso'], dtype=np.float64) if 'Paso' in columnas else np.full(n, np.nan)
+    cortes = np.flatnonzero((np.diff(nivel) != 0) | (np.diff(np.nan_to_num(paso, nan=-1.0)) != 0)) + 1
+    inicios, fines = np.r_[0, cortes], np.r_[cortes, n]
+    estables = np.zeros(n, dtype=bool)
+    for inicio, fin in zip(inicios.tolist(), fines.tolist()):
+        if fin - inicio < min_muestras or not arrastre[inicio] > 0:
+            continue
+        inicio = inicio + int((fin - inicio) * descartar)  # Sin el transitorio al cambiar de velocidad
+        estables[inicio:fin] = True
+        tramo = slice(inicio, fin)
+        filas.append({'tipo': 'escalon', 'indice': len(filas), 'paso': paso[inicio], 'inicio': inicio, 'fin': fin, 'muestras': fin - inicio,
+                      'peso': peso, 'U': np.nanmean(arrastre[tramo]), 'SRR': np.nanmean(srr[tramo]),
+                      'mu': np.nanmean(mu[tramo]), 'mu_std': np.nanstd(mu[tramo]), **estadisticas_torque(torque[tramo])})
+
+    # Stribeck: un punto por nivel de velocidad con todas sus muestras (escalones o rampa)
+    moviendo = np.flatnonzero(arrastre > 0)
+    if len(moviendo):
+        niveles, grupo, cantidad = np.unique(np.round(arrastre[moviendo] / tolerancia).astype(np.int64),
+                                             return_inverse=True, return_counts=True)
+        suma = lambda valores: np.bincount(grupo, np.nan_to_num(valores[moviendo]), len(niveles))
+        validos = lambda valores: np.bincount(grupo, ~np.isnan(valores[moviendo]), len(niveles))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            u_medio = suma(arrastre) / cantidad
+            srr_medio = suma(srr) / validos(srr)
+            mu_medio = suma(mu) / validos(mu)
+        for k in np.flatnonzero(cantidad >= min_muestras).tolist():
+            filas.append({'tipo': 'stribeck', 'indice': k, 'muestras': int(cantidad[k]), 'peso': peso,
+                          'U': u_medio[k], 'SRR': srr_medio[k], 'mu': mu_medio[k]})
+
+    mu_estable = mu[estables]
+    resumen.update({'U': np.nanmean(arrastre[estables]) if estables.any() else np.nan,
+                    'SRR': np.nanmean(srr[estables]) if estables.any() else np.nan,
+                    'mu': np.nanmedian(mu_estable) if len(mu_estable) and not np.isnan(mu_estable).all() else np.nan,
+                    'mu_std': np.nanstd(mu_estable) if len(mu_estable) else np.nan})
+    return [resumen] + filas
+
+
+def procesar(ruta, opciones, carpeta_cache):
+    # Corre en un proceso del pool: devuelve (ruta, filas, desde_cache, error)
+    try:
+        clave = hash_archivo(ruta, opciones)
+        cache = os.path.join(carpeta_cache, clave + '.json') if carpeta_cache else None
+        if cache and os.path.exists(cache):
+            with open(cache) as archivo:
+                return ruta, json.load(archivo), True, None
+        columnas, peso = leer_ensayo(ruta, opciones['peso'])
+        filas = analizar(columnas, peso, opciones['tolerancia'], opciones['min_muestras'], opciones['descartar'])
+        filas = [{nombre: (float(valor) if isinstance(valor, (float, np.floating)) else valor) for nombre, valor in fila.items()}
+                 for fila in filas]
+        if cache:
+            temporal = f'{cache}.{os.getpid()}.tmp'
+            with open(temporal, 'w') as archivo:
+                json.dump(filas, archivo)  # NaN se guarda como NaN (json de Python lo lee igual)
+            os.replace(temporal, cache)
+        return ruta, filas, False, None
+    except Exception as e:
+        return ruta, [], False, f"{type(e).__name__}: {e}"
+
+
+def buscar_ensayos(directorio, excluir):
+    rutas = []
+    for carpeta, subcarpetas, archivos in os.walk(directorio):
+        subcarpetas[:] = sorted(nombre for nombre in subcarpetas if nombre != CARPETA_CACHE)
+        for nombre in sorted(archivos):
+            ruta = os.path.join(carpeta, nombre)
+            if nombre.lower().endswith(EXTENSIONES) and os.path.abspath(ruta) != excluir:
+                rutas.append(ruta)
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('directorio', help='Carpeta con los ensayos (.csv y .mtm, también en subcarpetas)')
+    parser.add_argument('--salida', default=None, help='CSV de resultados (por defecto <directorio>/resultados_analisis.csv)')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(), help='Procesos en paralelo')
+    parser.add_argument('--peso', type=float, default=None, help='Peso aplicado (kg) para los archivos que no lo guardan')
+    parser.add_argument('--tolerancia', type=float, default=0.02, help='m/s de cada nivel de velocidad')
+    parser.add_argument('--min-muestras', type=int, default=20, help='Muestras mínimas de un escalón o punto de Stribeck')
+    parser.add_argument('--descartar', type=float, default=0.2, help='Fracción inicial de cada escalón que se descarta')
+    parser.add_argument('--cache', default=None, help=f'Carpeta de la cache (por defecto <directorio>/{CARPETA_CACHE})')
+    parser.add_argument('--sin-cache', action='store_true', help='Procesar todo sin leer ni escribir la cache')
+    args = parser.parse_args()
+
+    salida = args.salida or os.path.join(args.directorio, 'resultados_analisis.csv')
+    carpeta_cache = None if args.sin_cache else (args.cache or os.path.join(args.directorio, CARPETA_CACHE))
+    if carpeta_cache:
+        os.makedirs(carpeta_cache, exist_ok=True)
+    opciones = {'peso': args.peso, 'tolerancia': args.tolerancia, 'min_muestras': args.min_muestras, 'descartar': args.descartar}
+    rutas = buscar_ensayos(args.directorio, os.path.abspath(salida))
+    if not rutas:
+        print(f"No hay ensayos (.csv, {EXTENSION_SESION}) en {args.directorio}")
+        return
+
+    inicio = time.perf_counter()
+    resultados, nuevos, errores = [], 0, 0
+    with ProcessPoolExecutor(max_workers=max(1, args.procesos)) as pool:
+        for ruta, filas, desde_cache, error in pool.map(procesar, rutas, [opciones] * len(rutas), [carpeta_cache] * len(rutas)):
+            if error:
+                errores += 1
+                print(f"ERROR {ruta}: {error}")
+                continue
+            nuevos += not desde_cache
+            archivo = os.path.relpath(ruta, args.directorio)
+            resultados += [{'archivo': archivo, **fila} for fila in filas]
+
+    tabla = pd.DataFrame(resultados, columns=COLUMNAS_RESULTADOS)
+    tabla.to_csv(salida, index=False, float_format='%.6g')
+    ensayos = tabla[tabla['tipo'] == 'ensayo']
+    print(f"{len(rutas)} ensayos ({nuevos} procesados, {len(rutas) - nuevos - errores} desde la cache, {errores} con error) "
+          f"en {time.perf_counter() - inicio:.2f} s con {args.procesos} procesos")
+    print(f"{len(tabla)} filas en {salida}: {int((tabla['tipo'] == 'escalon').sum())} escalones, "
+          f"{int((tabla['tipo'] == 'stribeck').sum())} puntos de Stribeck")
+    if len(ensayos):
+        print(ensayos[['archivo', 'muestras', 'peso', 'mu', 'torque_media', 'torque_std']].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,136 @@
+"""Calibración del sensor de torque: ajusta el modelo y lo guarda en la tabla de calibraciones.
+
+Lee una o varias sesiones de calibración (CSV con el valor crudo y el de referencia),
+ajusta un modelo lineal, polinómico o lineal por tramos descartando puntos atípicos y lo
+agrega como versión nueva en --tabla (MTM ALPHA.PY y MTM Beta.py aplican la última en
+cada START). El valor crudo tiene que ser el que el equipo envía en la columna --sensor
+(Torque, en kg; de una sesión ya calibrada se toma 'Torque Crudo'), y la referencia se
+lleva a la misma unidad: el modelo reemplaza esa columna en vivo. Las unidades quedan en
+la tabla y las GUI rechazan una calibración que no vaya de kg a kg.
+Con --aplicar calibra grabaciones ya hechas (.mtm o .csv) y escribe <nombre>_calibrado.csv.
+
+    python calibración/script_calibración.py datos_calibración.csv
+    python calibración/script_calibración.py pesas.csv --columna-referencia 'Torque (Nm)' --unidad-referencia Nm --brazo 0.1
+    python calibración/script_calibración.py sesion1.csv sesion2.csv --modelo tramos --tramos 4 --sin-grafico
+    python calibración/script_calibración.py --aplicar sesiones/sesion_20241112_101500.mtm
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-
-# Cargar datos de calibración
-datos = pd.read_csv('datos_calibración.csv')
-
-# Realizar ajuste lineal de la curva de calibración
-from numpy import polyfit
-coeficientes = polyfit(datos['Valor ADC'], datos['Torque (Nm)'], 1)
-
-# Visualizar curva de calibración
-plt.plot(datos['Valor ADC'], datos['Torque (Nm)'], 'o', label='Datos Experimentales')
-plt.plot(datos['Valor ADC'], coeficientes[0]*datos['Valor ADC'] + coeficientes[1], label='Ajuste Lineal')
-plt.xlabel('Valor ADC')
-plt.ylabel('Torque (Nm)')
-plt.title('Curva de Calibración del Sensor de Torque')
-plt.legend()
-plt.grid(True)
-plt.show()
-
-# Guardar coeficientes de calibración
-with open('coeficientes_calibración.txt', 'w') as f:
-    f.write(f"Coeficiente 1: {coeficientes[0]}\n")
-    f.write(f"Coeficiente 2: {coeficientes[1]}\n")
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(AQUI, '..', 'gui'))
+from utilidades.calibracion import (MODELOS, SUFIJO_CRUDO, UNIDADES, ajustar_calibracion, calibracion_vigente, calibrar_columnas,
+                                    guardar_calibracion)
+from utilidades.sesion_binaria import EXTENSION_SESION, SesionBinaria
+
+GRAVEDAD = 9.80665  # m/s², para pasar la referencia de N o N·m a kg (la celda de carga mide kg fuerza)
+
+
+def referencia_en_kg(valores, unidad, brazo=None):
+    # La referencia en kg, la unidad de la columna Torque del equipo
+    if unidad == 'kg':
+        return valores
+    if unidad == 'N':
+        return valores / GRAVEDAD
+    return valores / (GRAVEDAD * brazo)  # N·m: fuerza en la celda = torque / brazo
+
+
+def graficar(crudo, referencia, calibracion, columna_cruda, columna_referencia):
+    import matplotlib.pyplot as plt
+    aceptados = calibracion.aceptados
+    x = np.linspace(crudo.min(), crudo.max(), 500)
+    plt.plot(crudo[aceptados], referencia[aceptados], 'o', label='Datos Experimentales')
+    if (~aceptados).any():
+        plt.plot(crudo[~aceptados], referencia[~aceptados], 'x', color='red', label='Descartados')
+    plt.plot(x, calibracion.aplicar(x), label=f'Ajuste {calibracion.modelo}')
+    plt.xlabel(f"{columna_cruda} ({calibracion.unidad_cruda})")
+    plt.ylabel(f"{columna_referencia} ({calibracion.unidad})")
+    plt.title('Curva de Calibración del Sensor de Torque')
+    plt.legend()
+    plt.grid(True)
+    plt.show()
+
+
+def aplicar(ruta, calibracion):
+    if ruta.endswith(EXTENSION_SESION):
+        columnas = SesionBinaria(ruta).como_dict()
+    else:
+        tabla = pd.read_csv(ruta)
+        columnas = {nombre: tabla[nombre].to_numpy() for nombre in tabla.columns}
+    inicio = time.perf_counter()
+    columnas = calibrar_columnas(columnas, calibracion)
+    duracion = time.perf_counter() - inicio
+    salida = os.path.splitext(ruta)[0] + '_calibrado.csv'
+    pd.DataFrame(columnas).to_csv(salida, index=False, float_format='%.6g')
+    print(f"{ruta}: {len(columnas[calibracion.sensor])} muestras calibradas en {duracion * 1e3:.1f} ms -> {salida}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('datos', nargs='*', help='CSV de calibración (uno por sesión)')
+    parser.add_argument('--columna-cruda', default='Torque', help="Valor que envía el equipo (si el CSV tiene "
+                        "'<columna> Crudo', de una sesión calibrada, se usa esa)")
+    parser.add_argument('--unidad-cruda', default='kg', help='Unidad de --columna-cruda; tiene que ser la del sensor')
+    parser.add_argument('--columna-referencia', default='Referencia (kg)')
+    parser.add_argument('--unidad-referencia', choices=('kg', 'N', 'Nm'), default='kg',
+                        help='Se convierte a kg (N·m con --brazo)')
+    parser.add_argument('--brazo', type=float, help='Metros del eje a la celda de carga, para --unidad-referencia Nm')
+    parser.add_argument('--sensor', default='Torque', help='Columna de telemetría que corrige la calibración')
+    parser.add_argument('--modelo', choices=MODELOS, default='lineal')
+    parser.add_argument('--grado', type=int, default=2, help='Grado del modelo polinómico')
+    parser.add_argument('--tramos', type=int, default=4, help='Tramos del modelo lineal por tramos')
+    parser.add_argument('--umbral', type=float, default=3.5, help='Desviaciones robustas para descartar un punto')
+    parser.add_argument('--tabla', default=os.path.join(AQUI, 'calibraciones.json'))
+    parser.add_argument('--sin-grafico', action='store_true')
+    parser.add_argument('--aplicar', nargs='+', default=[], help='Grabaciones a calibrar con la última versión')
+    args = parser.parse_args()
+    if not args.datos and not args.aplicar:
+        parser.error("Indique los CSV de calibración o --aplicar")
+    if args.unidad_referencia == 'Nm' and not args.brazo:
+        parser.error("--unidad-referencia Nm necesita --brazo para pasar a kg")
+    unidad = UNIDADES.get(args.sensor, args.unidad_referencia)
+    if args.unidad_cruda != unidad:
+        parser.error(f"El equipo envía {args.sensor} en {unidad}: la columna cruda no puede estar en {args.unidad_cruda}")
+
+    if args.datos:
+        sesiones = [pd.read_csv(ruta) for ruta in args.datos]
+        # El valor del equipo sin calibrar: 'Torque Crudo' si el CSV viene de una sesión ya calibrada
+        crudo = np.concatenate([datos[args.columna_cruda + SUFIJO_CRUDO if args.columna_cruda + SUFIJO_CRUDO in datos else
+                                      args.columna_cruda].to_numpy(dtype=np.float64) for datos in sesiones])
+        referencia = np.concatenate([datos[args.columna_referencia].to_numpy(dtype=np.float64) for datos in sesiones])
+        if unidad == 'kg':
+            referencia = referencia_en_kg(referencia, args.unidad_referencia, args.brazo)
+        elif args.unidad_referencia != unidad:
+            parser.error(f"La referencia tiene que estar en {unidad}, la unidad de {args.sensor}")
+        calibracion = ajustar_calibracion(crudo, referencia, args.modelo, args.grado, args.tramos, args.umbral,
+                                          sensor=args.sensor, sesiones=[os.path.basename(ruta) for ruta in args.datos],
+                                          unidad_cruda=args.unidad_cruda, unidad=unidad)
+        if args.unidad_referencia != unidad:
+            calibracion.estadisticas['referencia'] = {'unidad': args.unidad_referencia, 'brazo': args.brazo}
+        guardar_calibracion(args.tabla, calibracion)
+        estadisticas = calibracion.estadisticas
+        print(f"Calibración guardada en {args.tabla}: {calibracion.describir()}")
+        print(f"{estadisticas['puntos']} puntos de {len(args.datos)} sesiones, {estadisticas['descartados']} descartados, "
+              f"error máximo {estadisticas['error_maximo']:.4g}")
+        if not args.sin_grafico:
+            validos = ~(np.isnan(crudo) | np.isnan(referencia))
+            graficar(crudo[validos], referencia[validos], calibracion, args.columna_cruda, args.columna_referencia)
+
+    if args.aplicar:
+        try:
+            calibracion = calibracion_vigente(args.tabla, args.sensor)
+        except ValueError as e:
+            sys.exit(str(e))
+        if calibracion is None:
+            sys.exit(f"No hay calibración de {args.sensor} en {args.tabla}")
+        for ruta in args.aplicar:
+            aplicar(ruta, calibracion)
+
+
+if __name__ == '__main__':
+    main()
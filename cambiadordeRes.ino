@@ -22,6 +22,9 @@ float torque_actual = 0;
 
 // Variables para envío de datos al PC
 unsigned long lastDataSentTime = 0;
+// Contador de líneas enviadas: la PC detecta líneas perdidas por los saltos de Seq y
+// alinea el tiempo de cada muestra con Millis (millis() al enviarla)
+unsigned long dataSequence = 0;
 
 // Variables para control de motores
 volatile bool motor1_running = false;
@@ -278,6 +281,10 @@ void sendDataToPC() {
   dataString += currentRPM1;
   dataString += ",RPM2:";
   dataString += currentRPM2;
+  dataString += ",Seq:";
+  dataString += dataSequence++;
+  dataString += ",Millis:";
+  dataString += millis();
   Serial.println(dataString);
 }
 
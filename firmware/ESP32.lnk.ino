@@ -13,6 +13,16 @@ IPAddress subnet(255, 255, 255, 0);
 // Creación del servidor web en el puerto 80
 WebServer server(80);
 
+// Flujo continuo de torque por TCP en el puerto 81: una línea "millis,torque" por muestra,
+// enviadas en tandas (la interfaz ya no tiene que consultar /get_torque muestra a muestra)
+WiFiServer flujoServer(81);
+WiFiClient flujoCliente;
+const unsigned long PERIODO_MUESTRA_MS = 10;  // 100 muestras/s
+const unsigned long PERIODO_ENVIO_MS = 50;    // Una tanda cada 50 ms
+String tandaFlujo;
+unsigned long ultimaMuestra = 0;
+unsigned long ultimoEnvio = 0;
+
 // Variables globales
 float velocidad_disco = 0.0;
 float velocidad_bolita = 0.0;
@@ -57,6 +67,25 @@ void handleSetTorque() {
   }
 }
 
+// Función para atender el flujo continuo de torque (un cliente a la vez)
+void atenderFlujo() {
+  if (!flujoCliente || !flujoCliente.connected()) {
+    flujoCliente = flujoServer.available();
+    tandaFlujo = "";
+    return;
+  }
+  unsigned long ahora = millis();
+  if (ahora - ultimaMuestra >= PERIODO_MUESTRA_MS) {
+    ultimaMuestra = ahora;
+    tandaFlujo += String(ahora) + "," + String(torque, 3) + "\n";
+  }
+  if (tandaFlujo.length() > 0 && (ahora - ultimoEnvio >= PERIODO_ENVIO_MS || tandaFlujo.length() > 1000)) {
+    flujoCliente.print(tandaFlujo);
+    tandaFlujo = "";
+    ultimoEnvio = ahora;
+  }
+}
+
 void setup() {
   Serial.begin(115200);
 
@@ -76,9 +105,12 @@ void setup() {
 
   // Iniciar servidor
   server.begin();
+  flujoServer.begin();
+  flujoServer.setNoDelay(true);
   Serial.println("Servidor iniciado");
 }
 
 void loop() {
   server.handleClient();
+  atenderFlujo();
 }
@@ -1,27 +1,64 @@
+import os
+import queue
+import shutil
+import sys
 import serial
 import serial.tools.list_ports
-import threading
 import time
 import pandas as pd
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog, W, E, N, S, END
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
 
 # Importar ttkbootstrap
 import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 
-# Variables globales para almacenar los datos
-datos_lista = []
+# Módulos compartidos de la interfaz (gui/utilidades)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.buffer_muestras import BufferMuestras
+from utilidades.canal_comandos import CanalComandos, solo_mensajes
+from utilidades.calibracion import CalibradorColumna, calibracion_vigente
+from utilidades.filtros import FILTROS_TORQUE, FiltroColumna
+from utilidades.grabador import GrabadorSesion
+from utilidades.graficador import GraficadorVivo
+from utilidades.lector_serial import LectorSerial
+from utilidades.magnitudes import COLUMNAS_DERIVADAS, DerivadorMagnitudes
+from utilidades.puente_gui import AvisoErrores, PuenteGUI
+from utilidades.registro_mensajes import ERROR, FIRMWARE, INTERFAZ, TELEMETRIA, RegistroMensajes
+from utilidades.secuencia import EjecutorSecuencia, MarcadorPasos, cargar_receta, duracion_receta, lineas_set
+from utilidades.sesion_binaria import EXTENSION_SESION, exportar_csv
+from utilidades.sincronizacion import SincronizadorReloj
+from utilidades.tabla_virtual import TablaVirtual
+from utilidades.telemetria import COLUMNAS, COLUMNAS_RELOJ, formatear_lineas
+from utilidades.trama_binaria import DecodificadorBinario
+
+# Paneles de la gráfica en vivo: (columna, etiqueta, color) por serie
+PANELES = [
+    {'ylabel': 'Velocidad (m/s)', 'series': [('Velocidad Disco', 'Velocidad Disco (m/s)', 'blue'), ('Velocidad Bola', 'Velocidad Bola (m/s)', 'green')]},
+    {'ylabel': 'Torque (kg)', 'series': [('Torque', 'Torque (kg)', 'red'), ('Torque Filtrado', 'Torque filtrado (kg)', 'black')]},
+    {'ylabel': 'Duty Cycle (%)', 'series': [('Duty Disco', 'Duty Disco (%)', 'cyan'), ('Duty Bola', 'Duty Bola (%)', 'magenta')]},
+    {'ylabel': 'μ / SRR', 'series': [('Mu', 'Coeficiente de fricción μ', 'black'), ('SRR', 'SRR', 'brown')]},
+]
+
+# Tabla de calibraciones que escribe calibración/script_calibración.py (se usa la última versión)
+TABLA_CALIBRACION = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'calibración', 'calibraciones.json')
+
+# Carpeta donde se graba cada ensayo completo (un archivo por START)
+CARPETA_SESIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sesiones')
+
+# Columnas de la tabla de datos adquiridos
+COLUMNAS_TABLA = ('Tiempo', 'Duty Disco', 'Velocidad Disco', 'Duty Bola', 'Velocidad Bola', 'Torque', 'T_pulse_D', 'T_pulse_B')
+
+# Columnas grabadas en la sesión: la telemetría (con el torque calibrado y el que envió el equipo),
+# el reloj del equipo, la hora de la PC estimada y el paso de la secuencia. Sin compensación de tara:
+# MTM Beta.ino no envía telemetría con los motores detenidos, así que nunca habría reposo que medir
+COLUMNAS_SESION = COLUMNAS + ('Torque Crudo',) + COLUMNAS_RELOJ + ('Hora', 'Paso')
 
 # Límite de muestras
 limite_muestras = 1000  # Puedes ajustar este valor según tus necesidades
 
-# Evento para detener el hilo
-stop_event = threading.Event()
-
 class App:
     def __init__(self, root):
         self.root = root
@@ -84,6 +121,15 @@ class App:
         for idx, (label_text, default_value) in enumerate(parametros):
             self.crear_campo(parametros_frame, label_text, default_value, row=idx)
 
+        # Sin opción de telemetría binaria: MTM Beta.ino no implementa SET MODO y sólo envía texto
+
+        # Filtro del torque en el hilo lector: se grafica junto al torque crudo
+        self.filtro_torque_var = tk.StringVar(value=next(iter(FILTROS_TORQUE)))
+        ttkb.Label(parametros_frame, text="Filtro de torque:").grid(row=len(parametros), column=0, sticky=W, pady=5)
+        filtro_combobox = ttkb.Combobox(parametros_frame, textvariable=self.filtro_torque_var, values=list(FILTROS_TORQUE), state='readonly')
+        filtro_combobox.grid(row=len(parametros), column=1, pady=5)
+        filtro_combobox.bind('<<ComboboxSelected>>', self.cambiar_filtro_torque)
+
         # Añadir opciones para la dirección de los motores
         direcciones_frame = ttkb.LabelFrame(control_paned, text="Dirección de Motores", padding=10)
         control_paned.add(direcciones_frame, weight=0)
@@ -111,10 +157,29 @@ class App:
         ttkb.Button(botones_frame, text="Guardar Datos", command=self.guardar_datos, bootstyle=INFO).pack(fill=X, pady=5)
         ttkb.Button(botones_frame, text="Info Ecuaciones", command=self.mostrar_ecuaciones, bootstyle=INFO).pack(fill=X, pady=5)
 
+        # Secuencia automática: los pasos de una receta salen desde un hilo propio, sin clics entre pasos
+        secuencia_frame = ttkb.LabelFrame(control_paned, text="Secuencia Automática", padding=10)
+        control_paned.add(secuencia_frame, weight=0)
+        ttkb.Button(secuencia_frame, text="Cargar Receta", command=self.cargar_receta, bootstyle=PRIMARY).pack(fill=X, pady=2)
+        ttkb.Button(secuencia_frame, text="Ejecutar Secuencia", command=self.ejecutar_secuencia, bootstyle=SUCCESS).pack(fill=X, pady=2)
+        ttkb.Button(secuencia_frame, text="Continuar", command=self.continuar_secuencia, bootstyle=INFO).pack(fill=X, pady=2)
+        ttkb.Button(secuencia_frame, text="Detener Secuencia", command=self.detener_secuencia, bootstyle=DANGER).pack(fill=X, pady=2)
+        self.secuencia_label = ttkb.Label(secuencia_frame, text="Sin receta")
+        self.secuencia_label.pack(fill=X, pady=2)
+
         # Área de Mensajes y Cálculos
         mensajes_frame = ttkb.LabelFrame(control_paned, text="Mensajes y Cálculos", padding=10)
         control_paned.add(mensajes_frame, weight=1)
 
+        # Tipos de mensaje visibles (la telemetría periódica no se guarda en el registro salvo que se marque)
+        filtros_frame = ttkb.Frame(mensajes_frame)
+        filtros_frame.pack(side=TOP, fill=X)
+        self.filtros_mensajes = {}
+        for tipo, texto, activo in ((FIRMWARE, "Equipo", True), (INTERFAZ, "Interfaz", True), (ERROR, "Errores", True), (TELEMETRIA, "Telemetría", False)):
+            variable = tk.BooleanVar(value=activo)
+            ttkb.Checkbutton(filtros_frame, text=texto, variable=variable, command=self.filtrar_mensajes).pack(side=LEFT, padx=2, pady=2)
+            self.filtros_mensajes[tipo] = variable
+
         self.text_area = tk.Text(mensajes_frame)
         self.text_area.pack(side=LEFT, fill=BOTH, expand=True)
 
@@ -122,6 +187,9 @@ class App:
         self.text_area.configure(yscrollcommand=scrollbar_text.set)
         scrollbar_text.pack(side=RIGHT, fill=Y)
 
+        # Registro acotado: se escribe en bloque una vez por tick y se recorta de a bloques
+        self.registro = RegistroMensajes(self.text_area, max_lineas=2000)
+
         # Frame para gráficos y datos
         data_frame = ttkb.Frame(paned_window)
         paned_window.add(data_frame, weight=3)
@@ -138,7 +206,10 @@ class App:
         self.canvas = FigureCanvasTkAgg(self.fig, master=graficos_frame)
         self.canvas.get_tk_widget().pack(side=TOP, fill=BOTH, expand=True)
 
-        self.ani = FuncAnimation(self.fig, self.actualizar_grafica, interval=500, cache_frame_data=False)  # Intervalo de 500 ms
+        # Ejes y líneas se crean una sola vez; cada cuadro sólo actualiza los datos (blitting)
+        self.graficador = GraficadorVivo(self.fig, self.canvas, PANELES)
+        self.total_graficado = 0
+        self.id_grafica = self.root.after(500, self.actualizar_grafica)  # Intervalo de 500 ms
 
         # Panel de Valores Actuales
         valores_frame = ttkb.LabelFrame(data_paned, text="Valores Actuales", padding=10)
@@ -151,8 +222,12 @@ class App:
             'Velocidad Disco (m/s)',
             'Velocidad Bola (m/s)',
             'Torque (kg)',
+            'Torque filtrado (kg)',
             'Duty Disco (%)',
-            'Duty Bola (%)'
+            'Duty Bola (%)',
+            'Coeficiente de fricción μ',
+            'SRR (%)',
+            'Velocidad Arrastre (m/s)'
         ]
 
         for var in variables:
@@ -165,24 +240,52 @@ class App:
             # Guardamos la etiqueta en el diccionario
             self.valores_actuales[var] = value_label
 
+        # Estado del enlace: muestras perdidas (huecos en la secuencia) y deriva del reloj del equipo
+        self.enlace_label = ttkb.Label(valores_frame, text="Enlace: sin datos", font=('Helvetica', 9))
+        self.enlace_label.pack(anchor='w', pady=(8, 2))
+
         # Registro de Datos
         datos_frame = ttkb.LabelFrame(data_frame, text="Datos Adquiridos", padding=10)
         datos_frame.pack(side=BOTTOM, fill=BOTH, expand=True)
 
-        columns = ('Tiempo', 'Duty Disco', 'Velocidad Disco', 'Duty Bola', 'Velocidad Bola', 'Torque', 'T_pulse_D', 'T_pulse_B')
+        columns = COLUMNAS_TABLA
         self.tree = ttkb.Treeview(datos_frame, columns=columns, show='headings')
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, width=100)
         self.tree.pack(side=LEFT, fill=BOTH, expand=True)
 
-        scrollbar = ttkb.Scrollbar(datos_frame, orient=VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # La barra la maneja TablaVirtual (ver más abajo): el Treeview sólo tiene las filas visibles
+        scrollbar = ttkb.Scrollbar(datos_frame, orient=VERTICAL)
         scrollbar.pack(side=RIGHT, fill=Y)
 
         # Variables de control
         self.ser = None
-        self.hilo_serial = None
+        self.lector = None
+        self.monitor = None  # Lector entre ensayos: sólo las respuestas del equipo
+        self.canal = None  # CanalComandos de la conexión: escribe fuera del hilo de Tk y sigue las confirmaciones
+        self.envios_terminados = queue.Queue()
+        self.grabador = None  # Sesión en disco del ensayo en curso (o del último)
+        self.sincronizador = None  # Pérdidas y deriva del reloj del ensayo en curso (o del último)
+        self.derivador = None  # μ, SRR y velocidad de arrastre de cada lote, con el peso del ensayo en curso
+        self.calibrador = CalibradorColumna(None)  # Corrige 'Torque' con la calibración vigente en cada START
+        self.receta = None
+        self.secuencia = None  # EjecutorSecuencia en curso (o la última)
+        self.paso_mostrado = -1
+        self.marcador_pasos = MarcadorPasos()  # Agrega 'Paso' (NaN en los ensayos manuales)
+        self.filtro_torque = FiltroColumna(None)  # Agrega 'Torque Filtrado'; el filtro se crea en cada START
+
+        # Buffer circular con las últimas `limite_muestras` muestras
+        self.muestras = BufferMuestras(COLUMNAS + COLUMNAS_DERIVADAS + (self.filtro_torque.destino,), limite_muestras)
+        self.tabla = TablaVirtual(self.tree, scrollbar, self.muestras, COLUMNAS_TABLA)
+        self.decodificador = DecodificadorBinario()
+
+        # El hilo lector sólo decodifica y encola; los widgets se actualizan acá, una vez por tick
+        self.cola_lotes = queue.Queue()
+        self.puente = PuenteGUI(self.cola_lotes, self.aplicar_lote, periodo_ms=100)
+        self.puente.iniciar_tk(self.root)
+        self.aviso_errores = AvisoErrores()  # Fallas de los hilos de lectura y grabación, una vez cada una
+        self.id_envios = self.root.after(100, self.revisar_envios)
 
     def crear_campo(self, frame, label_text, default_value, row):
         label = ttkb.Label(frame, text=label_text)
@@ -216,11 +319,14 @@ class App:
     def conectar_desconectar(self):
         if self.ser and self.ser.is_open:
             # Desconectar
+            self.detener_lectura()
+            self.detener_monitor()
+            self.canal.detener()
+            self.registro.escribir(f"Comandos: {self.canal.resumen()}")
             self.ser.close()
             self.estado_conexion.config(text="Desconectado")
             self.boton_conectar.config(text="Conectar")
-            self.text_area.insert(END, "Desconectado del puerto serial.\n")
-            self.text_area.see(END)
+            self.registro.escribir("Desconectado del puerto serial.")
         else:
             try:
                 port = self.combobox_ports.get()
@@ -229,10 +335,12 @@ class App:
                     return
                 self.ser = serial.Serial(port, 115200, timeout=1)
                 time.sleep(2)  # Esperar a que se establezca la conexión
+                self.canal = CanalComandos(self.ser.write, avisar=self.envios_terminados.put)
+                self.canal.start()
+                self.iniciar_monitor()
                 self.estado_conexion.config(text="Conectado")
                 self.boton_conectar.config(text="Desconectar")
-                self.text_area.insert(END, f"Conectado al puerto {port}.\n")
-                self.text_area.see(END)
+                self.registro.escribir(f"Conectado al puerto {port}.")
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo conectar al puerto serial: {e}")
 
@@ -240,8 +348,7 @@ class App:
         if not self.ser or not self.ser.is_open:
             messagebox.showerror("Error", "No está conectado al puerto serial.")
             return
-        parametros = []
-        campos = ['R', 'r', 'RPM_inicial_Disco', 'RPM_final_Disco', 'Coeficiente_de_friccion', 'Tiempo_total']
+        # Nombre de cada campo en el firmware (SET NOMBRE=valor)
         parametro_nombre_dict = {
             'R': 'R',
             'r': 'r',
@@ -250,32 +357,35 @@ class App:
             'Coeficiente_de_friccion': 'mu',
             'Tiempo_total': 'T'
         }
-        for campo in campos:
-            attribute_name = campo
-            entry = getattr(self, attribute_name + '_entry', None)
+        pares = []
+        for campo, parametro_nombre in parametro_nombre_dict.items():
+            entry = getattr(self, campo + '_entry', None)
             if entry:
                 valor = entry.get()
                 if valor:
-                    parametro_nombre = parametro_nombre_dict.get(campo, campo)
-                    parametros.append(f"SET {parametro_nombre}={valor}\n")
+                    pares.append((parametro_nombre, valor))
 
-        # Agregar comandos para la dirección de los motores
-        dir_disco = self.dir_disco_var.get()
-        dir_bola = self.dir_bola_var.get()
-        parametros.append(f"SET DIR_DISCO={dir_disco}\n")
-        parametros.append(f"SET DIR_BOLA={dir_bola}\n")
+        # Dirección de los motores
+        pares.append(('DIR_DISCO', self.dir_disco_var.get()))
+        pares.append(('DIR_BOLA', self.dir_bola_var.get()))
 
-        if parametros:
+        if pares:
+            # Sin SET MODO: MTM Beta.ino ignora los nombres que no conoce sin responder y el canal
+            # lo reintentaría hasta darlo por no confirmado
+            parametros = lineas_set(pares)
             try:
-                for param in parametros:
-                    self.ser.write(param.encode())
-                    time.sleep(0.1)
-                self.text_area.insert(END, "Parámetros enviados.\n")
-                self.text_area.see(END)
+                # Una sola escritura desde el canal; la confirmación de cada valor llega al registro
+                self.canal.enviar(parametros, "Parámetros")
+                self.registro.escribir("Parámetros enviados.")
+                # El peso no va al equipo, pero el μ calculado lo usa desde el próximo lote
+                if self.derivador:
+                    self.derivador.peso = self.parametros_ensayo().get('peso', self.derivador.peso)
 
                 # Actualizar el límite de muestras
                 global limite_muestras
                 limite_muestras = int(self.Limite_de_muestras_entry.get())
+                self.muestras.redimensionar(limite_muestras)
+                self.tabla.refrescar()
             except Exception as e:
                 messagebox.showerror("Error", f"No se pudo enviar parámetros: {e}")
         else:
@@ -286,57 +396,77 @@ class App:
             messagebox.showerror("Error", "No está conectado al puerto serial.")
             return
         try:
-            self.ser.write("START\n".encode())
-            time.sleep(0.1)
-            self.text_area.insert(END, "Ensayo iniciado.\n")
-            self.text_area.see(END)
-            # Iniciar hilo de lectura serial
-            if not self.hilo_serial or not self.hilo_serial.is_alive():
-                self.hilo_serial = threading.Thread(target=self.leer_serial)
-                stop_event.clear()
-                self.hilo_serial.start()
+            # El lector ya está escuchando cuando llega la respuesta a START
+            self.iniciar_lectura()
+            self.canal.enviar(["START"], "START")
+            self.registro.escribir("Ensayo iniciado.")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo iniciar el ensayo: {e}")
 
+    def iniciar_lectura(self):
+        # Iniciar el hilo de lectura serial (entrega los lotes en self.cola_lotes)
+        if not self.lector or not self.lector.is_alive():
+            self.detener_monitor()
+            self.iniciar_grabacion()
+            self.sincronizador = SincronizadorReloj()
+            self.cargar_calibracion()
+            self.derivador = DerivadorMagnitudes(self.parametros_ensayo().get('peso', 0.0))
+            # El sincronizador va antes que el grabador para que la sesión incluya la columna 'Hora'
+            self.filtro_torque.filtro = FILTROS_TORQUE[self.filtro_torque_var.get()]()
+            etapas = (self.canal, self.calibrador, self.sincronizador, self.filtro_torque, self.derivador,
+                      self.marcador_pasos, self.grabador)
+            self.lector = LectorSerial(self.ser, self.decodificador, self.cola_lotes, etapas=etapas)
+            self.lector.start()
+
     def enviar_stop(self):
         if not self.ser or not self.ser.is_open:
             messagebox.showerror("Error", "No está conectado al puerto serial.")
             return
         try:
-            self.ser.write("STOP\n".encode())
-            time.sleep(0.1)
-            self.text_area.insert(END, "Ensayo detenido.\n")
-            self.text_area.see(END)
-            stop_event.set()
+            if self.secuencia and self.secuencia.is_alive():
+                self.secuencia.detener()  # Sin que envíe el paso siguiente
+            self.canal.enviar(["STOP"], "STOP")
+            self.registro.escribir("Ensayo detenido.")
+            self.detener_lectura()
+            self.iniciar_monitor()  # La confirmación de STOP llega por el monitor
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo detener el ensayo: {e}")
 
     def reiniciar_datos(self):
-        global datos_lista
-        datos_lista.clear()
-        self.tree.delete(*self.tree.get_children())
-        self.fig.clear()
-        self.canvas.draw()
-        self.text_area.insert(END, "Datos y gráficas reiniciados.\n")
-        self.text_area.see(END)
+        self.muestras.limpiar()
+        self.total_graficado = 0
+        self.tabla.refrescar()
+        self.graficador.limpiar()
+        self.registro.escribir("Datos y gráficas reiniciados.")
         # Reiniciar los valores actuales
         for label in self.valores_actuales.values():
             label.config(text="0.00")
 
     def guardar_datos(self):
-        if datos_lista:
+        if len(self.muestras):
             # Preguntar al usuario si desea guardar todos los datos o un subconjunto
             respuesta = messagebox.askyesnocancel("Guardar Datos", "¿Desea guardar todos los datos? (Sí: todos, No: solo los últimos N, Cancelar: no guardar)")
             if respuesta is None:
                 return  # Cancelado
+            elif respuesta and self.grabador:
+                # Todo el ensayo está en el archivo de sesión (el buffer sólo tiene las últimas muestras)
+                filename = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[('CSV Files', '*.csv'), ('Sesión MTM', '*' + EXTENSION_SESION)])
+                if filename:
+                    self.grabador.sincronizar()
+                    if filename.endswith(EXTENSION_SESION):
+                        shutil.copyfile(self.grabador.ruta, filename)
+                    else:
+                        exportar_csv(self.grabador.ruta, filename)
+                    messagebox.showinfo("Información", f"Datos guardados en {filename}")
+                return
             elif respuesta:
-                datos = pd.DataFrame(datos_lista)
+                datos = pd.DataFrame(self.muestras.como_dict())
             else:
                 # Pedir al usuario cuántas muestras desea guardar
-                n = simpledialog.askinteger("Número de muestras", "¿Cuántas muestras recientes desea guardar?", minvalue=1, maxvalue=len(datos_lista))
+                n = simpledialog.askinteger("Número de muestras", "¿Cuántas muestras recientes desea guardar?", minvalue=1, maxvalue=len(self.muestras))
                 if n is None:
                     return  # Cancelado
-                datos = pd.DataFrame(datos_lista[-n:])
+                datos = pd.DataFrame(self.muestras.como_dict(ultimas=n))
             filename = filedialog.asksaveasfilename(defaultextension='.csv', filetypes=[('CSV Files', '*.csv')])
             if filename:
                 datos.to_csv(filename, index=False)
@@ -418,101 +548,205 @@ Nota: Los símbolos matemáticos se representan usando Unicode para compatibilid
         text_widget.insert(END, contenido)
         text_widget.configure(state='disabled')  # Hacer que el texto sea de solo lectura
 
-    def leer_serial(self):
+    def aplicar_lote(self, lote):
+        # Corre en el hilo de Tk (PuenteGUI): todos los lotes recibidos desde el tick anterior juntos
+
+        # Mostrar mensajes y cálculos (se escriben en el widget al final, en bloque)
+        self.registro.agregar_varios(lote.mensajes)
+        if TELEMETRIA in self.registro.mostrar:
+            self.registro.agregar_varios(formatear_lineas(lote.columnas), TELEMETRIA)
+        self.registro.volcar()
+
+        # Las muestras mal formadas o con CRC inválido se cuentan en self.decodificador.errores
+        if len(lote.columnas['Tiempo']) == 0:
+            return
+
+        # Agregar las muestras al buffer (descarta las más antiguas al llenarse)
+        self.muestras.agregar_lote(lote.columnas)
+        if self.sincronizador:
+            self.enlace_label.config(text=f"Enlace: {self.sincronizador.resumen()}")
+
+        # Actualizar tabla (sólo las filas visibles; sigue a la última muestra salvo que el usuario haya subido)
+        self.tabla.refrescar()
+
+        # Actualizar los valores actuales en las etiquetas
+        ultima = self.muestras.ultima()
+        if ultima:
+            self.valores_actuales['Velocidad Disco (m/s)'].config(text=f"{ultima['Velocidad Disco']:.2f}")
+            self.valores_actuales['Velocidad Bola (m/s)'].config(text=f"{ultima['Velocidad Bola']:.2f}")
+            self.valores_actuales['Torque (kg)'].config(text=f"{ultima['Torque']:.2f}")
+            self.valores_actuales['Torque filtrado (kg)'].config(text=f"{ultima['Torque Filtrado']:.2f}")
+            self.valores_actuales['Duty Disco (%)'].config(text=f"{ultima['Duty Disco']:.2f}")
+            self.valores_actuales['Duty Bola (%)'].config(text=f"{ultima['Duty Bola']:.2f}")
+            self.valores_actuales['Coeficiente de fricción μ'].config(text=f"{ultima['Mu']:.3f}")
+            self.valores_actuales['SRR (%)'].config(text=f"{100 * ultima['SRR']:.2f}")
+            self.valores_actuales['Velocidad Arrastre (m/s)'].config(text=f"{ultima['Velocidad Arrastre']:.2f}")
+
+    def cambiar_filtro_torque(self, event=None):
+        # Corre en el hilo de Tk: el lector usa el filtro nuevo (con estado vacío) desde el próximo lote
+        self.filtro_torque.filtro = FILTROS_TORQUE[self.filtro_torque_var.get()]()
+        self.registro.escribir(f"Filtro de torque: {self.filtro_torque_var.get()}")
+
+    def filtrar_mensajes(self):
+        self.registro.filtrar([tipo for tipo, variable in self.filtros_mensajes.items() if variable.get()])
+
+    def actualizar_grafica(self):
+        # Sólo se redibuja cuando llegaron muestras nuevas desde el último cuadro
+        if len(self.muestras) and self.muestras.total != self.total_graficado:
+            self.total_graficado = self.muestras.total
+            datos = self.muestras.vistas()
+            self.graficador.actualizar(datos['Tiempo'], datos)
+        self.id_grafica = self.root.after(500, self.actualizar_grafica)
+
+    def parametros_ensayo(self):
+        # Valores de los campos con los nombres del firmware, para el encabezado de la sesión
+        campos = {'R': 'R', 'r': 'r', 'RPM_D_i': 'RPM_inicial_Disco', 'RPM_D_f': 'RPM_final_Disco',
+                  'mu': 'Coeficiente_de_friccion', 'T': 'Tiempo_total', 'peso': 'Peso_aplicado'}
+        parametros = {}
+        for nombre, campo in campos.items():
+            try:
+                parametros[nombre] = float(getattr(self, campo + '_entry').get())
+            except ValueError:
+                pass
+        parametros['DIR_DISCO'] = self.dir_disco_var.get()
+        parametros['DIR_BOLA'] = self.dir_bola_var.get()
+        return parametros
+
+    def cargar_calibracion(self):
+        # Sin tabla (o sin calibración de torque) el torque queda como lo envía el equipo
         try:
-            while not stop_event.is_set():
-                try:
-                    line = self.ser.readline().decode('utf-8').strip()
-                    if line:
-                        # Mostrar mensajes y cálculos
-                        self.text_area.insert(END, line + '\n')
-                        self.text_area.see(END)
-                    if line.startswith("Tiempo:"):
-                        # Parsear la línea
-                        partes = line.split('|')
-                        tiempo = float(partes[0].split(':')[1].strip().split(' ')[0])
-                        duty_D = float(partes[2].split(':')[1].strip().split('%')[0])
-                        vel_D = float(partes[3].split(':')[1].strip().split(' ')[0])
-                        duty_B = float(partes[5].split(':')[1].strip().split('%')[0])
-                        vel_B = float(partes[6].split(':')[1].strip().split(' ')[0])
-                        torque = float(partes[7].split(':')[1].strip().split(' ')[0])
-                        T_pulse_D = float(partes[8].split(':')[1].strip().split(' ')[0])
-                        T_pulse_B = float(partes[9].split(':')[1].strip().split(' ')[0])
-
-                        # Agregar datos a la lista
-                        nuevo_dato = {
-                            'Tiempo': tiempo,
-                            'Duty Disco': duty_D,
-                            'Velocidad Disco': vel_D,
-                            'Duty Bola': duty_B,
-                            'Velocidad Bola': vel_B,
-                            'Torque': torque,
-                            'T_pulse_D': T_pulse_D,
-                            'T_pulse_B': T_pulse_B
-                        }
-                        datos_lista.append(nuevo_dato)
-
-                        # Si se excede el límite, eliminar la muestra más antigua
-                        if len(datos_lista) > limite_muestras:
-                            datos_lista.pop(0)
-
-                        # Actualizar tabla
-                        self.tree.insert('', END, values=(
-                            tiempo, duty_D, vel_D, duty_B, vel_B, torque, T_pulse_D, T_pulse_B
-                        ))
-
-                        # Autoscroll hacia la última fila
-                        self.tree.yview_moveto(1.0)
-
-                    # Actualizar los valores actuales en las etiquetas
-                    if datos_lista:
-                        self.valores_actuales['Velocidad Disco (m/s)'].config(text=f"{datos_lista[-1]['Velocidad Disco']:.2f}")
-                        self.valores_actuales['Velocidad Bola (m/s)'].config(text=f"{datos_lista[-1]['Velocidad Bola']:.2f}")
-                        self.valores_actuales['Torque (kg)'].config(text=f"{datos_lista[-1]['Torque']:.2f}")
-                        self.valores_actuales['Duty Disco (%)'].config(text=f"{datos_lista[-1]['Duty Disco']:.2f}")
-                        self.valores_actuales['Duty Bola (%)'].config(text=f"{datos_lista[-1]['Duty Bola']:.2f}")
-
-                except Exception as e:
-                    print(f"Error al leer línea: {e}")
+            self.calibrador.calibracion = calibracion_vigente(TABLA_CALIBRACION)
+        except (OSError, ValueError, KeyError) as e:
+            self.calibrador.calibracion = None
+            self.registro.escribir(f"No se pudo leer la calibración: {e}", ERROR)
+        if self.calibrador.calibracion is not None:
+            self.registro.escribir(f"Calibración aplicada: {self.calibrador.calibracion.describir()}")
+
+    def iniciar_grabacion(self):
+        # Cada START abre un archivo nuevo; las muestras se escriben desde el hilo lector
+        os.makedirs(CARPETA_SESIONES, exist_ok=True)
+        ruta = os.path.join(CARPETA_SESIONES, f"sesion_{time.strftime('%Y%m%d_%H%M%S')}{EXTENSION_SESION}")
+        self.grabador = GrabadorSesion(ruta, COLUMNAS_SESION, parametros=self.parametros_ensayo())
+        self.registro.escribir(f"Grabando sesión en {ruta}")
+
+    def cargar_receta(self):
+        ruta = filedialog.askopenfilename(filetypes=[("Recetas de ensayo", "*.json"), ("Todos los archivos", "*.*")])
+        if not ruta:
+            return
+        try:
+            self.receta = cargar_receta(ruta)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Error", f"No se pudo cargar la receta: {e}")
+            return
+        texto = f"{self.receta['nombre']}: {len(self.receta['pasos'])} pasos, {duracion_receta(self.receta) / 60:.1f} min"
+        self.secuencia_label.config(text=texto)
+        self.registro.escribir(f"Receta cargada: {texto}")
+
+    def ejecutar_secuencia(self):
+        if not self.ser or not self.ser.is_open:
+            messagebox.showerror("Error", "No está conectado al puerto serial.")
+            return
+        if not self.receta:
+            messagebox.showwarning("Advertencia", "Cargue una receta primero.")
+            return
+        if self.secuencia and self.secuencia.is_alive():
+            messagebox.showwarning("Advertencia", "La secuencia ya está en curso.")
+            return
+        try:
+            # Cada paso sale en una sola escritura (SET + START); sin SET MODO, que MTM Beta.ino no conoce
+            self.secuencia = EjecutorSecuencia(self.receta, self.canal.escribir)
+            self.marcador_pasos.secuencia = self.secuencia
+            self.paso_mostrado = -1
+            self.iniciar_lectura()
+            self.secuencia.start()
+            self.registro.escribir(f"Secuencia '{self.receta['nombre']}' iniciada.")
+            self.root.after(200, self.seguir_secuencia)
         except Exception as e:
-            messagebox.showerror("Error", f"Error en la lectura serial: {e}")
-
-    def actualizar_grafica(self, i):
-        if datos_lista:
-            datos = pd.DataFrame(datos_lista)
-            self.fig.clear()
-            ax1 = self.fig.add_subplot(3, 1, 1)
-            ax2 = self.fig.add_subplot(3, 1, 2)
-            ax3 = self.fig.add_subplot(3, 1, 3)
-
-            # Graficar Velocidades
-            ax1.plot(datos['Tiempo'], datos['Velocidad Disco'], label='Velocidad Disco (m/s)', color='blue')
-            ax1.plot(datos['Tiempo'], datos['Velocidad Bola'], label='Velocidad Bola (m/s)', color='green')
-            ax1.set_ylabel('Velocidad (m/s)')
-            ax1.legend()
-            ax1.grid(True)
-
-            # Graficar Torque (Celda de Carga)
-            ax2.plot(datos['Tiempo'], datos['Torque'], label='Torque (kg)', color='red')
-            ax2.set_ylabel('Torque (kg)')
-            ax2.legend()
-            ax2.grid(True)
-
-            # Graficar Duty Cycle
-            ax3.plot(datos['Tiempo'], datos['Duty Disco'], label='Duty Disco (%)', color='cyan')
-            ax3.plot(datos['Tiempo'], datos['Duty Bola'], label='Duty Bola (%)', color='magenta')
-            ax3.set_xlabel('Tiempo (s)')
-            ax3.set_ylabel('Duty Cycle (%)')
-            ax3.legend()
-            ax3.grid(True)
-
-            self.fig.tight_layout()
-            self.canvas.draw()
+            messagebox.showerror("Error", f"No se pudo iniciar la secuencia: {e}")
+
+    def seguir_secuencia(self):
+        # Corre en el hilo de Tk: muestra el paso en curso y aplica su peso al cálculo de μ
+        secuencia = self.secuencia
+        pasos = self.receta['pasos']
+        if secuencia.paso != self.paso_mostrado:
+            self.paso_mostrado = secuencia.paso
+            paso = pasos[secuencia.paso]
+            if self.derivador and paso['peso'] == paso['peso']:
+                self.derivador.peso = paso['peso']
+            self.registro.escribir(f"Paso {secuencia.paso + 1}/{len(pasos)}: {paso['rpm']:.1f} RPM, SRR {100 * paso['srr']:.2f} %, "
+                                   f"{paso['permanencia']:g} s{' - ' + paso['nota'] if paso['nota'] else ''}")
+        if secuencia.is_alive():
+            if secuencia.esperando:
+                texto = f"Paso {secuencia.paso + 2}: coloque la carga y pulse Continuar"
+            else:
+                texto = f"Paso {secuencia.paso + 1}/{len(pasos)}, resta {max(0.0, secuencia.fin_paso - time.monotonic()):.0f} s"
+            self.secuencia_label.config(text=texto)
+            self.root.after(200, self.seguir_secuencia)
+            return
+        # Terminada o detenida: el ejecutor ya envió STOP; se cierra la sesión como con "Detener Ensayo"
+        if secuencia.error:
+            self.registro.escribir(f"Secuencia interrumpida: {secuencia.error}", ERROR)
+        retraso = 1000 * max(secuencia.retrasos, default=0.0)
+        self.registro.escribir(f"Secuencia terminada: {len(secuencia.inicios)} de {len(pasos)} pasos, retraso máximo {retraso:.1f} ms")
+        self.secuencia_label.config(text=f"{self.receta['nombre']}: terminada ({len(secuencia.inicios)}/{len(pasos)} pasos)")
+        if self.lector and self.lector.is_alive():
+            self.detener_lectura()
+            self.iniciar_monitor()
+
+    def continuar_secuencia(self):
+        if self.secuencia and self.secuencia.esperando:
+            self.secuencia.continuar()
+
+    def detener_secuencia(self):
+        if self.secuencia and self.secuencia.is_alive():
+            self.secuencia.detener()  # El hilo envía STOP; seguir_secuencia cierra la sesión
+            self.registro.escribir("Secuencia detenida por el operador.")
+
+    def iniciar_monitor(self):
+        # Entre ensayos se sigue leyendo el puerto para las respuestas a los comandos (sin grabar ni graficar)
+        if self.ser and self.ser.is_open and not (self.lector and self.lector.is_alive()):
+            self.monitor = LectorSerial(self.ser, self.decodificador, self.cola_lotes, etapas=(self.canal, solo_mensajes))
+            self.monitor.start()
+
+    def detener_monitor(self):
+        if self.monitor:
+            self.monitor.detener()
+            self.monitor = None
+
+    def revisar_envios(self):
+        # Corre en el hilo de Tk: informa cada envío terminado del canal (confirmado, rechazado o sin respuesta)
+        while not self.envios_terminados.empty():
+            envio = self.envios_terminados.get_nowait()
+            for comando in envio.fallidos():
+                detalle = f": {comando.respuesta}" if comando.respuesta else f" ({comando.intentos} intentos)"
+                self.registro.escribir(f"El equipo no confirmó '{comando.linea}', {comando.estado}{detalle}", ERROR)
+            if envio.nombre and envio.confirmado and envio.latencia is not None:
+                self.registro.escribir(f"{envio.nombre}: confirmado por el equipo en {1000 * envio.latencia:.0f} ms")
+        # Un lector o grabador que se detuvo por un error deja el ensayo sin datos o sin archivo
+        fuentes = (("Lectura serial", self.lector), ("Lectura serial", self.monitor), ("Grabación de la sesión", self.grabador),
+                   ("Actualización de la interfaz", self.puente))
+        for aviso in self.aviso_errores.nuevos(fuentes):
+            self.registro.escribir(aviso, ERROR)
+        self.id_envios = self.root.after(100, self.revisar_envios)
+
+    def detener_lectura(self):
+        # El lector termina en a lo sumo ~50 ms (sin esperar el timeout del puerto)
+        if self.lector:
+            self.lector.detener()
+        if self.sincronizador and self.sincronizador.recibidas:
+            self.registro.escribir(f"Enlace: {self.sincronizador.resumen()}")
+        # Recién con el lector detenido se cierra el archivo (no quedan lotes por grabar)
+        if self.grabador:
+            self.grabador.cerrar()
 
     def cerrar(self):
-        stop_event.set()
-        if self.hilo_serial and self.hilo_serial.is_alive():
-            self.hilo_serial.join()
+        self.root.after_cancel(self.id_grafica)
+        self.root.after_cancel(self.id_envios)
+        self.puente.detener()
+        self.detener_lectura()
+        self.detener_monitor()
+        if self.canal:
+            self.canal.detener()
         if self.ser and self.ser.is_open:
             self.ser.close()
         self.root.destroy()
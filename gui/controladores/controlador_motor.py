@@ -1,30 +1,240 @@
+import queue
 import serial
+import threading
 import time
+from collections import deque
+
+import numpy as np
+
+from utilidades.lector_serial import LectorSerial
+from utilidades.telemetria import LoteTelemetria
 
 class ControladorMotor:
-    def __init__(self, puerto='/dev/ttyUSB0', baudrate=115200):
+    def __init__(self, puerto='/dev/ttyUSB0', baudrate=115200, timeout=1.0):
+        self.timeout = timeout  # Espera máxima por una respuesta a GET_TORQUE
+        self.lector = None
+        self.errores = 0  # Respuestas a GET_TORQUE faltantes o mal formadas, y el puerto que no abrió
+        self.error = None  # Sólo las fallas que dejan sin equipo (puerto)
         try:
-            self.serial_port = serial.Serial(puerto, baudrate, timeout=1)
+            self.serial_port = serial.Serial(puerto, baudrate, timeout=timeout)
         except serial.SerialException as e:
+            self.errores += 1
+            self.error = e
             print(f"Error al abrir el puerto serial: {e}")
             self.serial_port = None
+        if self.serial_port:
+            # Las respuestas se leen en bloques en un hilo aparte y llegan como listas de líneas
+            self.lector = LectorSerial(self.serial_port)
+            self.lector.start()
+        self._pendientes = []
+        self._adeudadas = 0  # Respuestas de GET_TORQUE vencidos que pueden llegar todavía (como en AdquisicionTorque)
+        self._descartar_hasta = 0.0
+        self.adquisicion = None
     
     def enviar_comando_motor1(self, rpm):
         if self.serial_port:
             comando = f'SET_RPM:{rpm}\n'
             self.serial_port.write(comando.encode())
     
+    def _siguiente_linea(self, limite):
+        while not self._pendientes:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return None
+            try:
+                self._pendientes.extend(self.lector.cola.get(timeout=restante))
+            except queue.Empty:
+                return None
+        return self._pendientes.pop(0)
+
+    def _descartar_respuestas(self):
+        # Lo recibido fuera de un pedido; cada TORQUE salda una respuesta adeudada
+        while not self.lector.cola.empty():
+            self._pendientes.extend(self.lector.cola.get_nowait())
+        for linea in self._pendientes:
+            if self._adeudadas and linea.startswith("TORQUE"):
+                self._adeudadas -= 1
+                self._descartar_hasta = time.monotonic() + self.timeout
+        self._pendientes = []
+
     def obtener_datos_torque(self):
+        if self.adquisicion and self.adquisicion.is_alive():
+            # Con la adquisición continua las respuestas son de ella: se devuelve la última muestra
+            return self.adquisicion.ultima
         if self.serial_port:
+            # La respuesta tardía de un pedido vencido se emparejaría con este: no se pide hasta que
+            # llegue (y se descarte) o pasen `timeout` segundos sin ella
+            self._descartar_respuestas()
+            if self._adeudadas:
+                if time.monotonic() < self._descartar_hasta:
+                    return {'tiempo': 0, 'torque': 0}
+                self._adeudadas = 0  # Se perdieron
             self.serial_port.write(b'GET_TORQUE\n')
-            respuesta = self.serial_port.readline().decode().strip()
-            if respuesta.startswith("TORQUE"):
+            respuesta = self._siguiente_linea(time.monotonic() + self.timeout)
+            if respuesta is None:
+                self._adeudadas += 1
+                self._descartar_hasta = time.monotonic() + self.timeout
+            if respuesta is not None and respuesta.startswith("TORQUE"):
                 try:
                     torque = float(respuesta.split(':')[1])
                     tiempo_actual = time.time()
                     return {'tiempo': tiempo_actual, 'torque': torque}
                 except ValueError:
+                    self.errores += 1
                     print("Error al interpretar los datos de torque.")
             else:
+                self.errores += 1
                 print("Datos de torque no válidos recibidos.")
         return {'tiempo': 0, 'torque': 0}
+
+    def iniciar_adquisicion(self, en_vuelo=4, periodo=0.0, callback=None, cola=None):
+        # Ver AdquisicionTorque; mientras corre, obtener_datos_torque no hace pedidos propios
+        if not self.serial_port:
+            return None
+        self.detener_adquisicion()
+        self.adquisicion = AdquisicionTorque(self.serial_port, self.lector.cola, en_vuelo, periodo, self.timeout, callback, cola)
+        self.adquisicion.start()
+        return self.adquisicion
+
+    def detener_adquisicion(self):
+        if self.adquisicion:
+            self.adquisicion.detener()
+            self.adquisicion = None
+
+    def cerrar(self):
+        self.detener_adquisicion()
+        if self.lector:
+            self.lector.detener()
+        if self.serial_port:
+            self.serial_port.close()
+
+
+class AdquisicionTorque(threading.Thread):
+    """Adquisición continua de torque con varios GET_TORQUE en vuelo.
+
+    En lugar de esperar cada respuesta antes del pedido siguiente, mantiene hasta
+    `en_vuelo` pedidos sin responder (uno nuevo sale en cuanto llega una respuesta o
+    cada `periodo` segundos si se fija un ritmo). El enlace serie entrega en orden, así
+    cada línea TORQUE se empareja con el pedido más antiguo; su tiempo es el punto medio
+    entre el envío y la llegada (segundos desde el inicio) y la ida y vuelta queda en
+    `latencias`. Un pedido sin respuesta en `timeout` segundos se da por perdido.
+    Las líneas TORQUE sin pedido pendiente (equipos que las envían solos) también se
+    toman, con el tiempo de llegada.
+
+    Las respuestas no llevan el número de pedido: si una llegara después de vencido su
+    pedido se emparejaría con el siguiente. Por eso, al vencer un pedido se dan por
+    perdidos todos los que están en vuelo y no se pide más hasta que llegan sus respuestas
+    tardías, que se descartan (se cuentan en `tardias`), o pasan `timeout` segundos sin
+    ninguna (se perdieron). Una respuesta con más atraso que eso no se distingue.
+
+    Cada bloque de respuestas se entrega como LoteTelemetria (Tiempo, Torque, Latencia y
+    Pedido, el número de pedido desde 1; NaN en las que llegan solas) en `cola` y, si se
+    indica, a `callback(lote)` desde este hilo. Las líneas TORQUE mal formadas se cuentan
+    en `errores` (y pasan a los mensajes del lote); si falla el puerto el hilo termina y
+    deja la excepción en `error`.
+    """
+
+    def __init__(self, puerto, respuestas, en_vuelo=4, periodo=0.0, timeout=1.0, callback=None, cola=None, espera=0.01):
+        super().__init__(name='AdquisicionTorque', daemon=True)
+        self.puerto = puerto
+        self.respuestas = respuestas  # Cola de listas de líneas del LectorSerial
+        self.en_vuelo = max(1, int(en_vuelo))
+        self.periodo = periodo
+        self.timeout = timeout
+        self.callback = callback
+        self.cola = cola if cola is not None else queue.Queue()
+        self.espera = espera
+        self.pedidos = 0
+        self.muestras = 0
+        self.perdidas = 0
+        self.tardias = 0
+        self.errores = 0
+        self.error = None
+        self.ultima = {'tiempo': 0, 'torque': 0}
+        self.latencias = deque(maxlen=1000)
+        self._enviados = deque()  # (número, instante de envío) de cada pedido sin respuesta
+        self._adeudadas = 0  # Respuestas de pedidos vencidos que pueden llegar todavía
+        self._descartar_hasta = 0.0  # Si no llegan hasta entonces, se dan por perdidas
+        self._detener = threading.Event()
+
+    def _pedir(self, ahora):
+        # Completa los pedidos en vuelo con una sola escritura
+        libres = self.en_vuelo - len(self._enviados)
+        if libres <= 0 or self._adeudadas:
+            return
+        if self.periodo:
+            # A ritmo fijo: a lo sumo un pedido por período
+            if ahora < self._proximo:
+                return
+            libres = 1
+            self._proximo = max(self._proximo + self.periodo, ahora)
+        self.puerto.write(b'GET_TORQUE\n' * libres)
+        self._enviados.extend((self.pedidos + k, ahora) for k in range(1, libres + 1))
+        self.pedidos += libres
+
+    def run(self):
+        # Lo que llegó antes de empezar no responde a ningún pedido de esta adquisición
+        while not self.respuestas.empty():
+            self.respuestas.get_nowait()
+        self.inicio = time.monotonic()
+        self._proximo = self.inicio
+        while not self._detener.is_set():
+            ahora = time.monotonic()
+            if self._enviados and ahora - self._enviados[0][1] > self.timeout:
+                # Su respuesta puede llegar todavía y correr el emparejamiento de los demás
+                self.perdidas += len(self._enviados)
+                self._adeudadas += len(self._enviados)
+                self._enviados.clear()
+                self._descartar_hasta = ahora + self.timeout
+            elif self._adeudadas and ahora >= self._descartar_hasta:
+                self._adeudadas = 0
+            try:
+                self._pedir(ahora)
+                lineas = self.respuestas.get(timeout=self.espera)
+            except queue.Empty:
+                continue
+            except (serial.SerialException, OSError) as e:
+                self.errores += 1
+                self.error = e
+                print(f"Error en la adquisición de torque: {e}")
+                break
+            self._procesar(lineas, time.monotonic())
+
+    def _procesar(self, lineas, llegada):
+        tiempos, torques, latencias, numeros, mensajes = [], [], [], [], []
+        for linea in lineas:
+            if not linea.startswith("TORQUE"):
+                mensajes.append(linea)
+                continue
+            try:
+                torque = float(linea.split(':')[1])
+            except (IndexError, ValueError):
+                self.errores += 1
+                mensajes.append(linea)
+                continue
+            if self._adeudadas:
+                self._adeudadas -= 1
+                self.tardias += 1
+                self._descartar_hasta = llegada + self.timeout
+                continue
+            numero, envio = self._enviados.popleft() if self._enviados else (np.nan, llegada)
+            tiempos.append((envio + llegada) / 2 - self.inicio)
+            torques.append(torque)
+            latencias.append(llegada - envio)
+            numeros.append(numero)
+        if not tiempos and not mensajes:
+            return
+        self.muestras += len(tiempos)
+        self.latencias.extend(latencias)
+        if tiempos:
+            self.ultima = {'tiempo': tiempos[-1], 'torque': torques[-1]}
+        lote = LoteTelemetria({'Tiempo': np.array(tiempos), 'Torque': np.array(torques), 'Latencia': np.array(latencias),
+                               'Pedido': np.array(numeros, dtype=np.float64)}, mensajes)
+        self.cola.put(lote)
+        if self.callback:
+            self.callback(lote)
+
+    def detener(self, timeout=1.0):
+        self._detener.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import requests
+
+from utilidades.flujo_torque import PUERTO_FLUJO, DecodificadorTorque, PuertoTCP
+from utilidades.lector_serial import LectorSerial
+
+
+class _EmisorConsigna(threading.Thread):
+    # Envía la consigna de un motor desde su propio hilo; sólo el último valor pedido sale
+    def __init__(self, controlador, ruta):
+        super().__init__(name=f'Consigna{ruta}', daemon=True)
+        self.controlador = controlador
+        self.ruta = ruta
+        self.descartadas = 0
+        self._condicion = threading.Condition()
+        self._valor = None
+        self._pedido_en = None
+        self._detener = False
+
+    def fijar(self, valor):
+        with self._condicion:
+            if self._valor is not None:
+                self.descartadas += 1  # Todavía no había salido: se reemplaza por la nueva
+            self._valor = valor
+            self._pedido_en = time.perf_counter()
+            self._condicion.notify()
+
+    def run(self):
+        while True:
+            with self._condicion:
+                while self._valor is None and not self._detener:
+                    self._condicion.wait()
+                if self._detener:
+                    return
+                valor, pedido_en = self._valor, self._pedido_en
+                self._valor = None
+            if self.controlador._pedir('get', self.ruta, params={'rpm': valor}) is not None:
+                self.controlador.latencias_consigna.append(time.perf_counter() - pedido_en)
+
+    def detener(self, timeout=1.0):
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+        self.join(timeout)
+
+
+class ControladorMotoresWiFi:
+    """Cliente HTTP del ESP32 (firmware/ESP32.lnk.ino) con conexiones persistentes.
+
+    Cada hilo que hace pedidos usa su propia requests.Session, así la conexión TCP se
+    reutiliza (keep-alive) en lugar de abrir una por pedido. Todos los pedidos tienen
+    `timeout` (conexión, lectura) en segundos. Un error de red no lanza excepción: se
+    cuenta en `errores`, queda en `ultimo_error` y el método devuelve None o False.
+
+    `fijar_velocidades` no espera respuesta: cada motor tiene un hilo emisor, así las
+    dos consignas viajan en paralelo. Si llega una consigna nueva antes de que salga la
+    anterior, la anterior se descarta (`consignas_descartadas`) y un equipo lento nunca
+    acumula consignas viejas. `tick` es la vuelta del modo de variación automática:
+    fija las velocidades y lee el torque; su duración queda en `latencias_tick`.
+
+    `iniciar_flujo` reemplaza la consulta de /get_torque por el flujo continuo del
+    equipo (utilidades.flujo_torque): un LectorSerial sobre la conexión TCP pone en
+    `cola` lotes con el tiempo medido por el ESP32, igual que las interfaces serie.
+    """
+
+    def __init__(self, ip_esp32='192.168.4.1:80', timeout=(0.5, 1.0), latencias_medidas=1000):  # Ajusta la IP para apuntar al ESP32
+        self.base_url = f'http://{ip_esp32}'
+        self.host = ip_esp32.split(':')[0]
+        self.lector_flujo = None
+        self.timeout = timeout
+        self.errores = 0
+        self.ultimo_error = None
+        self.latencias_tick = deque(maxlen=latencias_medidas)      # Segundos por tick
+        self.latencias_consigna = deque(maxlen=latencias_medidas)  # Segundos desde fijar hasta la respuesta
+        self._local = threading.local()
+        self._sesiones = []
+        self._bloqueo = threading.Lock()
+        self._emisores = {ruta: _EmisorConsigna(self, ruta) for ruta in ('/set_disco', '/set_bolita')}
+        for emisor in self._emisores.values():
+            emisor.start()
+
+    def _sesion(self):
+        sesion = getattr(self._local, 'sesion', None)
+        if sesion is None:
+            sesion = self._local.sesion = requests.Session()
+            with self._bloqueo:
+                self._sesiones.append(sesion)
+        return sesion
+
+    def _pedir(self, metodo, ruta, **kwargs):
+        # Devuelve la respuesta (status 200) o None si hubo un error de red o de estado
+        try:
+            respuesta = self._sesion().request(metodo, self.base_url + ruta, timeout=self.timeout, **kwargs)
+            respuesta.raise_for_status()
+            return respuesta
+        except requests.RequestException as e:
+            with self._bloqueo:
+                self.errores += 1
+                self.ultimo_error = e
+            return None
+
+    def set_velocidad_disco(self, velocidad):
+        return self._pedir('get', '/set_disco', params={'rpm': velocidad}) is not None
+
+    def set_velocidad_bolita(self, velocidad):
+        return self._pedir('get', '/set_bolita', params={'rpm': velocidad}) is not None
+
+    def set_torque(self, valor_torque):
+        return self._pedir('post', '/set_torque', data={'value': valor_torque}) is not None
+
+    def obtener_torque(self):
+        respuesta = self._pedir('get', '/get_torque')
+        if respuesta is None:
+            return None
+        try:
+            return float(respuesta.text)
+        except ValueError:
+            return None
+
+    def fijar_velocidades(self, disco=None, bolita=None):
+        # No bloquea: las consignas salen desde los hilos emisores
+        if disco is not None:
+            self._emisores['/set_disco'].fijar(disco)
+        if bolita is not None:
+            self._emisores['/set_bolita'].fijar(bolita)
+
+    @property
+    def consignas_descartadas(self):
+        return sum(emisor.descartadas for emisor in self._emisores.values())
+
+    def tick(self, disco=None, bolita=None):
+        inicio = time.perf_counter()
+        self.fijar_velocidades(disco, bolita)
+        torque = self.obtener_torque()
+        self.latencias_tick.append(time.perf_counter() - inicio)
+        return torque
+
+    def estadisticas_latencia(self):
+        # {'tick': ..., 'consigna': ...} con medio, p99 y máximo en milisegundos
+        estadisticas = {}
+        for nombre, latencias in (('tick', self.latencias_tick), ('consigna', self.latencias_consigna)):
+            if latencias:
+                ms = np.array(latencias) * 1e3
+                estadisticas[nombre] = {'medio': float(ms.mean()), 'p99': float(np.percentile(ms, 99)), 'maximo': float(ms.max())}
+        return estadisticas
+
+    def iniciar_flujo(self, cola, etapas=(), puerto=PUERTO_FLUJO):
+        # Lanza OSError si el equipo no acepta la conexión
+        self.detener_flujo()
+        conexion = PuertoTCP(self.host, puerto, timeout=self.timeout[0])
+        self.lector_flujo = LectorSerial(conexion, DecodificadorTorque(), cola, etapas=etapas)
+        self.lector_flujo.start()
+        return self.lector_flujo
+
+    def detener_flujo(self):
+        if self.lector_flujo:
+            self.lector_flujo.detener()
+            self.lector_flujo.puerto.close()
+            self.lector_flujo = None
+
+    def cerrar(self):
+        self.detener_flujo()
+        for emisor in self._emisores.values():
+            emisor.detener()
+        with self._bloqueo:
+            for sesion in self._sesiones:
+                sesion.close()
+            self._sesiones = []
@@ -0,0 +1,133 @@
+import threading
+import numpy as np
+
+
+class BufferMuestras:
+    """Buffer circular columnar de capacidad fija para las muestras de telemetría.
+
+    Cada muestra se escribe dos veces (en la posición i y en i + capacidad) para que
+    la ventana de las últimas muestras sea siempre un bloque contiguo: agregar y
+    descartar la muestra más antigua cuesta O(1) y las columnas se devuelven como
+    vistas de NumPy sin copiar.
+    """
+
+    def __init__(self, columnas, capacidad=1000, dtype=np.float64):
+        self.columnas = tuple(columnas)
+        self._indice = {nombre: j for j, nombre in enumerate(self.columnas)}
+        self._dtype = dtype
+        self._lock = threading.Lock()
+        self._reservar(int(capacidad))
+
+    def _reservar(self, capacidad):
+        if capacidad < 1:
+            raise ValueError("La capacidad del buffer debe ser al menos 1")
+        self.capacidad = capacidad
+        self._datos = np.full((len(self.columnas), 2 * capacidad), np.nan, dtype=self._dtype)
+        self._escritura = 0  # Próxima posición a escribir (0..capacidad-1)
+        self._cantidad = 0
+        self.total = 0  # Muestras agregadas desde el último reinicio (incluye las descartadas)
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, fila):
+        # fila: secuencia con un valor por columna, en el orden de self.columnas
+        with self._lock:
+            pos = self._escritura
+            self._datos[:, pos] = fila
+            self._datos[:, pos + self.capacidad] = fila
+            self._escritura = (pos + 1) % self.capacidad
+            self._cantidad = min(self._cantidad + 1, self.capacidad)
+            self.total += 1
+
+    def agregar_lote(self, columnas):
+        # columnas: dict {nombre: array} con la misma longitud; las columnas ausentes quedan en NaN
+        if not columnas:
+            return
+        n = len(next(iter(columnas.values())))
+        if n == 0:
+            return
+        bloque = np.full((len(self.columnas), n), np.nan, dtype=self._dtype)
+        for nombre, valores in columnas.items():
+            j = self._indice.get(nombre)
+            if j is not None:
+                bloque[j] = valores
+        with self._lock:
+            cap = self.capacidad
+            self.total += n
+            if n >= cap:
+                # Sólo sobreviven las últimas `capacidad` muestras del lote
+                bloque = bloque[:, n - cap:]
+                n = cap
+            pos = self._escritura
+            primero = min(n, cap - pos)
+            for desplazamiento in (0, cap):
+                self._datos[:, pos + desplazamiento:pos + desplazamiento + primero] = bloque[:, :primero]
+                if primero < n:
+                    self._datos[:, desplazamiento:desplazamiento + n - primero] = bloque[:, primero:]
+            self._escritura = (pos + n) % cap
+            self._cantidad = min(self._cantidad + n, cap)
+
+    def _ventana(self):
+        inicio = (self._escritura - self._cantidad) % self.capacidad
+        return inicio, inicio + self._cantidad
+
+    def columna(self, nombre):
+        # Vista (sin copia) de las muestras vigentes de una columna, de la más antigua a la más reciente
+        with self._lock:
+            inicio, fin = self._ventana()
+            return self._datos[self._indice[nombre], inicio:fin]
+
+    def vistas(self, nombres=None):
+        # Vistas consistentes de varias columnas tomadas bajo el mismo lock
+        nombres = self.columnas if nombres is None else nombres
+        with self._lock:
+            inicio, fin = self._ventana()
+            return {nombre: self._datos[self._indice[nombre], inicio:fin] for nombre in nombres}
+
+    def filas(self, desde=0, hasta=None):
+        # Bloque (n, columnas) de las filas [desde, hasta) de la ventana vigente, para tablas y exportación
+        with self._lock:
+            inicio, fin = self._ventana()
+            hasta = self._cantidad if hasta is None else min(hasta, self._cantidad)
+            desde = max(0, min(desde, hasta))
+            return self._datos[:, inicio + desde:inicio + hasta].T
+
+    def ultima(self):
+        # Última muestra como dict, o None si el buffer está vacío
+        with self._lock:
+            if self._cantidad == 0:
+                return None
+            pos = (self._escritura - 1) % self.capacidad
+            return {nombre: float(self._datos[j, pos]) for nombre, j in self._indice.items()}
+
+    def limpiar(self):
+        # O(1): sólo se reinician los índices, los datos viejos quedan fuera de la ventana
+        with self._lock:
+            self._escritura = 0
+            self._cantidad = 0
+            self.total = 0
+
+    def redimensionar(self, capacidad):
+        # Cambia la capacidad conservando las muestras más recientes que entren
+        capacidad = int(capacidad)
+        with self._lock:
+            if capacidad == self.capacidad:
+                return
+            inicio, fin = self._ventana()
+            vigentes = self._datos[:, max(inicio, fin - capacidad):fin].copy()
+            total = self.total
+            self._reservar(capacidad)
+            n = vigentes.shape[1]
+            self._datos[:, :n] = vigentes
+            self._datos[:, capacidad:capacidad + n] = vigentes
+            self._escritura = n % capacidad
+            self._cantidad = n
+            self.total = total
+
+    def como_dict(self, ultimas=None):
+        # Copia de las columnas (opcionalmente sólo las últimas N muestras), apta para pandas/CSV
+        datos = self.vistas()
+        if ultimas is not None:
+            datos = {nombre: valores[-ultimas:] for nombre, valores in datos.items()}
+        return {nombre: valores.copy() for nombre, valores in datos.items()}
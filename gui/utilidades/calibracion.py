@@ -0,0 +1,218 @@
+import json
+import os
+import time
+
+import numpy as np
+
+# Calibración del lado de la PC: un modelo crudo -> referencia ajustado con los puntos de una o
+# varias sesiones de calibración, guardado como una versión más en una tabla JSON. El firmware
+# sigue enviando scale.get_units() con su factor fijo; la calibración corrige ese valor en cada
+# lote (CalibradorColumna) o sobre una grabación completa (calibrar_columnas).
+#   lineal      y = a·x + b
+#   polinomio   y = polinomio de grado `grado` (np.polyval, Horner vectorizado)
+#   tramos      lineal por tramos continuo con `tramos` segmentos (nodos en cuantiles de x;
+#               np.interp dentro del rango y la recta del tramo extremo fuera de él)
+MODELOS = ('lineal', 'polinomio', 'tramos')
+FORMATO_TABLA = 2  # 2: cada calibración guarda las unidades del valor crudo y del calibrado
+SUFIJO_CRUDO = ' Crudo'  # 'Torque' calibrado se graba junto a 'Torque Crudo', el valor del equipo
+# Unidad en que el equipo envía cada sensor: la calibración se aplica en vivo sobre esa columna y
+# el resultado la reemplaza, así que el valor crudo y el calibrado tienen que estar en esa unidad
+UNIDADES = {'Torque': 'kg'}
+
+
+class Calibracion:
+    """Modelo de calibración de un sensor (`sensor` es la columna de telemetría que corrige).
+
+    `aplicar` trabaja sobre arrays completos; `estadisticas` guarda cómo salió el ajuste
+    (puntos usados y descartados, error RMS, rango de x calibrado y sesiones de origen).
+    `unidad_cruda` y `unidad` son las del valor crudo y el calibrado (por omisión, la del
+    sensor en UNIDADES).
+    """
+
+    def __init__(self, modelo, coeficientes=(), nodos=((), ()), sensor='Torque', version=0, fecha=None, estadisticas=None,
+                 unidad_cruda=None, unidad=None):
+        if modelo not in MODELOS:
+            raise ValueError(f"Modelo de calibración desconocido: {modelo}")
+        self.modelo = modelo
+        self.coeficientes = np.asarray(coeficientes, dtype=np.float64)
+        self.nodos = (np.asarray(nodos[0], dtype=np.float64), np.asarray(nodos[1], dtype=np.float64))
+        self.sensor = sensor
+        self.version = version
+        self.fecha = fecha if fecha is not None else time.strftime('%Y-%m-%d %H:%M:%S')
+        self.estadisticas = estadisticas or {}
+        self.unidad_cruda = UNIDADES.get(sensor, '') if unidad_cruda is None else unidad_cruda
+        self.unidad = UNIDADES.get(sensor, '') if unidad is None else unidad
+
+    def aplicar(self, valores):
+        x = np.asarray(valores, dtype=np.float64)
+        if self.modelo != 'tramos':
+            return np.polyval(self.coeficientes, x)
+        nodos_x, nodos_y = self.nodos
+        y = np.interp(x, nodos_x, nodos_y)
+        # Fuera del rango calibrado se sigue la recta del primer o del último tramo
+        pendientes = np.diff(nodos_y) / np.diff(nodos_x)
+        abajo, arriba = x < nodos_x[0], x > nodos_x[-1]
+        if abajo.any():
+            y[abajo] = nodos_y[0] + pendientes[0] * (x[abajo] - nodos_x[0])
+        if arriba.any():
+            y[arriba] = nodos_y[-1] + pendientes[-1] * (x[arriba] - nodos_x[-1])
+        return y
+
+    def como_dict(self):
+        datos = {'version': self.version, 'sensor': self.sensor, 'fecha': self.fecha, 'modelo': self.modelo,
+                 'unidad_cruda': self.unidad_cruda, 'unidad': self.unidad}
+        if self.modelo == 'tramos':
+            datos['nodos'] = [self.nodos[0].tolist(), self.nodos[1].tolist()]
+        else:
+            datos['coeficientes'] = self.coeficientes.tolist()
+        datos['estadisticas'] = self.estadisticas
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos):
+        # Las tablas de formato 1 no guardaban unidades: quedan vacías y verificar_unidades las rechaza
+        return cls(datos['modelo'], datos.get('coeficientes', ()), datos.get('nodos', ((), ())), datos.get('sensor', 'Torque'),
+                   datos.get('version', 0), datos.get('fecha'), datos.get('estadisticas'), datos.get('unidad_cruda', ''),
+                   datos.get('unidad', ''))
+
+    def describir(self):
+        if self.modelo == 'tramos':
+            detalle = f"{len(self.nodos[0]) - 1} tramos"
+        else:
+            detalle = ', '.join(f"{c:.6g}" for c in self.coeficientes)
+        return (f"{self.sensor} v{self.version} ({self.modelo} {self.unidad_cruda} -> {self.unidad}: {detalle}; "
+                f"RMS {self.estadisticas.get('rms', float('nan')):.4g})")
+
+
+def verificar_unidades(calibracion):
+    # ValueError si la calibración no va de la unidad del sensor a la misma unidad
+    esperada = UNIDADES.get(calibracion.sensor)
+    if esperada is None or calibracion.unidad_cruda == calibracion.unidad == esperada:
+        return
+    raise ValueError(f"La calibración {calibracion.sensor} v{calibracion.version} va de "
+                     f"'{calibracion.unidad_cruda or 'sin unidad'}' a '{calibracion.unidad or 'sin unidad'}', pero el equipo "
+                     f"envía {calibracion.sensor} en {esperada}; vuelva a calibrar con script_calibración.py")
+
+
+def _ajustar_modelo(x, y, modelo, grado, tramos):
+    # Devuelve (coeficientes, nodos) del modelo por mínimos cuadrados
+    if modelo == 'lineal':
+        return np.polyfit(x, y, 1), ((), ())
+    if modelo == 'polinomio':
+        return np.polyfit(x, y, grado), ((), ())
+    # Lineal por tramos continuo: base [1, x, max(x - k, 0) por nodo interior]
+    nodos_x = np.unique(np.quantile(x, np.linspace(0, 1, tramos + 1)))
+    if len(nodos_x) < 2:
+        raise ValueError("Los puntos de calibración no cubren un rango de valores crudos")
+    base = np.column_stack([np.ones_like(x), x] + [np.maximum(x - k, 0.0) for k in nodos_x[1:-1]])
+    solucion = np.linalg.lstsq(base, y, rcond=None)[0]
+    nodos_y = solucion[0] + solucion[1] * nodos_x + sum(c * np.maximum(nodos_x - k, 0.0) for c, k in zip(solucion[2:], nodos_x[1:-1]))
+    return (), (nodos_x, nodos_y)
+
+
+def ajustar_calibracion(crudo, referencia, modelo='lineal', grado=2, tramos=4, umbral=3.5, max_iteraciones=20, sensor='Torque', sesiones=(),
+                        unidad_cruda=None, unidad=None):
+    """Ajusta `modelo` a los pares (crudo, referencia) descartando puntos atípicos.
+
+    En cada iteración se ajusta con los puntos aceptados y se descartan los que tienen un
+    residuo a más de `umbral` desviaciones robustas (MAD · 1.4826) de la mediana; se repite
+    hasta que el conjunto no cambia. Devuelve una Calibracion (versión 0 hasta guardarla).
+    """
+    x = np.asarray(crudo, dtype=np.float64)
+    y = np.asarray(referencia, dtype=np.float64)
+    validos = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[validos], y[validos]
+    minimo = {'lineal': 2, 'polinomio': grado + 1, 'tramos': tramos + 1}[modelo]
+    if len(x) < minimo:
+        raise ValueError(f"El modelo {modelo} necesita al menos {minimo} puntos de calibración")
+
+    aceptados = np.ones(len(x), dtype=bool)
+    for _ in range(max_iteraciones):
+        coeficientes, nodos = _ajustar_modelo(x[aceptados], y[aceptados], modelo, grado, tramos)
+        residuos = y - Calibracion(modelo, coeficientes, nodos).aplicar(x)
+        centro = np.median(residuos[aceptados])
+        escala = 1.4826 * np.median(np.abs(residuos[aceptados] - centro))
+        if escala == 0:
+            break
+        nuevos = np.abs(residuos - centro) <= umbral * escala
+        if nuevos.sum() < minimo or np.array_equal(nuevos, aceptados):
+            break
+        aceptados = nuevos
+    residuos = residuos[aceptados]
+    estadisticas = {'puntos': int(aceptados.sum()), 'descartados': int((~aceptados).sum()),
+                    'rms': float(np.sqrt(np.mean(residuos ** 2))), 'error_maximo': float(np.max(np.abs(residuos))),
+                    'rango': [float(x[aceptados].min()), float(x[aceptados].max())], 'sesiones': list(sesiones)}
+    calibracion = Calibracion(modelo, coeficientes, nodos, sensor, estadisticas=estadisticas, unidad_cruda=unidad_cruda, unidad=unidad)
+    calibracion.aceptados = aceptados  # Máscara sobre los puntos válidos, para graficar los descartados
+    return calibracion
+
+
+def cargar_tabla(ruta):
+    # Todas las versiones guardadas (de todos los sensores), en el orden en que se agregaron
+    if not os.path.exists(ruta):
+        return []
+    with open(ruta, encoding='utf-8') as archivo:
+        tabla = json.load(archivo)
+    if tabla.get('formato', 0) > FORMATO_TABLA:
+        raise ValueError(f"Formato de tabla de calibración no soportado: {tabla.get('formato')}")
+    return [Calibracion.desde_dict(datos) for datos in tabla.get('calibraciones', [])]
+
+
+def guardar_calibracion(ruta, calibracion):
+    # Agrega la calibración como la versión siguiente de su sensor; las anteriores quedan en la tabla
+    verificar_unidades(calibracion)
+    calibraciones = cargar_tabla(ruta)
+    calibracion.version = 1 + max((c.version for c in calibraciones if c.sensor == calibracion.sensor), default=0)
+    calibraciones.append(calibracion)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump({'formato': FORMATO_TABLA, 'calibraciones': [c.como_dict() for c in calibraciones]},
+                  archivo, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    return calibracion.version
+
+
+def calibracion_vigente(ruta, sensor='Torque', version=None):
+    # La última versión del sensor (o la pedida); None si la tabla no existe o no la tiene. ValueError si
+    # sus unidades no son las del sensor (p. ej. un ajuste de cuentas del ADC a N·m)
+    candidatas = [c for c in cargar_tabla(ruta) if c.sensor == sensor and (version is None or c.version == version)]
+    if not candidatas:
+        return None
+    verificar_unidades(candidatas[-1])
+    return candidatas[-1]
+
+
+def calibrar_columnas(columnas, calibracion, tara='Tara'):
+    # Calibra una grabación completa (dict de columnas). Si tiene la columna cruda (grabada con
+    # CalibradorColumna) se parte de ella, así recalibrar con otra versión no acumula correcciones.
+    # Si tiene la columna `tara` (CompensadorTara) se le vuelve a restar, como en el ensayo;
+    # tara=None para sensores que no se compensan
+    crudo = columnas.get(calibracion.sensor + SUFIJO_CRUDO, columnas[calibracion.sensor])
+    resultado = dict(columnas)
+    resultado[calibracion.sensor + SUFIJO_CRUDO] = np.asarray(crudo)
+    resultado[calibracion.sensor] = calibracion.aplicar(crudo)
+    if tara is not None and tara in columnas:
+        resultado[calibracion.sensor] = resultado[calibracion.sensor] - np.asarray(columnas[tara], dtype=np.float64)
+    return resultado
+
+
+class CalibradorColumna:
+    """Etapa de LectorSerial que reemplaza `columna` por su valor calibrado.
+
+    El valor enviado por el equipo se conserva en `columna + ' Crudo'` (se graba en la
+    sesión). Con `calibracion` None la columna pasa sin cambios; se puede reemplazar
+    durante el ensayo.
+    """
+
+    def __init__(self, calibracion, columna='Torque'):
+        self.calibracion = calibracion
+        self.columna = columna
+        self.crudo = columna + SUFIJO_CRUDO
+
+    def __call__(self, lote):
+        calibracion = self.calibracion
+        valores = lote.columnas[self.columna]
+        lote.columnas[self.crudo] = valores
+        if calibracion is not None:
+            lote.columnas[self.columna] = calibracion.aplicar(valores)
+        return lote
@@ -0,0 +1,303 @@
+import queue
+import re
+import threading
+import time
+
+from utilidades.telemetria import LoteTelemetria
+
+# Estados de un Comando
+PENDIENTE = 'pendiente'
+CONFIRMADO = 'confirmado'
+RECHAZADO = 'rechazado'
+SIN_RESPUESTA = 'sin respuesta'
+ENVIADO = 'enviado'  # El protocolo no define respuesta para esta línea: basta con escribirla
+CANCELADO = 'cancelado'
+ERROR_ESCRITURA = 'error de escritura'
+
+TIMEOUT_COMANDO = 0.5  # Segundos que se espera la respuesta antes de reenviar
+REINTENTOS_COMANDO = 2
+
+
+def respuestas_mtm(linea, reenvio=False):
+    # (confirmaciones, rechazos) de MTM_Epsilon_12.11_Dutty_Aumentado.ino: expresiones regulares que se
+    # comparan con el comienzo de cada línea de respuesta. Confirmar exige una línea por cada grupo
+    # (cualquiera de sus alternativas); un rechazo basta para descartar el comando
+    rechazos = [f"Comando desconocido: {re.escape(linea)}$"]
+    if linea.startswith('SET'):
+        nombres = re.findall(r'(\w+)=', linea)
+        # Un eco "NOMBRE actualizado a: valor" por par; el firmware rechaza los nombres que no conoce
+        return [(f"{nombre} actualizado a:",) for nombre in nombres], [f"Parametro desconocido: {nombre}$" for nombre in nombres]
+    if linea.startswith('START'):
+        if reenvio:
+            # El primer envío pudo llegar aunque se perdiera su respuesta
+            return [("Iniciando aceleración", "La aceleración ya está en curso")], rechazos
+        return [("Iniciando aceleración",)], rechazos + ["La aceleración ya está en curso"]
+    if linea.startswith('STOP'):
+        return [("Iniciando desaceleración", "Motores ya están detenidos")], rechazos
+    if linea.startswith('STATUS'):
+        return [("=== Estado Actual ===",)], rechazos
+    return [], []
+
+
+def respuestas_cerate(linea, reenvio=False):
+    # Lo mismo para cambiadordeRes.ino (interfazCERATE.py): MSPR, S, P, AL, AS y M de cada motor. Los
+    # errores se distinguen por su texto, así no se atribuyen a otro comando en vuelo
+    rechazos = ["Comando no reconocido"]
+    motor = linea[2:3] if linea[:2] in ('AL', 'AS') else linea[1:2]
+    if linea.startswith('MSPR'):
+        return [("microstepsPerRevolution actualizado a",)], rechazos + ["Error: Valor de microstepsPerRevolution"]
+    if linea[:1] == 'S':
+        return [(f"Estableciendo velocidad continua en el Motor {motor}",)], rechazos
+    if linea[:1] == 'P':
+        return [(f"Motor {motor} detenido",)], rechazos
+    if linea[:2] in ('AL', 'AS'):
+        return [(f"Acelerando el Motor {motor} de",)], rechazos + ["Error: Tiempo inválido", f"Error: Formato incorrecto. Use AL{motor}"]
+    if linea[:1] == 'M':
+        return [(f"Moviendo Motor {motor}",)], rechazos + ["Error: Valores inválidos", f"Error: Formato incorrecto. Use M{motor}"]
+    return [], []
+
+
+def reenviable_cerate(linea):
+    # Sólo se reenvían los comandos idempotentes de cambiadordeRes.ino: MSPR, S (velocidad) y P.
+    # M (movimiento relativo) y AL/AS (rampas) repetidos moverían de más o reiniciarían la rampa
+    return linea.startswith('MSPR') or linea[:1] in ('S', 'P')
+
+
+def solo_mensajes(lote):
+    # Etapa para leer el puerto entre ensayos: pasa las respuestas del equipo y descarta las muestras
+    return LoteTelemetria({nombre: valores[:0] for nombre, valores in lote.columnas.items()}, lote.mensajes)
+
+
+class Comando:
+    """Una línea enviada al equipo y lo que se sabe de su respuesta.
+
+    `estado` pasa de PENDIENTE a CONFIRMADO, RECHAZADO, SIN_RESPUESTA (tras `reintentos`
+    reenvíos sin respuesta), ENVIADO (sin respuesta definida), CANCELADO o ERROR_ESCRITURA.
+    `latencia` son los segundos entre la última escritura y la respuesta que lo confirmó.
+    """
+
+    def __init__(self, linea, timeout=TIMEOUT_COMANDO, reintentos=REINTENTOS_COMANDO):
+        self.linea = linea
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.estado = PENDIENTE
+        self.intentos = 0
+        self.enviado = None  # reloj() de la última escritura
+        self.latencia = None
+        self.respuestas = []  # Líneas del equipo que corresponden a este comando
+        self._faltan = []
+        self._rechazos = []
+
+    @property
+    def respuesta(self):
+        return self.respuestas[-1] if self.respuestas else ''
+
+    def preparar(self, protocolo, ahora):
+        # Antes de cada escritura: qué respuestas lo confirman o lo rechazan en este intento
+        confirmaciones, rechazos = protocolo(self.linea, self.intentos > 0)
+        self._faltan = [[re.compile(patron) for patron in grupo] for grupo in confirmaciones]
+        self._rechazos = [re.compile(patron) for patron in rechazos]
+        self.intentos += 1
+        self.enviado = ahora
+        if not self._faltan:
+            self.estado = ENVIADO
+
+    def recibir(self, mensaje, ahora):
+        # True si `mensaje` es una respuesta a este comando (y la consume)
+        for grupo in self._faltan:
+            if any(patron.match(mensaje) for patron in grupo):
+                self._faltan.remove(grupo)
+                self.respuestas.append(mensaje)
+                if not self._faltan:
+                    self.estado = CONFIRMADO
+                    self.latencia = ahora - self.enviado
+                return True
+        if any(patron.match(mensaje) for patron in self._rechazos):
+            self.respuestas.append(mensaje)
+            self.estado = RECHAZADO
+            return True
+        return False
+
+
+class EnvioComandos:
+    # Las líneas de una llamada a CanalComandos.enviar, que salen juntas en una escritura
+    def __init__(self, comandos, nombre=''):
+        self.comandos = comandos
+        self.nombre = nombre
+        self.error = None
+        self._listo = threading.Event()
+
+    @property
+    def terminado(self):
+        return self._listo.is_set()
+
+    def esperar(self, timeout=None):
+        return self._listo.wait(timeout)
+
+    @property
+    def confirmado(self):
+        return all(comando.estado in (CONFIRMADO, ENVIADO) for comando in self.comandos)
+
+    def fallidos(self):
+        return [comando for comando in self.comandos if comando.estado not in (CONFIRMADO, ENVIADO)]
+
+    @property
+    def latencia(self):
+        latencias = [comando.latencia for comando in self.comandos if comando.latencia is not None]
+        return max(latencias) if latencias else None
+
+
+class CanalComandos(threading.Thread):
+    """Hilo que escribe los comandos al equipo y sigue sus respuestas.
+
+    `enviar(lineas)` vuelve enseguida: el hilo junta las líneas en una sola escritura
+    (`escribir`, p. ej. serial.Serial.write) y las respuestas del equipo le llegan como
+    etapa de LectorSerial (o con `recibir(mensajes)`). Cada línea se confirma con las
+    respuestas que define `protocolo` (respuestas_mtm o respuestas_cerate); si no llegan
+    en `timeout` segundos se reenvía, hasta `reintentos` veces, salvo que `reenviable(linea)`
+    diga que repetirlo no es seguro (p. ej. reenviable_cerate). Los envíos no esperan a
+    los anteriores, así una secuencia sale a horario aunque un comando esté reintentando;
+    las respuestas se asignan al comando más antiguo que las espera.
+
+    Al terminar cada envío (confirmado o no) se llama a `avisar(envio)` desde este hilo
+    o desde el lector. `latencias`, `reenvios` y `fallidos` acumulan las estadísticas.
+    `escribir(datos)` tiene la forma de serial.Serial.write, para EjecutorSecuencia.
+    """
+
+    def __init__(self, escribir, protocolo=respuestas_mtm, timeout=TIMEOUT_COMANDO, reintentos=REINTENTOS_COMANDO,
+                 avisar=None, reloj=time.monotonic, reenviable=None):
+        super().__init__(name='CanalComandos', daemon=True)
+        self.salida = escribir
+        self.protocolo = protocolo
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.reenviable = reenviable
+        self.avisar = avisar
+        self.reloj = reloj
+        self.latencias = []
+        self.reenvios = 0
+        self.fallidos = 0
+        self._cola = queue.Queue()
+        self._en_vuelo = []  # Comandos PENDIENTE, el más antiguo primero
+        self._envios = []    # EnvioComandos escritos y sin terminar
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+
+    def enviar(self, lineas, nombre='', timeout=None, reintentos=None):
+        timeout = self.timeout if timeout is None else timeout
+        reintentos = self.reintentos if reintentos is None else reintentos
+        lineas = [linea.strip() for linea in lineas if linea.strip()]
+        envio = EnvioComandos([Comando(linea, timeout, reintentos if self.reenviable is None or self.reenviable(linea) else 0)
+                               for linea in lineas], nombre)
+        self._cola.put(envio)
+        return envio
+
+    def escribir(self, datos):
+        self.enviar(bytes(datos).decode().splitlines())
+        return len(datos)
+
+    def recibir(self, mensajes):
+        if not mensajes:
+            return
+        ahora = self.reloj()
+        with self._lock:
+            if not self._en_vuelo:
+                return
+            for mensaje in mensajes:
+                for comando in self._en_vuelo:
+                    if comando.recibir(mensaje, ahora):
+                        break
+            self._terminar_envios()
+
+    def __call__(self, lote):
+        # Etapa de LectorSerial: mira las líneas de texto del lote y lo deja igual
+        self.recibir(lote.mensajes)
+        return lote
+
+    def detener(self, timeout=1.0):
+        self._detener.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def resumen(self):
+        # Texto corto para el registro
+        if not self.latencias:
+            return f"{self.fallidos} comandos sin confirmar"
+        media = 1000 * sum(self.latencias) / len(self.latencias)
+        return (f"{len(self.latencias)} confirmados, latencia media {media:.1f} ms (máx {1000 * max(self.latencias):.1f} ms), "
+                f"{self.reenvios} reenvíos, {self.fallidos} sin confirmar")
+
+    def run(self):
+        while not self._detener.is_set():
+            with self._lock:
+                vencimiento = min((comando.enviado + comando.timeout for comando in self._en_vuelo), default=None)
+            espera = 0.1 if vencimiento is None else min(0.1, max(0.0, vencimiento - self.reloj()))
+            try:
+                envio = self._cola.get(timeout=espera) if espera > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                envio = None
+            with self._lock:
+                if envio is not None:
+                    self._envios.append(envio)
+                    self._escribir(envio.comandos)
+                self._reenviar_vencidos()
+                self._terminar_envios()
+        # Lo que quedó sin respuesta o sin escribir no se confirma
+        with self._lock:
+            while not self._cola.empty():
+                self._envios.append(self._cola.get_nowait())
+            for envio in self._envios:
+                for comando in envio.comandos:
+                    if comando.estado == PENDIENTE:
+                        comando.estado = CANCELADO
+            self._en_vuelo = []
+            self._terminar_envios()
+
+    def _escribir(self, comandos):
+        # Con el lock tomado: los comandos quedan en vuelo antes de escribir, así una respuesta
+        # inmediata ya los encuentra
+        ahora = self.reloj()
+        for comando in comandos:
+            comando.preparar(self.protocolo, ahora)
+            if comando.estado == PENDIENTE:
+                self._en_vuelo.append(comando)
+        try:
+            self.salida(''.join(comando.linea + '\n' for comando in comandos).encode())
+        except Exception as e:
+            for comando in comandos:
+                comando.estado = ERROR_ESCRITURA
+            for envio in self._envios:
+                if any(comando in envio.comandos for comando in comandos):
+                    envio.error = e
+
+    def _reenviar_vencidos(self):
+        ahora = self.reloj()
+        vencidos = [comando for comando in self._en_vuelo if ahora >= comando.enviado + comando.timeout]
+        if not vencidos:
+            return
+        reenviar = []
+        for comando in vencidos:
+            self._en_vuelo.remove(comando)
+            if comando.intentos <= comando.reintentos:
+                reenviar.append(comando)
+            else:
+                comando.estado = SIN_RESPUESTA
+        if reenviar:
+            self.reenvios += len(reenviar)
+            # Al final de la fila: su respuesta llega después de las de los comandos escritos antes
+            self._escribir(reenviar)
+
+    def _terminar_envios(self):
+        # Con el lock tomado
+        self._en_vuelo = [comando for comando in self._en_vuelo if comando.estado == PENDIENTE]
+        terminados = [envio for envio in self._envios if all(comando.estado != PENDIENTE for comando in envio.comandos)]
+        for envio in terminados:
+            self._envios.remove(envio)
+            for comando in envio.comandos:
+                if comando.latencia is not None:
+                    self.latencias.append(comando.latencia)
+                elif comando.estado != ENVIADO:
+                    self.fallidos += 1
+            envio._listo.set()
+            if self.avisar:
+                self.avisar(envio)
@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def decimar_minmax(x, y, columnas):
+    """Reduce (x, y) a lo sumo a ~2*columnas puntos conservando el mínimo y el máximo de cada tramo.
+
+    Las muestras se agrupan en `columnas` tramos consecutivos de igual cantidad de muestras
+    (con muestreo aproximadamente uniforme, un tramo por columna de píxeles). De cada tramo
+    se conservan el mínimo y el máximo en orden temporal, así que los picos de torque siguen
+    siendo visibles aunque se dibuje una fracción de los puntos. Los NaN se ignoran.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    columnas = max(1, int(columnas))
+    if n <= 2 * columnas:
+        return x, y
+    tam = -(-n // columnas)  # Muestras por tramo (redondeo hacia arriba)
+    completos = n // tam
+    indices = [_indices_extremos(y[:completos * tam].reshape(completos, tam), 0)]
+    if completos * tam < n:
+        # Tramo final incompleto
+        indices.append(_indices_extremos(y[completos * tam:].reshape(1, -1), completos * tam))
+    indices = np.concatenate(indices)
+    return x[indices], y[indices]
+
+
+def _indices_extremos(tramos, base):
+    # Índices (en orden temporal) del mínimo y el máximo de cada fila de `tramos`
+    nan = np.isnan(tramos)
+    if nan.any():
+        i_min = np.where(nan, np.inf, tramos).argmin(axis=1)
+        i_max = np.where(nan, -np.inf, tramos).argmax(axis=1)
+    else:
+        i_min = tramos.argmin(axis=1)
+        i_max = tramos.argmax(axis=1)
+    inicio = base + np.arange(tramos.shape[0]) * tramos.shape[1]
+    pares = np.stack([np.minimum(i_min, i_max), np.maximum(i_min, i_max)], axis=1) + inicio[:, None]
+    return pares.ravel()
@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+
+from utilidades.lector_serial import DivisorLineas
+
+
+class CerateDecoder(DivisorLineas):
+    # Corre en el hilo lector: separa líneas y decodifica "Torque:x,RPM1:y,RPM2:z" con la hora de llegada.
+    # Si la línea trae ",Seq:n,Millis:m" y hay un SincronizadorReloj, el tiempo sale del reloj del equipo
+    # alineado con el de la PC (sin el jitter del buffer serie) y el sincronizador cuenta las líneas perdidas.
+    # Con un CompensadorTara(velocidades=('RPM1', 'RPM2')) se resta al torque la tara medida con ambos motores
+    # detenidos (el firmware envía cada 100 ms también en reposo) y su deriva
+    def __init__(self, start_time, synchronizer=None, tare=None):
+        super().__init__()
+        self.start_time = start_time
+        self.synchronizer = synchronizer
+        self.tare = tare
+
+    def alimentar(self, datos):
+        lines = super().alimentar(datos)
+        timestamp = time.time() - self.start_time
+        samples = [self.parse_data(line, timestamp) if line.startswith("Torque:") else None for line in lines]
+        if self.synchronizer is not None:
+            self.align_samples(lines, samples)
+        if self.tare is not None:
+            self.compensate_tare(samples)
+        return list(zip(lines, samples))
+
+    def compensate_tare(self, samples):
+        indices = [i for i, sample in enumerate(samples) if sample is not None]
+        if not indices:
+            return
+        times, torque, rpm1, rpm2 = (np.array(values) for values in zip(*(samples[i] for i in indices)))
+        idle = self.tare.en_reposo({'Torque': torque, 'RPM1': rpm1, 'RPM2': rpm2})
+        corrected = torque - self.tare.corregir(torque, idle, times)
+        for i, value in zip(indices, corrected.tolist()):
+            samples[i] = (samples[i][0], value) + samples[i][2:]
+
+    def align_samples(self, lines, samples):
+        indices, sequences, millis = [], [], []
+        for i, (line, sample) in enumerate(zip(lines, samples)):
+            clock = self.parse_clock(line) if sample is not None else None
+            if clock is not None:
+                indices.append(i)
+                sequences.append(clock[0])
+                millis.append(clock[1])
+        if not indices:
+            return
+        hours = self.synchronizer.observar(sequences, millis)
+        for i, hour in zip(indices, hours.tolist()):
+            if hour == hour:
+                samples[i] = (hour - self.start_time,) + samples[i][1:]
+
+    @staticmethod
+    def parse_clock(data_line):
+        # (Seq, Millis) de la línea, o None si el firmware no los envía
+        data_parts = data_line.split(',')
+        try:
+            return float(data_parts[3].split(':')[1]), float(data_parts[4].split(':')[1])
+        except (IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_data(data_line, timestamp):
+        try:
+            data_parts = data_line.split(',')
+            torque_str = data_parts[0].split(':')[1]
+            rpm1_str = data_parts[1].split(':')[1]
+            rpm2_str = data_parts[2].split(':')[1]
+
+            torque_value = float(torque_str)  # El desvío del cero lo corrige CompensadorTara (antes: +1 fijo)
+            rpm1_value = float(rpm1_str)
+            rpm2_value = float(rpm2_str)
+            return timestamp, torque_value, rpm1_value, rpm2_value
+        except Exception as e:
+            print(f"Error al parsear datos: {e}")
+            return None
@@ -0,0 +1,150 @@
+import math
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # Sin SciPy el biquad corre en un bucle de Python (~0.3 µs por muestra)
+    lfilter = None
+
+
+class _Filtro:
+    # Filtro en tiempo real: `filtrar` recibe los valores de un lote y devuelve el lote filtrado,
+    # continuando el estado del lote anterior. Las muestras NaN salen como NaN y no entran al estado
+    def filtrar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        validos = ~np.isnan(valores)
+        if validos.all():
+            return self._filtrar(valores) if len(valores) else valores.copy()
+        salida = np.full(len(valores), np.nan)
+        if validos.any():
+            salida[validos] = self._filtrar(valores[validos])
+        return salida
+
+
+class MediaMovil(_Filtro):
+    """Media de las últimas `ventana` muestras con suma acumulada: O(1) por muestra.
+
+    Sólo guarda las últimas ventana - 1 muestras; la suma se acumula dentro de cada lote
+    (no a lo largo del ensayo), así no arrastra error de redondeo. Hasta llenar la
+    ventana promedia las muestras disponibles.
+    """
+
+    def __init__(self, ventana):
+        self.ventana = max(1, int(ventana))
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._previas = np.zeros(0)
+
+    def _filtrar(self, valores):
+        datos = np.concatenate([self._previas, valores])
+        suma = np.concatenate([[0.0], np.cumsum(datos)])
+        fin = np.arange(len(self._previas) + 1, len(datos) + 1)
+        inicio = np.maximum(fin - self.ventana, 0)
+        self._previas = datos[len(datos) - (self.ventana - 1):] if self.ventana > 1 else np.zeros(0)
+        return (suma[fin] - suma[inicio]) / (fin - inicio)
+
+
+class PasaBajos(_Filtro):
+    """Biquad pasa bajos Butterworth (Q = 1/√2 por defecto): O(1) por muestra.
+
+    `corte` y `muestreo` en Hz; con muestreo=1 el corte es una fracción de la frecuencia
+    de muestreo (útil cuando el ritmo depende del modo de telemetría). Forma directa II
+    transpuesta, la misma que scipy.signal.lfilter con `zi`. El estado arranca en régimen
+    con la primera muestra, así el filtro no sube desde cero.
+    """
+
+    def __init__(self, corte, muestreo=1.0, q=1 / math.sqrt(2)):
+        if not 0 < corte < muestreo / 2:
+            raise ValueError("La frecuencia de corte debe estar entre 0 y la mitad de la de muestreo")
+        w0 = 2 * math.pi * corte / muestreo
+        alfa = math.sin(w0) / (2 * q)
+        a0 = 1 + alfa
+        b1 = (1 - math.cos(w0)) / a0
+        self.b = np.array([b1 / 2, b1, b1 / 2])
+        self.a = np.array([1.0, -2 * math.cos(w0) / a0, (1 - alfa) / a0])
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._estado = None
+
+    def _filtrar(self, valores):
+        (b0, b1, b2), (_, a1, a2) = self.b, self.a
+        if self._estado is None:
+            x = valores[0]
+            self._estado = np.array([x * (1 - b0), x * (b2 - a2)])
+        if lfilter is not None:
+            salida, self._estado = lfilter(self.b, self.a, valores, zi=self._estado)
+            return salida
+        z1, z2 = self._estado.tolist()
+        salida = []
+        for x in valores.tolist():
+            y = b0 * x + z1
+            z1 = b1 * x - a1 * y + z2
+            z2 = b2 * x - a2 * y
+            salida.append(y)
+        self._estado = np.array([z1, z2])
+        return np.array(salida)
+
+
+class Mediana(_Filtro):
+    """Mediana de las últimas `ventana` muestras: O(w) por muestra.
+
+    La ventana se guarda ordenada; cada muestra nueva se ubica con búsqueda binaria
+    (O(log w)), pero insertarla y sacar la más antigua corre la lista (O(w)). Con las
+    ventanas que se usan (w=5) es despreciable. Quita picos aislados sin suavizar los
+    escalones.
+    """
+
+    def __init__(self, ventana):
+        self.ventana = max(1, int(ventana))
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._llegada = deque()
+        self._ordenadas = []
+
+    def _filtrar(self, valores):
+        llegada, ordenadas, ventana = self._llegada, self._ordenadas, self.ventana
+        salida = []
+        for x in valores.tolist():
+            if len(llegada) == ventana:
+                del ordenadas[bisect_left(ordenadas, llegada.popleft())]
+            llegada.append(x)
+            insort(ordenadas, x)
+            n = len(ordenadas)
+            salida.append(ordenadas[n // 2] if n % 2 else (ordenadas[n // 2 - 1] + ordenadas[n // 2]) / 2)
+        return np.array(salida)
+
+
+# Filtros de torque que ofrecen las interfaces: ventanas en muestras y corte relativo a la frecuencia
+# de muestreo, porque el ritmo cambia entre texto (2 muestras/s) y tramas binarias (100 muestras/s)
+FILTROS_TORQUE = {
+    'Mediana (5 muestras)': lambda: Mediana(5),
+    'Media móvil (10 muestras)': lambda: MediaMovil(10),
+    'Pasa bajos (corte fs/20)': lambda: PasaBajos(0.05),
+    'Sin filtro': lambda: None,
+}
+
+
+class FiltroColumna:
+    """Etapa de LectorSerial que agrega `columna` filtrada como `destino` a cada lote.
+
+    El estado del filtro sigue de un lote al siguiente, así la gráfica no necesita
+    volver a filtrar el historial en cada cuadro. `filtro` se puede reemplazar durante
+    el ensayo (None copia la columna sin filtrar).
+    """
+
+    def __init__(self, filtro, columna='Torque', destino=None):
+        self.filtro = filtro
+        self.columna = columna
+        self.destino = destino or f'{columna} Filtrado'
+
+    def __call__(self, lote):
+        filtro = self.filtro
+        valores = lote.columnas[self.columna]
+        lote.columnas[self.destino] = filtro.filtrar(valores) if filtro is not None else np.array(valores, dtype=np.float64)
+        return lote
@@ -0,0 +1,119 @@
+import select
+import socket
+
+import numpy as np
+
+from utilidades.telemetria import LoteTelemetria
+
+# Flujo continuo de torque del ESP32 (firmware/ESP32.lnk.ino): conexión TCP en PUERTO_FLUJO
+# por la que el equipo envía, en tandas, una línea "millis,torque\n" por muestra
+PUERTO_FLUJO = 81
+COLUMNAS_FLUJO = ('Tiempo', 'Torque')
+
+
+class PuertoTCP:
+    """Conexión TCP con la interfaz de puerto que usa LectorSerial (timeout, in_waiting, read).
+
+    `read(n)` devuelve lo que haya llegado (hasta n bytes) o b'' si pasó `timeout` sin
+    datos; si el equipo cierra la conexión lanza ConnectionError y el lector termina.
+    """
+
+    def __init__(self, host, puerto=PUERTO_FLUJO, timeout=1.0):
+        self._socket = socket.create_connection((host, puerto), timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._timeout = timeout
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, valor):
+        self._timeout = valor
+        self._socket.settimeout(valor)
+
+    @property
+    def is_open(self):
+        return self._socket.fileno() != -1
+
+    @property
+    def in_waiting(self):
+        # El socket no informa cuántos bytes hay: si hay algo se pide un bloque grande
+        legibles, _, _ = select.select([self._socket], [], [], 0)
+        return 1 << 16 if legibles else 0
+
+    def read(self, n=1):
+        try:
+            datos = self._socket.recv(n)
+        except socket.timeout:
+            return b''
+        if not datos:
+            raise ConnectionError("El equipo cerró la conexión del flujo de torque")
+        return datos
+
+    def write(self, datos):
+        self._socket.sendall(datos)
+
+    def close(self):
+        self._socket.close()
+
+
+class DecodificadorTorque:
+    """Decodifica el flujo "millis,torque" en lotes con columnas Tiempo (s) y Torque.
+
+    El tiempo es el del equipo (no el de llegada al host). Con `relativo` se cuenta
+    desde la primera muestra recibida. Las líneas que no son muestras van a `mensajes`.
+    """
+
+    def __init__(self, relativo=True):
+        self.relativo = relativo
+        self.origen = None  # millis de la primera muestra
+        self.muestras = 0
+        self.errores = 0
+        self._resto = b''
+
+    def alimentar(self, datos):
+        lineas = (self._resto + datos).split(b'\n')
+        self._resto = lineas.pop()
+        muestras = []
+        mensajes = []
+        for linea in lineas:
+            linea = linea.strip()
+            if linea[:1].isdigit():
+                muestras.append(linea)
+            elif linea:
+                mensajes.append(linea.decode('utf-8', errors='replace'))
+
+        valores = np.empty((0, 2))
+        if muestras:
+            # Todas las muestras del bloque en una sola conversión; si algo falla, línea por línea
+            try:
+                planos = np.fromstring(b','.join(muestras), sep=',')
+            except ValueError:
+                planos = None
+            if planos is not None and planos.size == 2 * len(muestras):
+                valores = planos.reshape(-1, 2)
+            else:
+                valores = np.array([v for v in map(self._decodificar, muestras) if v is not None]).reshape(-1, 2)
+        self.muestras += len(valores)
+
+        tiempo = valores[:, 0]
+        if len(tiempo) and self.relativo:
+            if self.origen is None:
+                self.origen = tiempo[0]
+            tiempo = tiempo - self.origen
+        return LoteTelemetria({'Tiempo': tiempo / 1000.0, 'Torque': valores[:, 1]}, mensajes)
+
+    def _decodificar(self, linea):
+        try:
+            millis, torque = linea.split(b',')
+            return float(millis), float(torque)
+        except ValueError:
+            self.errores += 1
+            return None
+
+    def reiniciar(self):
+        self.origen = None
+        self.muestras = 0
+        self.errores = 0
+        self._resto = b''
@@ -0,0 +1,128 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from utilidades.sesion_binaria import EXTENSION_SESION, FORMATO_CSV, EscritorSesion, formatos_csv
+from utilidades.telemetria import COLUMNAS
+
+_FIN = object()  # Marca de cierre en la cola del grabador
+
+
+class _EscritorCSV:
+    # Mismo formato que exportaba "Guardar Datos": encabezado y una fila por muestra (el reloj con todos sus dígitos)
+    def __init__(self, ruta, columnas, formato, tam_buffer):
+        self.formato = formatos_csv(columnas, formato)
+        self._archivo = open(ruta, 'w', buffering=tam_buffer, newline='')
+        self._archivo.write(','.join(columnas) + '\n')
+
+    def escribir(self, valores):
+        filas = np.column_stack(valores)
+        np.savetxt(self._archivo, filas, fmt=self.formato, delimiter=',')
+        return len(filas)
+
+    def sincronizar(self):
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            self._archivo.close()
+
+
+class GrabadorSesion:
+    """Etapa del lector que graba en disco cada muestra decodificada durante el ensayo.
+
+    Se usa como etapa de LectorSerial: la llamada desde el hilo lector sólo encola las
+    columnas del lote (no toca el disco). Un hilo propio las escribe en el archivo de
+    sesión y hace flush + fsync cada `intervalo_fsync` segundos, así un corte o un
+    cierre inesperado pierde a lo sumo ese intervalo.
+
+    Si `ruta` termina en EXTENSION_SESION se graba en el formato columnar de
+    sesion_binaria (con `parametros` del ensayo en el encabezado); si no, en CSV con
+    encabezado, el mismo formato que exportaba "Guardar Datos".
+
+    El archivo es independiente del BufferMuestras: contiene todas las muestras del
+    ensayo aunque la ventana en memoria ya las haya descartado.
+
+    Si escribir o cerrar el archivo falla, la grabación se detiene, el primer error queda
+    en `error` y se cuentan en `errores` (la interfaz lo muestra con puente_gui.AvisoErrores).
+    """
+
+    def __init__(self, ruta, columnas=COLUMNAS, parametros=None, intervalo_fsync=1.0, tam_buffer=1 << 16, formato=FORMATO_CSV, latencias_medidas=10000):
+        self.ruta = ruta
+        self.columnas = tuple(columnas)
+        self.intervalo_fsync = intervalo_fsync
+        self.muestras = 0  # Muestras escritas en el archivo
+        self.fsyncs = 0
+        self.errores = 0
+        self.error = None
+        self.latencias = deque(maxlen=latencias_medidas)  # Segundos agregados al hilo lector por lote
+        self._cola = queue.Queue()
+        if ruta.endswith(EXTENSION_SESION):
+            self._escritor = EscritorSesion(ruta, self.columnas, parametros)
+        else:
+            self._escritor = _EscritorCSV(ruta, self.columnas, formato, tam_buffer)
+        self._hilo = threading.Thread(target=self._escribir, name='GrabadorSesion', daemon=True)
+        self._hilo.start()
+
+    def __call__(self, lote):
+        # Etapa de LectorSerial: encola las columnas y devuelve el lote sin modificar
+        inicio = time.perf_counter()
+        if len(lote.columnas['Tiempo']):
+            self._cola.put([lote.columnas[nombre] for nombre in self.columnas])
+        self.latencias.append(time.perf_counter() - inicio)
+        return lote
+
+    def _escribir(self):
+        ultimo_fsync = time.monotonic()
+        while True:
+            try:
+                elemento = self._cola.get(timeout=self.intervalo_fsync)
+            except queue.Empty:
+                elemento = None
+            aviso = None if isinstance(elemento, list) else elemento  # Event de sincronizar() o _FIN
+            try:
+                if isinstance(elemento, list):
+                    self.muestras += self._escritor.escribir(elemento)
+                if aviso is not None or time.monotonic() - ultimo_fsync >= self.intervalo_fsync:
+                    self._escritor.sincronizar()
+                    self.fsyncs += 1
+                    ultimo_fsync = time.monotonic()
+            except (OSError, ValueError) as e:
+                self.errores += 1
+                self.error = e
+                print(f"Error al grabar la sesión: {e}")
+                return
+            if aviso is _FIN:
+                return
+            if aviso is not None:
+                aviso.set()
+
+    def sincronizar(self, timeout=5.0):
+        # Espera a que todo lo encolado hasta ahora esté escrito y sincronizado en disco
+        if not self._hilo.is_alive():
+            return
+        listo = threading.Event()
+        self._cola.put(listo)
+        listo.wait(timeout)
+
+    def cerrar(self, timeout=5.0):
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join(timeout)
+        try:
+            self._escritor.cerrar()
+        except (OSError, ValueError) as e:
+            self.errores += 1
+            self.error = self.error or e
+
+    def estadisticas_latencia(self):
+        # Tiempo agregado al hilo lector por lote, en microsegundos (medio, p99 y máximo)
+        if not self.latencias:
+            return None
+        us = np.array(self.latencias) * 1e6
+        return {'medio': float(us.mean()), 'p99': float(np.percentile(us, 99)), 'maximo': float(us.max())}
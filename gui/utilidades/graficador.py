@@ -0,0 +1,140 @@
+import time
+from collections import deque
+import numpy as np
+
+from utilidades.decimacion import decimar_minmax
+
+
+class GraficadorVivo:
+    """Gráfica en tiempo real con artistas persistentes y blitting.
+
+    Los ejes y las líneas se crean una sola vez. En cada cuadro sólo se actualizan
+    los datos de las líneas y se redibujan sobre el fondo guardado; el redibujado
+    completo (ejes, grilla, leyendas) ocurre sólo cuando los datos salen de la vista.
+
+    paneles: lista de dicts {'ylabel': str, 'series': [(clave, etiqueta, color), ...]}
+    con 'titulo' opcional. Un panel por fila, todos con el mismo eje de tiempo.
+
+    Antes de dibujar, cada serie se decima por mínimo/máximo a `columnas` tramos (por
+    defecto, el ancho del eje en píxeles), así el costo del cuadro no crece con la
+    duración del ensayo. Los datos completos no se modifican.
+    """
+
+    def __init__(self, fig, canvas, paneles, xlabel='Tiempo (s)', margen=0.1, cuadros_medidos=200, columnas=None):
+        self.fig = fig
+        self.canvas = canvas
+        self.margen = margen
+        self.columnas = columnas
+        self.lineas = {}
+        self._eje_de = {}
+        self._ejes_lineas = []
+        self._fondo = None
+        self._usar_blit = getattr(canvas, 'supports_blit', False)
+        self.tiempos_cuadro = deque(maxlen=cuadros_medidos)  # Segundos por cuadro
+        self.redibujados = 0
+
+        ejes = fig.subplots(len(paneles), 1, sharex=True, squeeze=False)[:, 0]
+        for ax, panel in zip(ejes, paneles):
+            lineas_panel = []
+            for clave, etiqueta, color in panel['series']:
+                # animated=True deja las líneas fuera del fondo que se guarda para el blitting
+                (linea,) = ax.plot([], [], label=etiqueta, color=color, animated=self._usar_blit)
+                self.lineas[clave] = linea
+                self._eje_de[clave] = ax
+                lineas_panel.append(linea)
+            ax.set_ylabel(panel['ylabel'])
+            if 'titulo' in panel:
+                ax.set_title(panel['titulo'])
+            ax.legend(loc='upper left')
+            ax.grid(True)
+            self._ejes_lineas.append((ax, lineas_panel))
+        ejes[-1].set_xlabel(xlabel)
+        try:
+            fig.set_layout_engine('tight')
+        except AttributeError:
+            fig.tight_layout()
+
+        self._conexion = canvas.mpl_connect('draw_event', self._al_dibujar)
+
+    def _al_dibujar(self, evento):
+        # Tras cada redibujado completo (incluye cambios de tamaño de la ventana) se guarda el fondo
+        if not self._usar_blit:
+            return
+        self._fondo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._dibujar_lineas()
+
+    def _dibujar_lineas(self):
+        for ax, lineas_panel in self._ejes_lineas:
+            for linea in lineas_panel:
+                ax.draw_artist(linea)
+        self.canvas.blit(self.fig.bbox)
+
+    @staticmethod
+    def _rango(valores):
+        valores = np.asarray(valores, dtype=float)
+        if valores.size == 0:
+            return None
+        minimo, maximo = np.nanmin(valores), np.nanmax(valores)
+        if not np.isfinite(minimo) or not np.isfinite(maximo):
+            return None
+        return minimo, maximo
+
+    def _limites(self, minimo, maximo, abajo=True):
+        amplitud = maximo - minimo
+        if amplitud == 0:
+            amplitud = abs(maximo) or 1.0
+        return (minimo - self.margen * amplitud if abajo else minimo), maximo + self.margen * amplitud
+
+    def _reescalar_si_hace_falta(self, x):
+        cambio = False
+        rango_x = self._rango(x)
+        if rango_x is not None:
+            ax0 = self._ejes_lineas[0][0]
+            izq, der = ax0.get_xlim()
+            x_min, x_max = rango_x
+            # También se reajusta si la ventana circular dejó vacía más de la mitad de la vista
+            if x_max > der or x_min < izq or (x_min - izq) > 0.5 * (der - izq):
+                ax0.set_xlim(*self._limites(x_min, x_max, abajo=False))
+                cambio = True
+        for ax, lineas_panel in self._ejes_lineas:
+            rangos = [r for r in (self._rango(linea.get_ydata()) for linea in lineas_panel) if r]
+            if not rangos:
+                continue
+            y_min = min(r[0] for r in rangos)
+            y_max = max(r[1] for r in rangos)
+            abajo, arriba = ax.get_ylim()
+            if y_min < abajo or y_max > arriba:
+                ax.set_ylim(*self._limites(y_min, y_max))
+                cambio = True
+        return cambio
+
+    def _columnas(self, ax):
+        if self.columnas:
+            return self.columnas
+        return max(1, int(ax.bbox.width))
+
+    def actualizar(self, x, series):
+        # x: array de tiempos; series: dict {clave: array} con las claves definidas en los paneles
+        inicio = time.perf_counter()
+        for clave, linea in self.lineas.items():
+            if clave in series:
+                linea.set_data(*decimar_minmax(x, series[clave], self._columnas(self._eje_de[clave])))
+        if self._reescalar_si_hace_falta(x) or self._fondo is None or not self._usar_blit:
+            self.redibujados += 1
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._fondo)
+            self._dibujar_lineas()
+        self.tiempos_cuadro.append(time.perf_counter() - inicio)
+
+    def limpiar(self):
+        for linea in self.lineas.values():
+            linea.set_data([], [])
+        self.canvas.draw()
+
+    def estadisticas_cuadro(self):
+        # Tiempo por cuadro en ms (medio, p95 y máximo) de los últimos cuadros medidos
+        if not self.tiempos_cuadro:
+            return None
+        ms = np.array(self.tiempos_cuadro) * 1000.0
+        return {'medio': float(ms.mean()), 'p95': float(np.percentile(ms, 95)), 'maximo': float(ms.max())}
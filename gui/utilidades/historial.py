@@ -0,0 +1,73 @@
+import threading
+import numpy as np
+
+
+class HistorialMuestras:
+    """Almacén columnar que crece sin límite fijo, para conservar un ensayo completo.
+
+    A diferencia de BufferMuestras no descarta muestras: cuando se llena duplica la
+    capacidad, así cada muestra se copia en promedio una vez más (O(1) amortizado) y un
+    ensayo de n muestras cuesta O(n) en lugar del O(n²) de np.append por muestra.
+    `columna` y `vistas` devuelven vistas de NumPy de las muestras válidas, sin copiar;
+    una vista tomada antes de que el almacén crezca sigue siendo válida pero no ve las
+    muestras agregadas después.
+    """
+
+    def __init__(self, columnas, capacidad=1024, dtype=np.float64):
+        self.columnas = tuple(columnas)
+        self._indice = {nombre: j for j, nombre in enumerate(self.columnas)}
+        self._dtype = dtype
+        self._capacidad_inicial = max(1, int(capacidad))
+        self._lock = threading.Lock()
+        self._datos = np.empty((len(self.columnas), self._capacidad_inicial), dtype=dtype)
+        self._cantidad = 0
+
+    @property
+    def capacidad(self):
+        return self._datos.shape[1]
+
+    def __len__(self):
+        return self._cantidad
+
+    def _asegurar(self, cantidad):
+        if cantidad <= self.capacidad:
+            return
+        capacidad = self.capacidad
+        while capacidad < cantidad:
+            capacidad *= 2
+        datos = np.empty((len(self.columnas), capacidad), dtype=self._dtype)
+        datos[:, :self._cantidad] = self._datos[:, :self._cantidad]
+        self._datos = datos
+
+    def agregar_lote(self, columnas):
+        # columnas: dict {nombre: array} con la misma longitud; las columnas ausentes quedan en NaN
+        if not columnas:
+            return
+        n = len(next(iter(columnas.values())))
+        if n == 0:
+            return
+        with self._lock:
+            self._asegurar(self._cantidad + n)
+            destino = self._datos[:, self._cantidad:self._cantidad + n]
+            for nombre, j in self._indice.items():
+                destino[j] = columnas[nombre] if nombre in columnas else np.nan
+            self._cantidad += n
+
+    def agregar(self, fila):
+        # fila: secuencia con un valor por columna, en el orden de self.columnas
+        with self._lock:
+            self._asegurar(self._cantidad + 1)
+            self._datos[:, self._cantidad] = fila
+            self._cantidad += 1
+
+    def columna(self, nombre):
+        return self._datos[self._indice[nombre], :self._cantidad]
+
+    def vistas(self):
+        return {nombre: self._datos[j, :self._cantidad] for nombre, j in self._indice.items()}
+
+    def limpiar(self):
+        # Vuelve a la capacidad inicial (libera la memoria de un ensayo largo)
+        with self._lock:
+            self._datos = np.empty((len(self.columnas), self._capacidad_inicial), dtype=self._dtype)
+            self._cantidad = 0
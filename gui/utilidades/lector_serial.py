@@ -0,0 +1,90 @@
+import queue
+import threading
+
+import serial
+
+
+class DivisorLineas:
+    """Decodificador mínimo para protocolos de texto: separa el flujo en líneas.
+
+    Devuelve las líneas completas (sin '\\r\\n' ni líneas vacías) y guarda la última línea
+    incompleta para el próximo bloque.
+    """
+
+    def __init__(self, codificacion='utf-8'):
+        self.codificacion = codificacion
+        self._resto = b''
+
+    def alimentar(self, datos):
+        lineas = (self._resto + datos).split(b'\n')
+        self._resto = lineas.pop()
+        return [texto for texto in (linea.decode(self.codificacion, errors='replace').strip() for linea in lineas) if texto]
+
+    def reiniciar(self):
+        self._resto = b''
+
+
+class LectorSerial(threading.Thread):
+    """Hilo de adquisición que vacía el puerto serie en bloques.
+
+    En cada vuelta lee todo lo que está en `in_waiting` con una sola llamada (o espera
+    a lo sumo `espera` segundos por el primer byte), se lo pasa al decodificador y pone
+    el resultado en `cola` si trae algo. El decodificador es cualquier objeto con
+    `alimentar(bytes)`: DivisorLineas, ParserTelemetria o DecodificadorBinario.
+    `etapas` son funciones `lote -> lote` que se aplican en este hilo antes de encolar
+    (p. ej. GrabadorSesion); deben ser rápidas porque demoran la lectura del puerto.
+
+    `detener()` corta el hilo en a lo sumo `espera` segundos; no cierra el puerto. Si la
+    lectura falla (puerto desconectado) o una etapa lanza una excepción, el hilo termina,
+    deja la excepción en `error` y la cuenta en `errores`; la interfaz la muestra desde su
+    hilo (ver puente_gui.AvisoErrores).
+    Funciona con cualquier puerto de pyserial, incluidos serial_for_url('loop://') y ptys.
+    """
+
+    def __init__(self, puerto, decodificador=None, cola=None, espera=0.05, etapas=()):
+        super().__init__(name='LectorSerial', daemon=True)
+        self.puerto = puerto
+        self.decodificador = decodificador if decodificador is not None else DivisorLineas()
+        self.cola = cola if cola is not None else queue.Queue()
+        self.espera = espera
+        self.etapas = tuple(etapas)
+        self.bytes_leidos = 0
+        self.lecturas = 0
+        self.errores = 0
+        self.error = None
+        self._detener = threading.Event()
+
+    def run(self):
+        # Timeout corto: read() nunca bloquea más que `espera`, así la detención es inmediata
+        self.puerto.timeout = self.espera
+        while not self._detener.is_set():
+            try:
+                datos = self.puerto.read(self.puerto.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError, AttributeError) as e:
+                # TypeError/AttributeError: pyserial al cerrar el puerto desde otro hilo
+                if not self._detener.is_set():
+                    self.errores += 1
+                    self.error = e
+                    print(f"Error en la lectura serial: {e}")
+                break
+            if not datos:
+                continue
+            self.lecturas += 1
+            self.bytes_leidos += len(datos)
+            lote = self.decodificador.alimentar(datos)
+            if lote:
+                try:
+                    for etapa in self.etapas:
+                        lote = etapa(lote)
+                except Exception as e:
+                    # Una etapa rota no debe matar el hilo en silencio: se corta igual que una lectura fallida
+                    self.errores += 1
+                    self.error = e
+                    print(f"Error en la etapa {getattr(etapa, '__name__', type(etapa).__name__)} del lector serial: {e!r}")
+                    break
+                self.cola.put(lote)
+
+    def detener(self, timeout=1.0):
+        self._detener.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
@@ -0,0 +1,69 @@
+import numpy as np
+
+# Magnitudes de tracción derivadas de la telemetría. Son fórmulas punto a punto sobre arrays
+# completos: sirven igual para cada lote en vivo que para una sesión entera ya grabada.
+#   v    = ω · (Radio / 100)                 velocidad lineal (ecuación 5 de "Ecuaciones Teóricas")
+#   U    = (v_D + v_B) / 2                   velocidad de arrastre (entrainment)
+#   SRR  = (v_D - v_B) / U                   relación deslizamiento/rodadura
+#   μ    = F_t / N                           coeficiente de fricción medido
+# En MTM ALPHA.PY la celda de carga ya mide la fuerza tangencial en kg, así que μ = Torque / Peso;
+# si el sensor mide un momento (interfazCERATE.py, N·m) se pasa el `brazo` en m y F_t = Torque / brazo.
+COLUMNAS_DERIVADAS = ('Mu', 'SRR', 'Velocidad Arrastre', 'Deslizamiento')
+
+
+def velocidad_lineal(omega, radio_cm):
+    # omega en rad/s y radio en cm (como los parámetros R y r del firmware) -> m/s
+    return np.asarray(omega, dtype=np.float64) * (radio_cm / 100.0)
+
+
+def velocidad_desde_rpm(rpm, radio_m):
+    return np.asarray(rpm, dtype=np.float64) * (2 * np.pi / 60.0) * radio_m
+
+
+def velocidad_arrastre(v_d, v_b):
+    return (np.asarray(v_d, dtype=np.float64) + v_b) / 2
+
+
+def relacion_deslizamiento(v_d, v_b):
+    # SRR con signo (positivo: el disco es más rápido que la bola); NaN con ambas superficies quietas
+    v_d = np.asarray(v_d, dtype=np.float64)
+    arrastre = velocidad_arrastre(v_d, v_b)
+    return np.divide(v_d - v_b, arrastre, out=np.full(arrastre.shape, np.nan), where=arrastre != 0)
+
+
+def coeficiente_friccion(torque, carga, brazo=None):
+    # torque y carga en unidades coherentes (kg y kg, o N·m con `brazo` en m y N); NaN sin carga
+    fuerza = np.asarray(torque, dtype=np.float64)
+    if brazo:
+        fuerza = fuerza / brazo
+    carga = np.broadcast_to(np.asarray(carga, dtype=np.float64), fuerza.shape)
+    return np.divide(fuerza, carga, out=np.full(fuerza.shape, np.nan), where=carga > 0)
+
+
+def derivar(columnas, peso, brazo=None):
+    # columnas: dict con 'Velocidad Disco', 'Velocidad Bola' (m/s) y 'Torque'. Devuelve las COLUMNAS_DERIVADAS
+    v_d = np.asarray(columnas['Velocidad Disco'], dtype=np.float64)
+    v_b = np.asarray(columnas['Velocidad Bola'], dtype=np.float64)
+    return {
+        'Mu': coeficiente_friccion(columnas['Torque'], peso, brazo),
+        'SRR': relacion_deslizamiento(v_d, v_b),
+        'Velocidad Arrastre': velocidad_arrastre(v_d, v_b),
+        'Deslizamiento': v_d - v_b,
+    }
+
+
+class DerivadorMagnitudes:
+    """Etapa de LectorSerial que agrega COLUMNAS_DERIVADAS a cada lote.
+
+    `peso` (carga normal) y `brazo` se pueden cambiar durante el ensayo; cada lote usa
+    los valores vigentes al decodificarlo. Para una sesión grabada se usa `derivar`
+    directamente sobre sus columnas (p. ej. SesionBinaria(ruta).como_dict()).
+    """
+
+    def __init__(self, peso, brazo=None):
+        self.peso = peso
+        self.brazo = brazo
+
+    def __call__(self, lote):
+        lote.columnas.update(derivar(lote.columnas, self.peso, self.brazo))
+        return lote
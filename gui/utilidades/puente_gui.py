@@ -0,0 +1,121 @@
+import queue
+import time
+from collections import deque
+
+import numpy as np
+
+from utilidades.telemetria import LoteTelemetria
+
+
+def combinar_lotes(lotes):
+    # Une varios lotes del mismo tipo en uno: LoteTelemetria (columnas y mensajes) o listas de líneas
+    if len(lotes) == 1:
+        return lotes[0]
+    if isinstance(lotes[0], LoteTelemetria):
+        # Los lotes sin muestras (sólo mensajes, p. ej. entre ensayos) pueden no traer las columnas de las etapas
+        con_muestras = [lote for lote in lotes if len(lote.columnas['Tiempo'])] or lotes[:1]
+        columnas = {nombre: np.concatenate([lote.columnas[nombre] for lote in con_muestras]) for nombre in con_muestras[0].columnas}
+        return LoteTelemetria(columnas, [mensaje for lote in lotes for mensaje in lote.mensajes])
+    return [elemento for lote in lotes for elemento in lote]
+
+
+class PuenteGUI:
+    """Consumidor de la cola de un LectorSerial del lado de la interfaz.
+
+    El hilo lector sólo decodifica y encola; `tick()` corre en el hilo de la interfaz
+    (Tk `after` o Qt `QTimer`), junta todos los lotes acumulados desde el tick anterior
+    y llama una sola vez a `aplicar(lote)`. Así las actualizaciones de widgets quedan
+    limitadas a una por tick sin importar a qué ritmo lleguen los datos.
+
+    `max_lotes` limita cuántos lotes se toman por tick para no congelar la interfaz
+    después de una pausa larga; el resto queda para el tick siguiente. Una excepción de
+    `aplicar` no corta los ticks: se cuenta en `errores` y la última queda en `error`.
+    """
+
+    def __init__(self, cola, aplicar, periodo_ms=100, max_lotes=1000, ticks_medidos=200):
+        self.cola = cola
+        self.aplicar = aplicar
+        self.periodo_ms = periodo_ms
+        self.max_lotes = max_lotes
+        self.ticks = 0
+        self.lotes = 0
+        self.tiempos_aplicar = deque(maxlen=ticks_medidos)  # Segundos por actualización de la interfaz
+        self.errores = 0
+        self.error = None
+        self._tk = None
+        self._id_tk = None
+        self._timer_qt = None
+
+    def drenar(self):
+        # Todos los lotes pendientes combinados en uno, o None si la cola está vacía
+        lotes = []
+        while len(lotes) < self.max_lotes:
+            try:
+                lotes.append(self.cola.get_nowait())
+            except queue.Empty:
+                break
+        if not lotes:
+            return None
+        self.lotes += len(lotes)
+        return combinar_lotes(lotes)
+
+    def tick(self):
+        self.ticks += 1
+        lote = self.drenar()
+        if lote is None:
+            return
+        inicio = time.perf_counter()
+        try:
+            self.aplicar(lote)
+        except Exception as e:
+            self.errores += 1
+            self.error = e
+            print(f"Error al actualizar la interfaz: {e}")
+        self.tiempos_aplicar.append(time.perf_counter() - inicio)
+
+    def iniciar_tk(self, widget):
+        # Tkinter: se reprograma con widget.after cada periodo_ms
+        self._tk = widget
+        self._ciclo_tk()
+
+    def _ciclo_tk(self):
+        self.tick()
+        self._id_tk = self._tk.after(self.periodo_ms, self._ciclo_tk)
+
+    def iniciar_qt(self, timer):
+        # Qt: timer es un QtCore.QTimer del hilo de la interfaz
+        self._timer_qt = timer
+        timer.timeout.connect(self.tick)
+        timer.start(self.periodo_ms)
+
+    def detener(self):
+        if self._id_tk is not None:
+            self._tk.after_cancel(self._id_tk)
+            self._id_tk = None
+        if self._timer_qt is not None:
+            self._timer_qt.stop()
+
+
+class AvisoErrores:
+    """Lleva la cuenta de qué fallas de los hilos ya se mostraron al operador.
+
+    `nuevos(fuentes)` recibe pares (nombre, objeto) con atributos `error` y `errores`
+    (LectorSerial, GrabadorSesion, PuenteGUI, AdquisicionTorque; None se ignora) y
+    devuelve los textos de las fallas que todavía no se informaron, para escribirlas en
+    el registro de mensajes desde el hilo de la interfaz. Cada objeto se informa una vez
+    por cada error distinto, así un `aplicar` que falla en todos los ticks no llena el registro.
+    """
+
+    def __init__(self):
+        self._informados = {}  # id(objeto) -> repr del último error informado
+
+    def nuevos(self, fuentes):
+        avisos = []
+        for nombre, objeto in fuentes:
+            error = getattr(objeto, 'error', None)
+            if error is None or self._informados.get(id(objeto)) == repr(error):
+                continue
+            self._informados[id(objeto)] = repr(error)
+            veces = getattr(objeto, 'errores', 1)
+            avisos.append(f"{nombre}: {error}" + (f" ({veces} errores)" if veces > 1 else ""))
+        return avisos
@@ -0,0 +1,135 @@
+from collections import deque
+
+# Tipos de mensaje del registro
+TELEMETRIA = 'telemetria'  # Muestras periódicas ("Tiempo: ...", "Torque:...")
+FIRMWARE = 'firmware'      # Otros mensajes recibidos del equipo (ecos de SET, estados)
+INTERFAZ = 'interfaz'      # Acciones de la interfaz (conexión, comandos enviados)
+ERROR = 'error'
+TIPOS = (FIRMWARE, INTERFAZ, ERROR, TELEMETRIA)
+
+_PALABRAS_ERROR = ('error', 'desconocido', 'inválido', 'fallo')
+
+
+def clasificar(linea):
+    # Tipo de una línea recibida del equipo
+    if linea.startswith('Tiempo:') or linea.startswith('Torque:'):
+        return TELEMETRIA
+    minusculas = linea.lower()
+    if any(palabra in minusculas for palabra in _PALABRAS_ERROR):
+        return ERROR
+    return FIRMWARE
+
+
+class _WidgetTk:
+    def __init__(self, text):
+        self.text = text
+
+    def agregar(self, texto):
+        self.text.insert('end', texto + '\n')
+
+    def borrar_primeras(self, n):
+        self.text.delete('1.0', f'{n + 1}.0')
+
+    def vaciar(self):
+        self.text.delete('1.0', 'end')
+
+    def al_final(self):
+        self.text.see('end')
+
+
+class _WidgetQt:
+    # QTextEdit / QPlainTextEdit (sin importar PyQt: las constantes salen del propio cursor)
+    def __init__(self, edit):
+        self.edit = edit
+
+    def agregar(self, texto):
+        # insertText (y no append) para que el texto nunca se interprete como HTML
+        cursor = self.edit.textCursor()
+        cursor.movePosition(type(cursor).End)
+        if not self.edit.document().isEmpty():
+            texto = '\n' + texto
+        cursor.insertText(texto)
+
+    def borrar_primeras(self, n):
+        cursor = self.edit.textCursor()
+        tipo = type(cursor)
+        cursor.movePosition(tipo.Start)
+        cursor.movePosition(tipo.NextBlock, tipo.KeepAnchor, n)
+        cursor.removeSelectedText()
+
+    def vaciar(self):
+        self.edit.clear()
+
+    def al_final(self):
+        barra = self.edit.verticalScrollBar()
+        barra.setValue(barra.maximum())
+
+
+class RegistroMensajes:
+    """Registro acotado de mensajes para el área "Mensajes y Cálculos" (tk.Text o QTextEdit).
+
+    `agregar` sólo acumula; `volcar` escribe todo lo pendiente en el widget con una
+    sola inserción y un solo desplazamiento al final (una vez por tick de la interfaz).
+    El widget nunca pasa de `max_lineas` + `bloque` líneas: al superarlo se borran las
+    más viejas de a un bloque, así el costo de recortar no se paga en cada inserción.
+
+    Las líneas de telemetría periódica no se guardan salvo que se active su tipo en
+    `mostrar`. Cambiar los tipos visibles reconstruye el widget con las últimas
+    `max_lineas` entradas guardadas de esos tipos.
+    """
+
+    def __init__(self, widget, max_lineas=2000, bloque=500, mostrar=(FIRMWARE, INTERFAZ, ERROR)):
+        self._widget = _WidgetQt(widget) if hasattr(widget, 'document') else _WidgetTk(widget)
+        self.max_lineas = max_lineas
+        self.bloque = bloque
+        self.mostrar = set(mostrar)
+        self._entradas = deque(maxlen=max_lineas)  # (tipo, texto) de todos los tipos guardados
+        self._pendientes = []
+        self._lineas_widget = 0
+
+    def agregar(self, texto, tipo=None):
+        tipo = tipo or clasificar(texto)
+        if tipo == TELEMETRIA and TELEMETRIA not in self.mostrar:
+            return
+        entrada = (tipo, texto)
+        self._entradas.append(entrada)
+        if tipo in self.mostrar:
+            self._pendientes.append(texto)
+
+    def agregar_varios(self, lineas, tipo=None):
+        for linea in lineas:
+            self.agregar(linea, tipo)
+
+    def escribir(self, texto, tipo=INTERFAZ):
+        # Para mensajes ocasionales de la interfaz: agrega y vuelca en el momento
+        self.agregar(texto, tipo)
+        self.volcar()
+
+    def volcar(self):
+        if not self._pendientes:
+            return
+        pendientes = self._pendientes[-self.max_lineas:]
+        self._pendientes = []
+        self._widget.agregar('\n'.join(pendientes))
+        self._lineas_widget += len(pendientes)
+        if self._lineas_widget > self.max_lineas + self.bloque:
+            sobrantes = self._lineas_widget - self.max_lineas
+            self._widget.borrar_primeras(sobrantes)
+            self._lineas_widget -= sobrantes
+        self._widget.al_final()
+
+    def filtrar(self, tipos):
+        # Cambia los tipos visibles y redibuja el widget con lo guardado
+        self.mostrar = set(tipos)
+        if TELEMETRIA not in self.mostrar:
+            self._entradas = deque((e for e in self._entradas if e[0] != TELEMETRIA), maxlen=self.max_lineas)
+        self._widget.vaciar()
+        self._lineas_widget = 0
+        self._pendientes = [texto for tipo, texto in self._entradas if tipo in self.mostrar]
+        self.volcar()
+
+    def limpiar(self):
+        self._entradas.clear()
+        self._pendientes = []
+        self._widget.vaciar()
+        self._lineas_widget = 0
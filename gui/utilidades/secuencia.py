@@ -0,0 +1,213 @@
+import itertools
+import json
+import math
+import threading
+import time
+
+import numpy as np
+
+# Recetas de ensayo (JSON): una secuencia de pasos que se ejecuta sin intervención del operador.
+# Cada paso lleva la velocidad del disco a `rpm` (o a la velocidad de arrastre `arrastre` en m/s)
+# con una rampa de `rampa` s, fija el SRR (o `mu` del firmware) y la mantiene `permanencia` s:
+#   {"nombre": "Stribeck", "R": 5.4, "r": 4.0, "rampa": 2, "permanencia": 30, "peso": 2.5,
+#    "pasos": [{"rpm": 50, "srr": 0.05}, {"rpm": 100, "srr": 0.05, "permanencia": 60}],
+#    "barrido": {"arrastre": [0.05, 0.1, 0.2, 0.5, 1.0], "srr": [0.02, 0.05, 0.1]}}
+# Los valores de la receta son los de todos los pasos salvo que el paso los cambie; `barrido` agrega
+# un paso por combinación (cada SRR con todas las velocidades, en orden). `peso` no va al equipo
+# (se usa para μ): si cambia la carga, el paso lleva "esperar": true y la secuencia se detiene hasta
+# que el operador la coloca y pulsa Continuar. También admiten `dir_disco`, `dir_bola` y `nota`.
+VALORES_PASO = {'rampa': 2.0, 'permanencia': 30.0, 'srr': 0.0, 'peso': math.nan, 'dir_disco': 1, 'dir_bola': 1}
+LARGO_COMANDO = 63  # char comando[64] del firmware: cada línea (sin '\n') tiene que entrar entera
+MARGEN_ESPERA = 0.002  # Segundos finales de cada espera que se completan sin dormir (Event.wait es más grueso)
+
+
+def mu_para_srr(srr):
+    # El firmware fija ω_B = (1 - μ)·(R/r)·ω_D, así v_B = (1 - μ)·v_D y SRR = 2μ/(2 - μ) (ver magnitudes.py)
+    return 2 * srr / (2 + srr)
+
+
+def rpm_para_arrastre(arrastre, mu, radio_cm):
+    # U = (v_D + v_B)/2 = v_D·(2 - μ)/2 -> RPM del disco
+    return 2 * arrastre / (2 - mu) / (radio_cm / 100.0) * 60 / (2 * math.pi)
+
+
+def preparar_receta(datos):
+    # Valida la receta y devuelve {'nombre', 'R', 'r', 'pasos'} con cada paso completo
+    R, r = float(datos.get('R', 5.4)), float(datos.get('r', 4.0))
+    comunes = {clave: datos.get(clave, valor) for clave, valor in VALORES_PASO.items()}
+    pasos = list(datos.get('pasos', []))
+    barrido = datos.get('barrido')
+    if barrido:
+        velocidades = ('arrastre', barrido['arrastre']) if 'arrastre' in barrido else ('rpm', barrido['rpm'])
+        for srr, velocidad in itertools.product(barrido.get('srr', [comunes['srr']]), velocidades[1]):
+            pasos.append({velocidades[0]: velocidad, 'srr': srr})
+    if not pasos:
+        raise ValueError("La receta no tiene pasos")
+
+    preparados = []
+    for i, paso in enumerate(pasos, 1):
+        completo = {**comunes, **paso}
+        mu = float(completo['mu']) if 'mu' in paso else mu_para_srr(float(completo['srr']))
+        if 'arrastre' in paso:
+            rpm = rpm_para_arrastre(float(paso['arrastre']), mu, R)
+        elif 'rpm' in paso:
+            rpm = float(paso['rpm'])
+        else:
+            raise ValueError(f"Paso {i}: falta 'rpm' o 'arrastre'")
+        rampa, permanencia = float(completo['rampa']), float(completo['permanencia'])
+        if rpm < 0 or not 0 <= mu < 1:
+            raise ValueError(f"Paso {i}: velocidad o SRR fuera de rango (rpm {rpm:g}, μ {mu:g})")
+        if rampa <= 0 or permanencia <= 0:
+            # El firmware rechaza START con la rampa anterior en curso: la permanencia la deja terminar
+            raise ValueError(f"Paso {i}: la rampa y la permanencia tienen que ser mayores que 0")
+        preparados.append({'rpm': rpm, 'mu': mu, 'srr': 2 * mu / (2 - mu), 'rampa': rampa, 'permanencia': permanencia,
+                           'peso': float(completo['peso']), 'dir_disco': int(completo['dir_disco']),
+                           'dir_bola': int(completo['dir_bola']), 'esperar': bool(completo.get('esperar', False)),
+                           'nota': str(completo.get('nota', ''))})
+    return {'nombre': str(datos.get('nombre', 'Secuencia')), 'R': R, 'r': r, 'pasos': preparados}
+
+
+def cargar_receta(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return preparar_receta(json.load(archivo))
+
+
+def duracion_receta(receta):
+    return sum(paso['rampa'] + paso['permanencia'] for paso in receta['pasos'])
+
+
+def lineas_set(pares):
+    # Agrupa los pares NOMBRE=valor en líneas "SET ..." de a lo sumo LARGO_COMANDO caracteres
+    lineas, actual = [], "SET"
+    for nombre, valor in pares:
+        par = f" {nombre}={valor:.6g}" if isinstance(valor, float) else f" {nombre}={valor}"
+        if len(actual) + len(par) > LARGO_COMANDO and actual != "SET":
+            lineas.append(actual)
+            actual = "SET"
+        actual += par
+    if actual != "SET":
+        lineas.append(actual)
+    return lineas
+
+
+def comandos_paso(receta, indice):
+    # Texto de un paso (SET + START) para enviarlo en una sola escritura
+    paso = receta['pasos'][indice]
+    anterior = receta['pasos'][indice - 1] if indice else None
+    desde_reposo = anterior is None or paso['esperar']  # Tras una espera los motores arrancan detenidos
+    pares = []
+    if anterior is None:
+        pares += [('R', receta['R']), ('r', receta['r'])]
+    for nombre in ('dir_disco', 'dir_bola'):
+        if anterior is None or paso[nombre] != anterior[nombre]:
+            pares.append((nombre.upper(), paso[nombre]))
+    pares += [('RPM_D_i', 0.0 if desde_reposo else anterior['rpm']), ('RPM_D_f', paso['rpm']), ('mu', paso['mu']), ('T', paso['rampa'])]
+    return '\n'.join(lineas_set(pares) + ['START']) + '\n'
+
+
+class EjecutorSecuencia(threading.Thread):
+    """Hilo que ejecuta una receta: en el instante de cada paso escribe sus comandos de una vez.
+
+    Los instantes se cuentan desde el inicio de la secuencia (inicio + rampa + permanencia
+    de los pasos anteriores), así un retraso no se acumula en los pasos siguientes. Un paso
+    con `esperar`, al terminar el anterior, envía STOP y detiene el reloj hasta `continuar()`
+    (que el operador pulsa con los motores ya detenidos). Al terminar, o con `detener()`, se
+    envía STOP. `inicios` guarda la hora (time.time()) en que salió cada paso, para
+    MarcadorPasos, y `retrasos` cuánto tarde salió respecto de lo programado.
+    `escribir` recibe bytes (p. ej. serial.Serial.write); `preambulo` se antepone al primer paso.
+    """
+
+    def __init__(self, receta, escribir, preambulo='', reloj=time.monotonic):
+        super().__init__(name='EjecutorSecuencia', daemon=True)
+        self.receta = receta
+        self.escribir = escribir
+        self.preambulo = preambulo
+        self.reloj = reloj
+        self.paso = -1  # Índice del paso en curso
+        self.inicios = []
+        self.retrasos = []
+        self.hora_fin = None  # time.time() del STOP final
+        self.esperando = False  # Detenida en un paso con `esperar`
+        self.fin_paso = None    # reloj() en que termina el paso en curso
+        self.error = None
+        self._detener = threading.Event()
+        self._continuar = threading.Event()
+
+    def detener(self):
+        self._detener.set()
+        self._continuar.set()
+
+    def continuar(self):
+        self._continuar.set()
+
+    def _esperar_hasta(self, instante):
+        # True si se pidió detener la secuencia
+        while not self._detener.is_set():
+            resta = instante - self.reloj()
+            if resta <= 0:
+                return False
+            if resta > MARGEN_ESPERA:
+                self._detener.wait(resta - MARGEN_ESPERA)
+        return True
+
+    def run(self):
+        try:
+            instante = self.reloj()
+            for indice, paso in enumerate(self.receta['pasos']):
+                if paso['esperar']:
+                    # Termina el paso anterior y detiene los motores mientras el operador cambia la carga
+                    if self._esperar_hasta(instante):
+                        break
+                    if indice:
+                        self.escribir(b"STOP\n")
+                    self.esperando = True
+                    self._continuar.wait()
+                    self._continuar.clear()
+                    self.esperando = False
+                    instante = self.reloj()
+                if self._esperar_hasta(instante):
+                    break
+                datos = ((self.preambulo if indice == 0 else '') + comandos_paso(self.receta, indice)).encode()
+                self.retrasos.append(self.reloj() - instante)
+                self.inicios.append(time.time())
+                self.escribir(datos)
+                self.paso = indice
+                instante += paso['rampa'] + paso['permanencia']
+                self.fin_paso = instante
+            else:
+                self._esperar_hasta(instante)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.hora_fin = time.time()
+            try:
+                self.escribir(b"STOP\n")
+            except Exception as e:
+                self.error = self.error or e
+
+
+class MarcadorPasos:
+    """Etapa de LectorSerial que agrega la columna 'Paso' con el índice del paso vigente.
+
+    Compara la hora de cada muestra ('Hora' de SincronizadorReloj, o la de llegada) con
+    las horas en que salieron los pasos de `secuencia`; sin secuencia, antes del primer
+    paso o después del STOP final, 'Paso' es NaN. El límite puede correrse una muestra por la latencia del puerto.
+    """
+
+    def __init__(self, secuencia=None):
+        self.secuencia = secuencia
+
+    def __call__(self, lote):
+        columnas = lote.columnas
+        n = len(columnas['Torque'])
+        secuencia = self.secuencia
+        if secuencia is None or not secuencia.inicios:
+            columnas['Paso'] = np.full(n, np.nan)
+            return lote
+        horas = np.array(columnas['Hora'], dtype=np.float64) if 'Hora' in columnas else np.full(n, np.nan)
+        horas[np.isnan(horas)] = time.time()
+        indices = np.searchsorted(np.array(secuencia.inicios), horas, side='right') - 1
+        fin = secuencia.hora_fin
+        vigente = (indices >= 0) & (horas < fin if fin is not None else True)
+        columnas['Paso'] = np.where(vigente, indices, np.nan)
+        return lote
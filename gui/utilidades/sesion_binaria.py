@@ -0,0 +1,191 @@
+import os
+import time
+
+import numpy as np
+
+from utilidades.telemetria import COLUMNAS
+
+# Archivo de sesión columnar (.mtm):
+#   encabezado fijo de TAM_ENCABEZADO bytes (ENCABEZADO, relleno con ceros)
+#   + bloques de `tam_bloque` muestras; cada bloque guarda una columna tras otra.
+# Un bloque es un registro de tamaño fijo, así el archivo completo se abre con
+# np.memmap(ruta, dtype=dtype_bloque(...), offset=TAM_ENCABEZADO) sin leer nada más.
+EXTENSION_SESION = '.mtm'
+MAGIA_SESION = b'MTMSES\x00\x01'
+VERSION_SESION = 1
+TAM_ENCABEZADO = 4096
+TAM_BLOQUE = 1024
+MAX_COLUMNAS = 32
+
+# Parámetros del ensayo, con los nombres de SET del firmware (NaN si no se conocen)
+PARAMETROS = ('R', 'r', 'RPM_D_i', 'RPM_D_f', 'mu', 'T', 'peso', 'DIR_DISCO', 'DIR_BOLA')
+
+# El tiempo y el reloj del equipo se guardan en float64 (ensayos de horas; float32 pierde
+# resolución a partir de 2**24 muestras o ms); el resto ya llega del equipo como float32
+TIPOS_COLUMNAS = {'Tiempo': '<f8', 'Secuencia': '<f8', 'Millis': '<f8', 'Hora': '<f8'}
+TIPO_POR_DEFECTO = '<f4'
+
+# Formato de cada columna en CSV: con '%.6g' la hora (~1.8e9 s), millis() y la secuencia de un
+# ensayo largo pierden dígitos. Los contadores van con '%.0f' (enteros exactos y 'nan' si el
+# firmware no los envía; '%d' falla con NaN)
+FORMATOS_CSV = {'Tiempo': '%.6f', 'Hora': '%.6f', 'Secuencia': '%.0f', 'Millis': '%.0f'}
+FORMATO_CSV = '%.6g'
+
+ENCABEZADO = np.dtype([
+    ('magia', 'S8'),
+    ('version', '<u2'),
+    ('columnas', '<u2'),
+    ('tam_bloque', '<u4'),
+    ('muestras', '<u8'),  # Se reescribe en cada sincronización
+    ('fecha', '<f8'),     # time.time() al crear el archivo
+    ('parametros', [(nombre, '<f8') for nombre in PARAMETROS]),
+    ('nombres', 'S32', (MAX_COLUMNAS,)),
+    ('tipos', 'S4', (MAX_COLUMNAS,)),
+])
+_POS_MUESTRAS = ENCABEZADO.fields['muestras'][1]
+
+
+def formatos_csv(columnas, formato=FORMATO_CSV):
+    # Formato de np.savetxt para cada columna: el de FORMATOS_CSV o `formato`
+    return [FORMATOS_CSV.get(nombre, formato) for nombre in columnas]
+
+
+def dtype_bloque(columnas, tipos, tam_bloque):
+    return np.dtype([(nombre, tipo, (tam_bloque,)) for nombre, tipo in zip(columnas, tipos)])
+
+
+class EscritorSesion:
+    """Escribe un archivo de sesión .mtm de a bloques de columnas (sólo agrega al final).
+
+    `escribir` recibe una lista de arrays en el orden de `columnas`. Las muestras se
+    acumulan en el bloque en curso y cada bloque lleno se escribe una sola vez.
+    `sincronizar` escribe también el bloque incompleto (relleno con NaN, se reescribe en
+    el mismo lugar cuando se completa), actualiza la cantidad de muestras del encabezado
+    y hace fsync: lo que quedó en disco siempre se puede abrir.
+    """
+
+    def __init__(self, ruta, columnas=COLUMNAS, parametros=None, tam_bloque=TAM_BLOQUE):
+        if len(columnas) > MAX_COLUMNAS:
+            raise ValueError(f"Una sesión admite hasta {MAX_COLUMNAS} columnas")
+        self.ruta = ruta
+        self.columnas = tuple(columnas)
+        self.tam_bloque = tam_bloque
+        tipos = [TIPOS_COLUMNAS.get(nombre, TIPO_POR_DEFECTO) for nombre in self.columnas]
+        self.dtype = dtype_bloque(self.columnas, tipos, tam_bloque)
+        self.muestras = 0
+        self._bloques = 0    # Bloques completos ya escritos
+        self._llenas = 0     # Muestras en el bloque en curso
+        self._bloque = self._bloque_vacio()
+
+        encabezado = np.zeros(1, dtype=ENCABEZADO)
+        encabezado['magia'] = MAGIA_SESION
+        encabezado['version'] = VERSION_SESION
+        encabezado['columnas'] = len(self.columnas)
+        encabezado['tam_bloque'] = tam_bloque
+        encabezado['fecha'] = time.time()
+        parametros = parametros or {}
+        for nombre in PARAMETROS:
+            encabezado['parametros'][nombre] = parametros.get(nombre, np.nan)
+        encabezado['nombres'][0, :len(self.columnas)] = [nombre.encode() for nombre in self.columnas]
+        encabezado['tipos'][0, :len(self.columnas)] = [tipo.encode() for tipo in tipos]
+        self._archivo = open(ruta, 'w+b')
+        self._archivo.write(encabezado.tobytes().ljust(TAM_ENCABEZADO, b'\0'))
+
+    def _bloque_vacio(self):
+        bloque = np.empty(1, dtype=self.dtype)
+        for nombre in self.columnas:
+            bloque[nombre] = np.nan
+        return bloque
+
+    def _escribir_bloque(self):
+        self._archivo.seek(TAM_ENCABEZADO + self._bloques * self.dtype.itemsize)
+        self._archivo.write(self._bloque.tobytes())
+
+    def escribir(self, valores):
+        # valores: lista de arrays (una por columna, mismo largo). Devuelve la cantidad de muestras
+        n = len(valores[0])
+        hecho = 0
+        while hecho < n:
+            k = min(n - hecho, self.tam_bloque - self._llenas)
+            for nombre, columna in zip(self.columnas, valores):
+                self._bloque[nombre][0, self._llenas:self._llenas + k] = columna[hecho:hecho + k]
+            self._llenas += k
+            hecho += k
+            if self._llenas == self.tam_bloque:
+                self._escribir_bloque()
+                self._bloques += 1
+                self._llenas = 0
+                self._bloque = self._bloque_vacio()
+        self.muestras += n
+        return n
+
+    def sincronizar(self):
+        if self._llenas:
+            self._escribir_bloque()
+        self._archivo.seek(_POS_MUESTRAS)
+        self._archivo.write(np.uint64(self.muestras).tobytes())
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            self.sincronizar()
+            self._archivo.close()
+
+
+class SesionBinaria:
+    """Sesión .mtm abierta con np.memmap: las columnas se leen de disco al pedirlas.
+
+    `parametros` es un dict con PARAMETROS; `columna(nombre)` devuelve las `muestras`
+    válidas de esa columna (sólo se leen sus bytes de cada bloque).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        encabezado = np.fromfile(ruta, dtype=ENCABEZADO, count=1)
+        if len(encabezado) != 1 or encabezado['magia'][0] != MAGIA_SESION:
+            raise ValueError(f"{ruta} no es un archivo de sesión MTM")
+        encabezado = encabezado[0]
+        if encabezado['version'] > VERSION_SESION:
+            raise ValueError(f"Versión de sesión no soportada: {encabezado['version']}")
+        n = int(encabezado['columnas'])
+        self.columnas = tuple(nombre.decode() for nombre in encabezado['nombres'][:n])
+        tipos = [tipo.decode() for tipo in encabezado['tipos'][:n]]
+        self.tam_bloque = int(encabezado['tam_bloque'])
+        self.muestras = int(encabezado['muestras'])
+        self.fecha = float(encabezado['fecha'])
+        self.parametros = {nombre: float(encabezado['parametros'][nombre]) for nombre in PARAMETROS}
+        self.dtype = dtype_bloque(self.columnas, tipos, self.tam_bloque)
+
+        bloques = (os.path.getsize(ruta) - TAM_ENCABEZADO) // self.dtype.itemsize
+        # Tras un corte pueden faltar bloques que el encabezado ya contaba (o sobrar datos sin contar)
+        self.muestras = min(self.muestras, bloques * self.tam_bloque)
+        if bloques:
+            self.bloques = np.memmap(ruta, dtype=self.dtype, mode='r', offset=TAM_ENCABEZADO, shape=(bloques,))
+        else:
+            self.bloques = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return self.muestras
+
+    def columna(self, nombre):
+        return self.bloques[nombre].reshape(-1)[:self.muestras]
+
+    def como_dict(self):
+        return {nombre: self.columna(nombre) for nombre in self.columnas}
+
+
+def exportar_csv(ruta_sesion, ruta_csv, formato=FORMATO_CSV, bloques_por_paso=64):
+    # Conversión .mtm -> CSV (mismas columnas y formato que "Guardar Datos"), por tramos de bloques
+    sesion = SesionBinaria(ruta_sesion)
+    formatos = formatos_csv(sesion.columnas, formato)
+    paso = bloques_por_paso * sesion.tam_bloque
+    with open(ruta_csv, 'w', newline='') as archivo:
+        archivo.write(','.join(sesion.columnas) + '\n')
+        for inicio in range(0, sesion.muestras, paso):
+            fin = min(inicio + paso, sesion.muestras)
+            primero, ultimo = inicio // sesion.tam_bloque, (fin - 1) // sesion.tam_bloque + 1
+            tramo = sesion.bloques[primero:ultimo]
+            filas = np.column_stack([tramo[nombre].reshape(-1)[:fin - inicio] for nombre in sesion.columnas])
+            np.savetxt(archivo, filas, fmt=formatos, delimiter=',')
+    return sesion.muestras
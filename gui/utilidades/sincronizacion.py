@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+_VUELTA = 2 ** 32  # Secuencia y millis() son uint32 en el firmware
+
+
+class SincronizadorReloj:
+    """Detecta muestras perdidas y alinea el reloj del equipo con el de la PC.
+
+    Cada muestra trae la secuencia del firmware (contador de muestras enviadas) y
+    millis() al enviarla. Un salto de la secuencia mayor que 1 es un hueco: se suman
+    las muestras faltantes en `perdidas`. Si vuelve a 0 (SET MODO, equipo reiniciado)
+    o salta más que `salto_maximo` se cuenta en `reinicios` y no como pérdida.
+
+    La hora de la PC se estima con una recta hora = a + b * millis ajustada por mínimos
+    cuadrados con un punto por lote (millis de la última muestra y hora de llegada) y
+    olvido exponencial de constante `constante` segundos de equipo: así sigue la deriva
+    del cristal y promedia la demora variable del USB. `deriva_ppm` es el error del reloj
+    del equipo respecto del de la PC (positivo: el equipo adelanta).
+
+    Como etapa de LectorSerial agrega a cada lote la columna 'Hora' (time.time()
+    estimado de cada muestra; NaN si la muestra no trae millis).
+    """
+
+    def __init__(self, constante=300.0, salto_maximo=100000, tolerancia_ms=1000, reloj=time.time):
+        self.constante = constante
+        self.salto_maximo = salto_maximo
+        self.tolerancia_ms = tolerancia_ms
+        self.reloj = reloj
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.recibidas = 0
+            self.perdidas = 0
+            self.huecos = 0
+            self.desordenadas = 0
+            self.reinicios = 0
+            self._secuencia = None
+            self._reiniciar_ajuste()
+
+    def _reiniciar_ajuste(self):
+        self._millis = None
+        self._vueltas = 0
+        self._origen = None  # (segundos del equipo, hora de la PC) del primer punto: las sumas van centradas ahí
+        self._ultimo = None
+        self._sumas = np.zeros(5)  # Pesos, x, y, x², xy (exponencialmente ponderadas)
+
+    def __call__(self, lote):
+        # Etapa de LectorSerial: agrega la columna 'Hora' si el decodificador entrega el reloj del equipo
+        columnas = lote.columnas
+        if 'Millis' in columnas:
+            columnas['Hora'] = self.observar(columnas['Secuencia'], columnas['Millis'])
+        return lote
+
+    def observar(self, secuencia, millis, llegada=None):
+        # secuencia, millis: arrays del lote (NaN donde no vienen). Devuelve la hora estimada de cada muestra
+        llegada = self.reloj() if llegada is None else llegada
+        secuencia = np.asarray(secuencia, dtype=np.float64)
+        millis = np.asarray(millis, dtype=np.float64)
+        hora = np.full(len(millis), np.nan)
+        with self._lock:
+            self._contar(secuencia[~np.isnan(secuencia)].astype(np.int64))
+            validos = ~np.isnan(millis)
+            if validos.any():
+                segundos = self._segundos(millis[validos])
+                self._ajustar(segundos[-1], llegada)
+                hora[validos] = self._hora(segundos)
+        return hora
+
+    def _contar(self, secuencia):
+        if not len(secuencia):
+            return
+        previa = secuencia[0] - 1 if self._secuencia is None else self._secuencia
+        saltos = np.diff(secuencia, prepend=previa) % _VUELTA
+        reinicio = ((secuencia == 0) & (saltos != 1)) | ((saltos > self.salto_maximo) & (saltos < _VUELTA - self.salto_maximo))
+        desordenada = ~reinicio & ((saltos == 0) | (saltos >= _VUELTA - self.salto_maximo))
+        hueco = ~reinicio & ~desordenada & (saltos > 1)
+        self.recibidas += len(secuencia)
+        self.perdidas += int(saltos[hueco].sum() - hueco.sum())
+        self.huecos += int(hueco.sum())
+        self.desordenadas += int(desordenada.sum())
+        self.reinicios += int(reinicio.sum())
+        # Una muestra repetida o atrasada no mueve la referencia para la siguiente
+        en_orden = secuencia[~desordenada]
+        if len(en_orden):
+            self._secuencia = int(en_orden[-1])
+
+    def _segundos(self, millis):
+        # millis() -> segundos continuos del equipo: desenrolla la vuelta de los ~49.7 días. Si millis
+        # retrocede más que la tolerancia el equipo se reinició: se descarta el ajuste y las muestras
+        # anteriores del lote quedan sin hora
+        saltos = np.diff(millis, prepend=millis[0] if self._millis is None else self._millis)
+        vuelta = saltos < -_VUELTA / 2
+        reinicio = np.flatnonzero(~vuelta & (saltos < -self.tolerancia_ms))
+        desde = 0
+        if len(reinicio):
+            desde = int(reinicio[-1])
+            self._reiniciar_ajuste()
+            vuelta[:desde + 1] = False
+        self._millis = millis[-1]
+        segundos = (millis + (self._vueltas + np.cumsum(vuelta)) * float(_VUELTA)) / 1000.0
+        self._vueltas += int(vuelta.sum())
+        segundos[:desde] = np.nan
+        return segundos
+
+    def _ajustar(self, x, y):
+        if self._origen is None:
+            self._origen = (x, y)
+        elif self._ultimo is not None:
+            self._sumas *= math.exp(-max(0.0, x - self._ultimo) / self.constante)
+        self._ultimo = x
+        dx, dy = x - self._origen[0], y - self._origen[1]
+        self._sumas += (1.0, dx, dy, dx * dx, dx * dy)
+
+    def _recta(self):
+        # (ordenada, pendiente) en coordenadas centradas en el origen; pendiente 1 hasta que los puntos
+        # cubran unos segundos (desvío de millis mayor que 1 s)
+        n, sx, sy, sxx, sxy = self._sumas
+        varianza = n * sxx - sx * sx
+        pendiente = (n * sxy - sx * sy) / varianza if varianza > n * n else math.nan
+        return (sy - (1.0 if math.isnan(pendiente) else pendiente) * sx) / n, pendiente
+
+    def _hora(self, segundos):
+        ordenada, pendiente = self._recta()
+        if math.isnan(pendiente):
+            pendiente = 1.0
+        return self._origen[1] + ordenada + pendiente * (segundos - self._origen[0])
+
+    @property
+    def perdida(self):
+        # Fracción de las muestras enviadas que no llegaron
+        enviadas = self.recibidas + self.perdidas
+        return self.perdidas / enviadas if enviadas else 0.0
+
+    @property
+    def deriva_ppm(self):
+        with self._lock:
+            if self._origen is None:
+                return math.nan
+            pendiente = self._recta()[1]
+        return float((1.0 / pendiente - 1.0) * 1e6)
+
+    def estadisticas(self):
+        deriva = self.deriva_ppm
+        with self._lock:
+            return {'recibidas': self.recibidas, 'perdidas': self.perdidas, 'perdida': self.perdida,
+                    'huecos': self.huecos, 'desordenadas': self.desordenadas, 'reinicios': self.reinicios,
+                    'deriva_ppm': deriva}
+
+    def resumen(self):
+        # Texto corto para una etiqueta de la interfaz
+        deriva = self.deriva_ppm
+        texto = f"{self.perdidas} perdidas de {self.recibidas + self.perdidas} ({100 * self.perdida:.2f} %)"
+        return texto + (f", deriva {deriva:+.1f} ppm" if not math.isnan(deriva) else "")
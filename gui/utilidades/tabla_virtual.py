@@ -0,0 +1,116 @@
+from tkinter import ttk
+
+
+class TablaVirtual:
+    """Tabla virtualizada sobre un BufferMuestras para un Treeview existente.
+
+    El Treeview tiene siempre tantos ítems como filas entran en pantalla; al desplazarse
+    o al llegar muestras nuevas sólo se reescriben los valores de esos ítems con la
+    ventana correspondiente del buffer. La cantidad de ítems de Tk no crece con la
+    duración del ensayo y vaciar la tabla es vaciar el buffer.
+
+    La barra de desplazamiento la maneja la tabla (no el Treeview). Mientras se muestra
+    la última fila la vista sigue a las muestras nuevas; si el usuario sube, la vista
+    queda fija sobre las mismas muestras hasta que éstas salen del buffer.
+    """
+
+    def __init__(self, tree, scrollbar, muestras, columnas, formato='{:.2f}', alto_fila=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.muestras = muestras
+        self.formato = formato
+        self._indices = [muestras.columnas.index(nombre) for nombre in columnas]
+        self.inicio = 0  # Primera fila visible, relativa a la ventana vigente del buffer
+        self.seguir_final = True
+        self._items = []
+        self._mostrado = None
+        self._total_previo = 0
+        self._cantidad_previa = 0
+        self._alto_fila = alto_fila or self._leer_alto_fila()
+
+        self._ajustar_items(int(tree.cget('height')) or 10)
+        tree.configure(yscrollcommand='')
+        scrollbar.configure(command=self._al_desplazar)
+        tree.bind('<Configure>', self._al_redimensionar)
+        for evento in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            tree.bind(evento, self._al_girar_rueda)
+        scrollbar.set(0.0, 1.0)
+
+    def _leer_alto_fila(self):
+        try:
+            alto = ttk.Style(self.tree).lookup('Treeview', 'rowheight')
+            return int(alto) if alto else 20
+        except (ValueError, TypeError):
+            return 20
+
+    def _ajustar_items(self, filas):
+        # Crea o borra ítems para tener exactamente `filas` (sólo cambia al redimensionar la ventana)
+        while len(self._items) < filas:
+            self._items.append(self.tree.insert('', 'end', values=()))
+        if len(self._items) > filas:
+            self.tree.delete(*self._items[filas:])
+            del self._items[filas:]
+
+    def _al_redimensionar(self, evento):
+        # Se descuenta el encabezado (aprox. una fila) del alto disponible
+        filas = max(1, (evento.height - self._alto_fila - 4) // self._alto_fila)
+        if filas != len(self._items):
+            self._ajustar_items(filas)
+            self.refrescar(forzar=True)
+
+    def _limitar_inicio(self, cantidad):
+        alto = len(self._items)
+        self.inicio = max(0, min(self.inicio, cantidad - alto))
+        self.seguir_final = self.inicio >= cantidad - alto
+
+    def _al_desplazar(self, accion, cantidad, unidad=None):
+        n = len(self.muestras)
+        alto = len(self._items)
+        if accion == 'moveto':
+            self.inicio = int(round(float(cantidad) * n))
+        elif accion == 'scroll':
+            self.inicio += int(cantidad) * (alto if unidad.startswith('page') else 1)
+        self._limitar_inicio(n)
+        self.refrescar()
+
+    def _al_girar_rueda(self, evento):
+        if evento.num == 4 or getattr(evento, 'delta', 0) > 0:
+            self._al_desplazar('scroll', -3, 'units')
+        else:
+            self._al_desplazar('scroll', 3, 'units')
+        return 'break'
+
+    def refrescar(self, forzar=False):
+        # Reescribe las filas visibles sólo si cambió el buffer o la posición (una vez por tick de la interfaz)
+        n = len(self.muestras)
+        total = self.muestras.total
+        alto = len(self._items)
+        if total < self._total_previo:
+            # El buffer se vació (Reiniciar Datos)
+            self.inicio = 0
+            self.seguir_final = True
+        elif not self.seguir_final:
+            # Mantener la vista sobre las mismas muestras aunque se descarten las más antiguas
+            descartadas = (total - self._total_previo) - (n - self._cantidad_previa)
+            self.inicio -= max(0, descartadas)
+        self._total_previo = total
+        self._cantidad_previa = n
+        if self.seguir_final:
+            self.inicio = max(0, n - alto)
+        else:
+            self._limitar_inicio(n)
+
+        clave = (total, n, self.inicio, alto)
+        if clave == self._mostrado and not forzar:
+            return
+        self._mostrado = clave
+        filas = self.muestras.filas(self.inicio, self.inicio + alto)[:, self._indices]
+        for k, item in enumerate(self._items):
+            if k < len(filas):
+                self.tree.item(item, values=[self.formato.format(valor) for valor in filas[k]])
+            else:
+                self.tree.item(item, values=())
+        if n:
+            self.scrollbar.set(self.inicio / n, min(1.0, (self.inicio + alto) / n))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,110 @@
+import time
+
+import numpy as np
+
+
+class CompensadorTara:
+    """Resta al torque la tara medida con los motores detenidos y su deriva lenta.
+
+    Reposo: todas las `velocidades` del lote en valor absoluto <= `umbral`. En cada ventana
+    de reposo se descartan las primeras `descartar` muestras (el asentamiento al frenar) y,
+    desde que quedan `minimo`, la tara es la media acumulada de la ventana. Al cerrarse la
+    ventana (vuelve el movimiento o `cerrar_ventana`), si pasaron al menos `intervalo_deriva`
+    segundos desde la anterior, la deriva es la pendiente entre ambas taras. Con los motores
+    en marcha se resta tara + deriva·(t - t_tara). Todo es O(1) por muestra.
+
+    La corrección de cada muestra queda en la columna 'Tara' (se graba con la sesión, así
+    Torque + Tara reproduce el valor sin compensar) y cada ventana cerrada en `correcciones`.
+    """
+
+    def __init__(self, columna='Torque', velocidades=('Velocidad Disco', 'Velocidad Bola'), umbral=1e-3, minimo=5,
+                 descartar=2, intervalo_deriva=60.0, reloj=time.time):
+        self.columna = columna
+        self.velocidades = tuple(velocidades)
+        self.umbral = umbral
+        self.minimo = minimo
+        self.descartar = descartar
+        self.intervalo_deriva = intervalo_deriva
+        self.reloj = reloj
+        self.tara = 0.0
+        self.deriva = 0.0      # Unidades de torque por segundo
+        self.hora_tara = None  # Hora media de la ventana que dio la tara vigente
+        self.correcciones = []  # dicts con hora, tara, deriva y muestras de cada ventana cerrada
+        self._anterior = None  # (hora, tara) de la última ventana cerrada
+        self._reiniciar_ventana()
+
+    def _reiniciar_ventana(self):
+        self._en_reposo = 0  # Muestras de la ventana en curso (con las descartadas)
+        self._suma = 0.0
+        self._suma_horas = 0.0
+        self._n = 0
+
+    @property
+    def reposo_medido(self):
+        # La ventana de reposo en curso ya tiene muestras suficientes para dar la tara
+        return self._n >= self.minimo
+
+    def _modelo(self, horas):
+        if self.hora_tara is None:
+            return np.full(len(horas), self.tara)
+        return self.tara + self.deriva * (horas - self.hora_tara)
+
+    def cerrar_ventana(self):
+        # Fija la tara de la ventana de reposo en curso (si alcanzó el mínimo) y actualiza la deriva
+        if self._n >= self.minimo:
+            tara, hora = self._suma / self._n, self._suma_horas / self._n
+            if self._anterior is not None and hora - self._anterior[0] >= self.intervalo_deriva:
+                self.deriva = (tara - self._anterior[1]) / (hora - self._anterior[0])
+            self.tara, self.hora_tara = tara, hora
+            self._anterior = (hora, tara)
+            self.correcciones.append({'hora': hora, 'tara': tara, 'deriva': self.deriva, 'muestras': self._n})
+        self._reiniciar_ventana()
+
+    def corregir(self, torque, reposo, horas):
+        # Corrección (array) a restar a `torque`; `reposo` es la máscara de muestras con los motores detenidos
+        torque = np.asarray(torque, dtype=np.float64)
+        horas = np.asarray(horas, dtype=np.float64)
+        if len(torque) == 0:
+            # Lote sólo con mensajes (ecos de comandos en reposo): no dice nada del movimiento
+            return np.empty(0)
+        if not reposo.any():
+            # Lo habitual durante el ensayo: todo el lote en marcha
+            self.cerrar_ventana()
+            return self._modelo(horas)
+        correccion = np.empty(len(torque))
+        cortes = np.flatnonzero(np.diff(reposo)) + 1
+        for inicio, fin in zip(np.r_[0, cortes].tolist(), np.r_[cortes, len(torque)].tolist()):
+            if inicio == fin:
+                continue
+            tramo = slice(inicio, fin)
+            if not reposo[inicio]:
+                self.cerrar_ventana()
+                correccion[tramo] = self._modelo(horas[tramo])
+                continue
+            posicion = self._en_reposo + np.arange(fin - inicio)
+            usar = (posicion >= self.descartar) & ~np.isnan(torque[tramo])
+            n = self._n + np.cumsum(usar)
+            suma = self._suma + np.cumsum(np.where(usar, torque[tramo], 0.0))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                correccion[tramo] = np.where(n >= self.minimo, suma / n, self._modelo(horas[tramo]))
+            self._en_reposo += fin - inicio
+            self._n, self._suma = int(n[-1]), float(suma[-1])
+            self._suma_horas += float(np.sum(horas[tramo][usar]))
+        return correccion
+
+    def en_reposo(self, columnas):
+        reposo = np.ones(len(columnas[self.columna]), dtype=bool)
+        for nombre in self.velocidades:
+            reposo &= np.abs(np.asarray(columnas[nombre], dtype=np.float64)) <= self.umbral
+        return reposo
+
+    def __call__(self, lote):
+        # Etapa de LectorSerial: usa 'Hora' (SincronizadorReloj) si está, o la hora de llegada del lote
+        columnas = lote.columnas
+        n = len(columnas[self.columna])
+        horas = np.array(columnas['Hora'], dtype=np.float64) if 'Hora' in columnas else np.full(n, np.nan)
+        horas[np.isnan(horas)] = self.reloj()
+        correccion = self.corregir(columnas[self.columna], self.en_reposo(columnas), horas)
+        columnas[self.columna] = np.asarray(columnas[self.columna], dtype=np.float64) - correccion
+        columnas['Tara'] = correccion
+        return lote
@@ -0,0 +1,176 @@
+import re
+from typing import NamedTuple
+
+import numpy as np
+
+# Columnas de cada muestra, en el orden en que las imprime MTM_Epsilon_12.11_Dutty_Aumentado.ino
+COLUMNAS = ('Tiempo', 'Freq Disco', 'Duty Disco', 'Velocidad Disco', 'Freq Bola', 'Duty Bola', 'Velocidad Bola', 'Torque', 'T_pulse_D', 'T_pulse_B')
+# Reloj del equipo que acompaña cada muestra: contador de muestras enviadas y millis() al enviarla
+# (NaN si el firmware no los envía). Van en los lotes junto a COLUMNAS
+COLUMNAS_RELOJ = ('Secuencia', 'Millis')
+
+
+class MuestraTelemetria(NamedTuple):
+    tiempo: float
+    freq_disco: float
+    duty_disco: float
+    vel_disco: float
+    freq_bola: float
+    duty_bola: float
+    vel_bola: float
+    torque: float
+    t_pulse_d: float
+    t_pulse_b: float
+    secuencia: float = float('nan')
+    millis: float = float('nan')
+
+
+class LoteTelemetria(NamedTuple):
+    columnas: dict  # {nombre de COLUMNAS (y COLUMNAS_RELOJ u otras que agregue el decodificador): np.ndarray}
+    mensajes: list  # Líneas que no son telemetría (texto decodificado)
+
+    def __bool__(self):
+        # Falso si el lote no trae muestras ni mensajes (LectorSerial no lo encola)
+        return bool(self.mensajes) or len(self.columnas['Tiempo']) > 0
+
+
+# (etiqueta, unidad) de cada campo de la línea "Tiempo: 1.23 s | Freq Disco: ... | T_pulse_B: 4.56 us"
+_CAMPOS = (('Tiempo', ' s'), ('Freq Disco', ' Hz'), ('Duty Disco', '%'), ('Velocidad Disco', ' m/s'),
+           ('Freq Bola', ' Hz'), ('Duty Bola', '%'), ('Velocidad Bola', ' m/s'), ('Torque', ' kg'),
+           ('T_pulse_D', ' us'), ('T_pulse_B', ' us'))
+_CAMPOS_RELOJ = (('Seq', ''), ('Millis', ' ms'))  # Al final de la línea: "... | Seq: 1234 | Millis: 56789 ms"
+_PREFIJO = b'Tiempo:'
+
+
+def _plantilla(campos):
+    return ' | '.join(f'{etiqueta}: {unidad}' for etiqueta, unidad in campos).encode()
+
+
+# Escáner de campos fijos: al borrar los caracteres numéricos de una línea válida queda exactamente
+# una de estas plantillas (con o sin T_pulse_D/T_pulse_B, que el firmware omite a velocidad constante,
+# y con o sin Seq/Millis). Cada una indica cuántos campos de COLUMNAS trae y en qué columnas de
+# COLUMNAS + COLUMNAS_RELOJ van sus números
+_NUMERICOS = b'0123456789.-+'
+_PLANTILLAS = {}
+for _n in (10, 8):
+    _PLANTILLAS[_plantilla(_CAMPOS[:_n])] = (_n, np.arange(_n))
+    _PLANTILLAS[_plantilla(_CAMPOS[:_n] + _CAMPOS_RELOJ)] = (_n, np.r_[np.arange(_n), 10, 11])
+_COLUMNAS_LOTE = COLUMNAS + COLUMNAS_RELOJ
+# Deja sólo números y separadores: '|' pasa a ser un espacio y se borran etiquetas y unidades
+_A_ESPACIO = bytes.maketrans(b'|', b' ')
+_NO_NUMERICOS = bytes(c for c in range(256) if c not in _NUMERICOS + b' |\n')
+
+# Respaldo para líneas que el escáner no reconoce (p. ej. "Torque: nan kg"); también valida el formato
+_NUMERO = r'([-+]?\d+(?:\.\d*)?|[-+]?\.\d+|nan|inf|-inf)'
+
+
+def _patron(campos):
+    return ' \\| '.join(f'{re.escape(etiqueta)}: {_NUMERO}{re.escape(unidad)}' for etiqueta, unidad in campos)
+
+
+PATRON_LINEA = re.compile(rf'{_patron(_CAMPOS[:8])}(?: \| {_patron(_CAMPOS[8:])})?(?: \| {_patron(_CAMPOS_RELOJ)})?')
+
+
+def formatear_lineas(columnas):
+    # Líneas de texto con el mismo formato que imprime el firmware (para mostrar muestras binarias en el registro)
+    valores = [columnas[nombre] for nombre in COLUMNAS]
+    lineas = []
+    for fila in zip(*valores):
+        campos = [f'{etiqueta}: {valor:.2f}{unidad}' for (etiqueta, unidad), valor in zip(_CAMPOS, fila) if valor == valor]
+        lineas.append(' | '.join(campos))
+    return lineas
+
+
+class ParserTelemetria:
+    """Decodifica las líneas de telemetría del firmware en una sola pasada.
+
+    Las líneas que empiezan con "Tiempo:" pero no respetan el formato se cuentan en
+    `errores` en lugar de lanzar excepciones. `alimentar` acepta bloques de bytes tal
+    como llegan del puerto (con líneas cortadas entre bloques) y decodifica todas las
+    muestras del bloque juntas en columnas de NumPy.
+    """
+
+    def __init__(self):
+        self.lineas = 0
+        self.muestras = 0
+        self.errores = 0
+        self._resto = b''
+
+    def parsear_linea(self, linea):
+        # linea: str de telemetría sin el salto de línea. Devuelve MuestraTelemetria o None si no es válida
+        self.lineas += 1
+        return self._decodificar(linea.strip().encode())
+
+    def _decodificar(self, datos):
+        plantilla = _PLANTILLAS.get(datos.translate(None, _NUMERICOS))
+        if plantilla is not None:
+            n, destinos = plantilla
+            try:
+                valores = list(map(float, datos.translate(_A_ESPACIO, _NO_NUMERICOS).split()))
+            except ValueError:
+                valores = []
+            if len(valores) == len(destinos):
+                self.muestras += 1
+                if n < len(COLUMNAS):
+                    valores[n:n] = [float('nan')] * (len(COLUMNAS) - n)
+                return MuestraTelemetria(*valores)
+        coincidencia = PATRON_LINEA.fullmatch(datos.decode('utf-8', errors='replace'))
+        if coincidencia is None:
+            self.errores += 1
+            return None
+        self.muestras += 1
+        return MuestraTelemetria(*(float(valor) for valor in coincidencia.groups('nan')))
+
+    def parsear_lineas(self, lineas):
+        # lineas: lista de bytes sin '\n'. Devuelve un LoteTelemetria con todas las muestras del bloque
+        telemetria = []
+        mensajes = []
+        for linea in lineas:
+            linea = linea.strip()
+            if linea.startswith(_PREFIJO):
+                telemetria.append(linea)
+            elif linea:
+                mensajes.append(linea.decode('utf-8', errors='replace'))
+        self.lineas += len(telemetria) + len(mensajes)
+
+        tabla = np.full((len(telemetria), len(_COLUMNAS_LOTE)), np.nan)
+        validas = np.zeros(len(telemetria), dtype=bool)
+        if telemetria:
+            plantillas = b'\n'.join(telemetria).translate(None, _NUMERICOS).split(b'\n')
+            destinos = [_PLANTILLAS.get(p) for p in plantillas]
+            reconocidas = np.array([d is not None for d in destinos])
+            if reconocidas.any():
+                seleccion = telemetria if reconocidas.all() else [l for l, ok in zip(telemetria, reconocidas) if ok]
+                destinos = [d[1] for d in destinos if d is not None]
+                # Todos los números del bloque se convierten en una sola llamada de NumPy
+                try:
+                    planos = np.fromstring(b' '.join(seleccion).translate(_A_ESPACIO, _NO_NUMERICOS), sep=' ')
+                except ValueError:
+                    planos = None  # Algún número mal formado: se resuelve línea por línea
+                columnas = np.concatenate(destinos)
+                if planos is not None and planos.size == columnas.size:
+                    filas = np.repeat(np.flatnonzero(reconocidas), [len(d) for d in destinos])
+                    tabla[filas, columnas] = planos
+                    validas = reconocidas
+                    self.muestras += len(destinos)
+            # Lo que el escáner no pudo decodificar (valores nan, números mal formados) va de a una línea
+            for i in np.flatnonzero(~validas):
+                muestra = self._decodificar(telemetria[i])
+                if muestra is not None:
+                    tabla[i] = muestra
+                    validas[i] = True
+            if not validas.all():
+                tabla = tabla[validas]
+        return LoteTelemetria({nombre: tabla[:, j] for j, nombre in enumerate(_COLUMNAS_LOTE)}, mensajes)
+
+    def alimentar(self, datos):
+        # datos: bytes recibidos del puerto. La última línea incompleta se guarda para el próximo bloque
+        lineas = (self._resto + datos).split(b'\n')
+        self._resto = lineas.pop()
+        return self.parsear_lineas(lineas)
+
+    def reiniciar(self):
+        self.lineas = 0
+        self.muestras = 0
+        self.errores = 0
+        self._resto = b''
@@ -0,0 +1,156 @@
+import struct
+from binascii import crc_hqx
+
+import numpy as np
+
+from utilidades.telemetria import COLUMNAS, LoteTelemetria, ParserTelemetria
+
+# Trama de telemetría binaria del firmware (SET MODO=BIN), little-endian, 52 bytes:
+#   [0xAA 0x55] [secuencia uint32] [millis uint32] [10 x float32 en el orden de COLUMNAS] [CRC16-CCITT uint16]
+# El CRC (polinomio 0x1021, valor inicial 0, igual que binascii.crc_hqx) cubre secuencia, millis y floats.
+MAGIA = b'\xaa\x55'
+FORMATO_TRAMA = '<2sII10fH'
+TAM_TRAMA = struct.calcsize(FORMATO_TRAMA)
+DTYPE_TRAMA = np.dtype([('magia', '<u2'), ('secuencia', '<u4'), ('millis', '<u4'), ('valores', '<f4', (len(COLUMNAS),)), ('crc', '<u2')])
+_MAGIA_U2 = int.from_bytes(MAGIA, 'little')
+_FIN_CRC = TAM_TRAMA - 2
+
+# Comandos para cambiar el formato de la telemetría en el firmware
+COMANDO_BINARIO = "SET MODO=BIN\n"
+COMANDO_TEXTO = "SET MODO=ASCII\n"
+
+
+def empaquetar_trama(secuencia, valores, millis=0):
+    # Trama tal como la arma enviarTelemetria() en el firmware (usado por simuladores y pruebas)
+    cuerpo = struct.pack('<II10f', secuencia & 0xFFFFFFFF, int(millis) & 0xFFFFFFFF, *valores)
+    return MAGIA + cuerpo + struct.pack('<H', crc_hqx(cuerpo, 0))
+
+
+class DecodificadorBinario:
+    """Decodifica el flujo del puerto con tramas binarias mezcladas con líneas de texto.
+
+    Los mensajes del firmware (ecos de SET, "Iniciando aceleración...") siguen llegando
+    como texto aun en modo binario, y las líneas "Tiempo: ..." del modo ASCII también se
+    decodifican, así que el mismo decodificador sirve antes y después de SET MODO=BIN.
+
+    Las tramas consecutivas se decodifican juntas con np.frombuffer. Si una trama no
+    pasa el CRC se descartan los bytes hasta la próxima marca 0xAA 0x55 (resincronización)
+    y se cuenta en `errores_crc`. La trama o la marca incompleta al final de un bloque se
+    guarda para el próximo. Si un bloque trae tramas y líneas "Tiempo: ..." (cambio de modo
+    a mitad de bloque), las filas del lote quedan en el orden en que llegaron.
+    """
+
+    def __init__(self):
+        self.texto = ParserTelemetria()
+        self.tramas = 0
+        self.errores_crc = 0
+        self.bytes_descartados = 0
+        self._resto = b''
+        self._linea_pendiente = b''
+
+    @property
+    def muestras(self):
+        return self.tramas + self.texto.muestras
+
+    @property
+    def errores(self):
+        return self.errores_crc + self.texto.errores
+
+    def alimentar(self, datos):
+        # datos: bytes recibidos del puerto. Devuelve un LoteTelemetria con la columna extra 'Secuencia'
+        buf = self._resto + datos
+        n = len(buf)
+        partes = []  # bytes de texto y arrays de tramas, en el orden del flujo
+        i = 0
+        while i < n:
+            j = buf.find(MAGIA, i)
+            if j < 0:
+                # No hay más tramas; si el bloque termina en 0xAA puede ser el comienzo de una marca
+                fin = n - 1 if buf[-1] == MAGIA[0] else n
+                partes.append(buf[i:fin])
+                i = fin
+                break
+            if j > i:
+                partes.append(buf[i:j])
+            if n - j < TAM_TRAMA:
+                i = j
+                break
+            tramas = np.frombuffer(buf, DTYPE_TRAMA, count=(n - j) // TAM_TRAMA, offset=j)
+            con_marca = tramas['magia'] == _MAGIA_U2
+            seguidas = len(tramas) if con_marca.all() else int(con_marca.argmin())
+            validas = seguidas
+            vista = memoryview(buf)
+            for k, crc in enumerate(tramas['crc'][:seguidas].tolist()):
+                inicio = j + k * TAM_TRAMA
+                if crc_hqx(vista[inicio + 2:inicio + _FIN_CRC], 0) != crc:
+                    validas = k
+                    break
+            if validas:
+                partes.append(tramas[:validas])
+            i = j + validas * TAM_TRAMA
+            if validas < seguidas:
+                # Trama corrupta: se saltea hasta la próxima marca
+                self.errores_crc += 1
+                siguiente = buf.find(MAGIA, i + 1)
+                if siguiente < 0:
+                    siguiente = n - 1 if buf[-1] == MAGIA[0] else n
+                self.bytes_descartados += siguiente - i
+                i = siguiente
+        self._resto = buf[i:]
+
+        if all(isinstance(parte, bytes) for parte in partes):
+            # Sólo texto (modo ASCII)
+            return self.texto.parsear_lineas(self._lineas(b''.join(partes)))
+        if len(partes) == 1:
+            # Lo habitual en modo binario: el bloque entero son tramas seguidas
+            return LoteTelemetria(self._columnas(partes[0]), [])
+
+        # Tramas y texto mezclados: cada tramo se convierte por separado y se concatenan en orden
+        tramos = []
+        mensajes = []
+        for parte in partes:
+            if isinstance(parte, bytes):
+                lote = self.texto.parsear_lineas(self._lineas(parte))
+                mensajes.extend(lote.mensajes)
+                if len(lote.columnas['Tiempo']):
+                    tramos.append(lote.columnas)
+            else:
+                tramos.append(self._columnas(parte))
+        nombres = (*COLUMNAS, 'Secuencia', 'Millis')
+        columnas = {nombre: np.concatenate([tramo.get(nombre, np.full(len(tramo['Tiempo']), np.nan)) for tramo in tramos])
+                    for nombre in nombres}
+        return LoteTelemetria(columnas, mensajes)
+
+    def _columnas(self, tramas):
+        self.tramas += len(tramas)
+        valores = tramas['valores'].astype(np.float64)
+        columnas = {nombre: valores[:, k] for k, nombre in enumerate(COLUMNAS)}
+        columnas['Secuencia'] = tramas['secuencia'].astype(np.float64)
+        columnas['Millis'] = tramas['millis'].astype(np.float64)
+        return columnas
+
+    def _lineas(self, texto):
+        # Separa el texto fuera de las tramas en líneas completas, descartando las que tienen bytes binarios
+        if not texto:
+            return []
+        lineas = (self._linea_pendiente + texto).split(b'\n')
+        self._linea_pendiente = lineas.pop()
+        limpias = []
+        for linea in lineas:
+            try:
+                legible = linea.rstrip(b'\r').decode('utf-8').isprintable()
+            except UnicodeDecodeError:
+                legible = False
+            if legible:
+                limpias.append(linea)
+            else:
+                self.bytes_descartados += len(linea) + 1
+        return limpias
+
+    def reiniciar(self):
+        self.texto.reiniciar()
+        self.tramas = 0
+        self.errores_crc = 0
+        self.bytes_descartados = 0
+        self._resto = b''
+        self._linea_pendiente = b''
@@ -2,8 +2,12 @@ import tkinter as tk
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from controladores.controlador_motor import ControladorMotor
+from utilidades.graficador import GraficadorVivo
+from utilidades.historial import HistorialMuestras
+from utilidades.puente_gui import PuenteGUI
 from tkinter import filedialog, messagebox
 import json
+import queue
 
 class VentanaPrincipal:
     def __init__(self, root):
@@ -36,27 +40,42 @@ class VentanaPrincipal:
         
         # Configuración del gráfico
         self.figura = Figure(figsize=(5, 5), dpi=100)
-        self.grafico = self.figura.add_subplot(111)
-        self.grafico.set_title("Torque vs. Tiempo")
-        self.grafico.set_xlabel("Tiempo (s)")
-        self.grafico.set_ylabel("Torque (Nm)")
-        
         self.canvas = FigureCanvasTkAgg(self.figura, master=self.frame)
         self.canvas.get_tk_widget().grid(row=2, column=0, columnspan=2)
+        self.graficador = GraficadorVivo(self.figura, self.canvas, [
+            {'ylabel': 'Torque (Nm)', 'titulo': 'Torque vs. Tiempo', 'series': [('torque', 'Torque (Nm)', 'C0')]},
+        ])
+
+        # Adquisición continua: las respuestas a GET_TORQUE llegan en lotes por esta cola
+        self.datos = HistorialMuestras(('Tiempo', 'Torque'))
+        self.cola_torque = queue.Queue()
+        self.puente = PuenteGUI(self.cola_torque, self.aplicar_lote, periodo_ms=100)
+        self.puente.iniciar_tk(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar)
     
     def iniciar_motor(self):
         try:
             rpm1 = int(self.entrada_vel1.get())
             self.controlador_motor.enviar_comando_motor1(rpm1)
-            self.actualizar_grafico()
+            self.iniciar_adquisicion()
         except ValueError:
             messagebox.showerror("Error", "Ingrese un valor numérico para RPM")
     
-    def actualizar_grafico(self):
-        torque_data = self.controlador_motor.obtener_datos_torque()
-        self.grafico.clear()
-        self.grafico.plot(torque_data['tiempo'], torque_data['torque'])
-        self.canvas.draw_idle()  # Usa draw_idle para optimización.
+    def iniciar_adquisicion(self):
+        # Varios GET_TORQUE en vuelo en lugar de una ida y vuelta completa por muestra
+        if self.controlador_motor.adquisicion is None:
+            self.datos.limpiar()
+            self.graficador.limpiar()
+            self.controlador_motor.iniciar_adquisicion(en_vuelo=4, cola=self.cola_torque)
+    
+    def aplicar_lote(self, lote):
+        self.datos.agregar_lote(lote.columnas)
+        self.graficador.actualizar(self.datos.columna('Tiempo'), {'torque': self.datos.columna('Torque')})
+    
+    def cerrar(self):
+        self.puente.detener()
+        self.controlador_motor.cerrar()
+        self.root.destroy()
 
     def guardar_configuracion(self):
         configuracion = {
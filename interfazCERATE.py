@@ -1,13 +1,29 @@
+import os
+import queue
 import sys
-import threading
 import serial
 import serial.tools.list_ports
 import time
 import csv
+import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
 
+# Módulos compartidos de la interfaz (gui/utilidades)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gui'))
+from utilidades.canal_comandos import CanalComandos, reenviable_cerate, respuestas_cerate
+from utilidades.decodificador_cerate import CerateDecoder
+from utilidades.graficador import GraficadorVivo
+from utilidades.historial import HistorialMuestras
+from utilidades.lector_serial import LectorSerial
+from utilidades.magnitudes import relacion_deslizamiento, velocidad_arrastre, velocidad_desde_rpm
+from utilidades.puente_gui import AvisoErrores, PuenteGUI
+from utilidades.registro_mensajes import ERROR, FIRMWARE, INTERFAZ, TELEMETRIA, RegistroMensajes, clasificar
+from utilidades.sincronizacion import SincronizadorReloj
+from utilidades.tara import CompensadorTara
+
+
 class MiniTractionMachine(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
@@ -16,14 +32,17 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
 
         self.serial_port = None
         self.is_connected = False
-        self.data_thread = None
-        self.running = False
+        self.reader = None
+        self.data_queue = queue.Queue()
+        self.commands = None  # CanalComandos: escribe fuera del hilo de Qt y sigue la respuesta de cada comando
+        self.finished_commands = queue.Queue()
 
-        self.rpm1_data = []
-        self.rpm2_data = []
-        self.torque_data = []
-        self.time_data = []
+        # Todo lo recibido, en columnas de NumPy: la gráfica usa vistas sin copiar las listas en cada cuadro
+        self.data = HistorialMuestras(('Tiempo', 'Torque', 'RPM1', 'RPM2'))
         self.start_time = time.time()
+        self.synchronizer = None  # Líneas perdidas y deriva del reloj del equipo (con Seq/Millis del firmware)
+        self.tare = CompensadorTara(velocidades=('RPM1', 'RPM2'))  # Tara en reposo y deriva; sigue entre conexiones
+        self.logged_corrections = 0
 
         self.setup_ui()
         self.setup_plots()
@@ -34,6 +53,15 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
         self.timer.timeout.connect(self.update_graph)
         self.timer.start(500)
 
+        self.thread_errors = AvisoErrores()  # Fallas del lector y de la actualización de la interfaz, una vez cada una
+        self.command_timer = QtCore.QTimer()
+        self.command_timer.timeout.connect(self.log_command_results)
+        self.command_timer.start(100)
+
+        # El hilo lector sólo decodifica y encola; los widgets se actualizan acá, en el hilo de Qt
+        self.bridge = PuenteGUI(self.data_queue, self.process_lines, periodo_ms=100)
+        self.bridge.iniciar_qt(QtCore.QTimer(self))
+
     def setup_ui(self):
         # Ventana principal y layout
         central_widget = QtWidgets.QWidget()
@@ -181,11 +209,29 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
         main_layout.addLayout(motors_layout)
 
         # Área de Mensajes
+        messages_layout = QtWidgets.QHBoxLayout()
         messages_label = QtWidgets.QLabel("Mensajes:")
-        main_layout.addWidget(messages_label)
+        messages_layout.addWidget(messages_label)
+        # Tipos de mensaje visibles (las líneas Torque:... periódicas no se guardan salvo que se marquen)
+        self.message_filters = {}
+        for kind, text, checked in ((FIRMWARE, "Equipo", True), (INTERFAZ, "Enviados", True), (ERROR, "Errores", True), (TELEMETRIA, "Telemetría", False)):
+            checkbox = QtWidgets.QCheckBox(text)
+            checkbox.setChecked(checked)
+            checkbox.toggled.connect(self.filter_messages)
+            messages_layout.addWidget(checkbox)
+            self.message_filters[kind] = checkbox
+        messages_layout.addStretch()
+        # Motor 1 mueve el disco y motor 2 la bola: SRR y velocidad de arrastre de la última muestra
+        self.traction_label = QtWidgets.QLabel("SRR: - | Arrastre: - m/s")
+        messages_layout.addWidget(self.traction_label)
+        self.link_label = QtWidgets.QLabel("Enlace: sin datos")
+        messages_layout.addWidget(self.link_label)
+        main_layout.addLayout(messages_layout)
         self.message_area = QtWidgets.QTextEdit()
         self.message_area.setReadOnly(True)
         main_layout.addWidget(self.message_area)
+        # Registro acotado: se escribe en bloque una vez por tick y se recorta de a bloques
+        self.message_log = RegistroMensajes(self.message_area, max_lineas=2000)
 
         # Gráfica
         graph_group = QtWidgets.QGroupBox("Gráfica de Torque, RPM y Velocidad Lineal")
@@ -199,7 +245,15 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
         self.setCentralWidget(central_widget)
 
     def setup_plots(self):
-        pass  # La gráfica ya se configuró en setup_ui
+        # Ejes y líneas persistentes; update_graph sólo actualiza los datos (blitting)
+        self.graficador = GraficadorVivo(self.figure, self.canvas, [
+            {'ylabel': 'Valor', 'titulo': 'Torque y RPM vs Tiempo', 'series': [
+                ('torque', 'Torque (Nm)', 'blue'),
+                ('rpm1', 'RPM Motor 1', 'red'),
+                ('rpm2', 'RPM Motor 2', 'green'),
+            ]},
+        ])
+        self.puntos_graficados = 0
 
     def setup_connections(self):
         self.refresh_button.clicked.connect(self.refresh_ports)
@@ -217,27 +271,56 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
             try:
                 self.serial_port = serial.Serial(port_name, 115200, timeout=1)
                 self.is_connected = True
-                self.running = True
-                self.data_thread = threading.Thread(target=self.read_serial_data)
-                self.data_thread.start()
+                # M, AL y AS no se reenvían: repetirlos movería el motor de más
+                self.commands = CanalComandos(self.serial_port.write, respuestas_cerate, avisar=self.finished_commands.put,
+                                              reenviable=reenviable_cerate)
+                self.commands.start()
+                # LectorSerial vacía el puerto en bloques y entrega las líneas ya decodificadas
+                self.synchronizer = SincronizadorReloj()
+                decoder = CerateDecoder(self.start_time, self.synchronizer, self.tare)
+                self.reader = LectorSerial(self.serial_port, decoder, self.data_queue, etapas=(self.pass_replies,))
+                self.reader.start()
                 QtWidgets.QMessageBox.information(self, "Conexión Exitosa", f"Conectado a {port_name}")
                 self.connect_button.setText("Desconectar")
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, "Error", f"No se pudo conectar al puerto {port_name}\n{str(e)}")
         else:
-            self.running = False
-            time.sleep(1)
+            self.stop_reading()
+            self.message_log.escribir(f"Comandos: {self.commands.resumen()}")
             self.serial_port.close()
             self.is_connected = False
             QtWidgets.QMessageBox.information(self, "Desconectado", "Conexión cerrada.")
             self.connect_button.setText("Conectar")
 
+    def send_command(self, motor_number, command):
+        # Vuelve enseguida: el canal escribe y log_command_results informa la respuesta del equipo
+        self.commands.enviar([command], f"Motor {motor_number}: {command}")
+        self.message_log.escribir(f"Enviado al Motor {motor_number}: {command}")
+
+    def pass_replies(self, lines):
+        # Etapa del lector: las líneas que no son muestras pueden ser respuestas a los comandos
+        self.commands.recibir([line for line, sample in lines if sample is None])
+        return lines
+
+    def log_command_results(self):
+        # Corre en el hilo de Qt: cada comando confirmado (con su latencia) o no
+        while not self.finished_commands.empty():
+            sent = self.finished_commands.get_nowait()
+            for command in sent.fallidos():
+                detail = f": {command.respuesta}" if command.respuesta else f" ({command.intentos} intentos)"
+                self.message_log.escribir(f"{sent.nombre}, {command.estado}{detail}", ERROR)
+            if sent.confirmado and sent.latencia is not None:
+                self.message_log.escribir(f"{sent.nombre}: confirmado en {1000 * sent.latencia:.0f} ms")
+        # Un lector que se detuvo por un error deja de recibir datos aunque el puerto siga abierto
+        sources = (("Lectura serial", self.reader), ("Actualización de la interfaz", self.bridge))
+        for warning in self.thread_errors.nuevos(sources):
+            self.message_log.escribir(warning, ERROR)
+
     def send_config(self, motor_number):
         if self.is_connected:
             microsteps = self.motor_widgets[motor_number]['microsteps_input'].value()
             command = f"MSPR{microsteps}"
-            self.serial_port.write((command + '\n').encode())
-            self.message_area.append(f"Enviado al Motor {motor_number}: {command}")
+            self.send_command(motor_number, command)
         else:
             QtWidgets.QMessageBox.warning(self, "Desconectado", "Por favor, conecte el puerto serial primero.")
 
@@ -246,8 +329,7 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
             deg = self.motor_widgets[motor_number]['deg_input'].value()
             rpm = self.motor_widgets[motor_number]['rpm_deg_input'].value()
             command = f"M{motor_number}{deg},{rpm}"
-            self.serial_port.write((command + '\n').encode())
-            self.message_area.append(f"Enviado al Motor {motor_number}: {command}")
+            self.send_command(motor_number, command)
         else:
             QtWidgets.QMessageBox.warning(self, "Desconectado", "Por favor, conecte el puerto serial primero.")
 
@@ -255,8 +337,7 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
         if self.is_connected:
             rpm = self.motor_widgets[motor_number]['rpm_input'].value()
             command = f"S{motor_number}{rpm}"
-            self.serial_port.write((command + '\n').encode())
-            self.message_area.append(f"Enviado al Motor {motor_number}: {command}")
+            self.send_command(motor_number, command)
         else:
             QtWidgets.QMessageBox.warning(self, "Desconectado", "Por favor, conecte el puerto serial primero.")
 
@@ -271,75 +352,77 @@ class MiniTractionMachine(QtWidgets.QMainWindow):
                 command = f"AS{motor_number}{rpm_init},{rpm_final},{time_sec}"
             else:
                 return
-            self.serial_port.write((command + '\n').encode())
-            self.message_area.append(f"Enviado al Motor {motor_number}: {command}")
+            self.send_command(motor_number, command)
         else:
             QtWidgets.QMessageBox.warning(self, "Desconectado", "Por favor, conecte el puerto serial primero.")
 
     def send_stop_command(self, motor_number):
         if self.is_connected:
             command = f"P{motor_number}"
-            self.serial_port.write((command + '\n').encode())
-            self.message_area.append(f"Enviado al Motor {motor_number}: {command}")
+            self.send_command(motor_number, command)
         else:
             QtWidgets.QMessageBox.warning(self, "Desconectado", "Por favor, conecte el puerto serial primero.")
 
-    def read_serial_data(self):
-        while self.running:
-            try:
-                line = self.serial_port.readline().decode().strip()
-                if line:
-                    self.message_area.append(f"Recibido: {line}")
-                    if line.startswith("Torque:"):
-                        self.parse_data(line)
-            except Exception as e:
-                print(f"Error leyendo datos: {e}")
-
-    def parse_data(self, data_line):
-        try:
-            data_parts = data_line.split(',')
-            torque_str = data_parts[0].split(':')[1]
-            rpm1_str = data_parts[1].split(':')[1]
-            rpm2_str = data_parts[2].split(':')[1]
-
-            torque_value = float(torque_str) + 1.0  # Agregar +1 al torque
-            rpm1_value = float(rpm1_str)
-            rpm2_value = float(rpm2_str)
-            timestamp = time.time() - self.start_time
-
-            self.torque_data.append(torque_value)
-            self.rpm1_data.append(rpm1_value)
-            self.rpm2_data.append(rpm2_value)
-            self.time_data.append(timestamp)
-
-            # Calcular velocidad lineal para cada motor
-            for motor_number in [1, 2]:
-                rpm_value = rpm1_value if motor_number == 1 else rpm2_value
-                radius_mm = self.motor_widgets[motor_number]['radius_input'].value()
-                radius_m = radius_mm / 1000.0  # Convertir a metros
-                linear_speed = (rpm_value * 2 * 3.1416 * radius_m) / 60  # m/s
-                self.motor_widgets[motor_number]['linear_speed_label'].setText(f"Velocidad Lineal: {linear_speed:.2f} m/s")
-
-        except Exception as e:
-            print(f"Error al parsear datos: {e}")
+    def process_lines(self, lines):
+        # Corre en el hilo de Qt (PuenteGUI): todas las líneas recibidas desde el tick anterior
+        for line, _ in lines:
+            self.message_log.agregar(f"Recibido: {line}", clasificar(line))
+        self.message_log.volcar()
+        samples = [sample for _, sample in lines if sample is not None]
+        if not samples:
+            return
+        columns = np.array(samples, dtype=np.float64).T
+        self.data.agregar_lote(dict(zip(self.data.columnas, columns)))
+        _, _, rpm1_value, rpm2_value = samples[-1]
+        if self.synchronizer and self.synchronizer.recibidas:
+            self.link_label.setText(f"Enlace: {self.synchronizer.resumen()}")
+        self.log_tare_corrections()
+
+        # Velocidad lineal de cada motor (con la última muestra), SRR y velocidad de arrastre
+        speeds = {}
+        for motor_number, rpm_value in ((1, rpm1_value), (2, rpm2_value)):
+            radius_m = self.motor_widgets[motor_number]['radius_input'].value() / 1000.0  # mm -> m
+            speeds[motor_number] = float(velocidad_desde_rpm(rpm_value, radius_m))
+            self.motor_widgets[motor_number]['linear_speed_label'].setText(f"Velocidad Lineal: {speeds[motor_number]:.2f} m/s")
+        srr = float(relacion_deslizamiento(speeds[1], speeds[2]))
+        entrainment = float(velocidad_arrastre(speeds[1], speeds[2]))
+        self.traction_label.setText(f"SRR: {100 * srr:.1f} % | Arrastre: {entrainment:.2f} m/s")
+
+    def filter_messages(self):
+        self.message_log.filtrar([kind for kind, checkbox in self.message_filters.items() if checkbox.isChecked()])
+
+    def log_tare_corrections(self):
+        # Cada tara medida con los motores detenidos queda en el registro, para poder reproducir los datos
+        for correction in self.tare.correcciones[self.logged_corrections:]:
+            self.message_log.escribir(f"Tara: {correction['tara']:+.4f} Nm ({correction['muestras']} muestras en reposo), "
+                                      f"deriva {correction['deriva'] * 3600:+.4f} Nm/h")
+        self.logged_corrections = len(self.tare.correcciones)
+
+    def stop_reading(self):
+        # Sin esperas fijas: el lector termina en a lo sumo ~50 ms
+        if self.reader:
+            self.reader.detener()
+        if self.commands:
+            self.commands.detener()
+        self.tare.cerrar_ventana()
+        self.log_tare_corrections()
 
     def update_graph(self):
-        if self.time_data:
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            ax.plot(self.time_data, self.torque_data, label="Torque (Nm)", color='blue')
-            ax.plot(self.time_data, self.rpm1_data, label="RPM Motor 1", color='red')
-            ax.plot(self.time_data, self.rpm2_data, label="RPM Motor 2", color='green')
-            ax.set_xlabel("Tiempo (s)")
-            ax.set_ylabel("Valor")
-            ax.set_title("Torque y RPM vs Tiempo")
-            ax.legend()
-            self.canvas.draw()
+        # Corre en el hilo de Qt, igual que process_lines: las vistas tienen todas las mismas n muestras
+        n = len(self.data)
+        if n and n != self.puntos_graficados:
+            self.puntos_graficados = n
+            views = self.data.vistas()
+            self.graficador.actualizar(views['Tiempo'], {
+                'torque': views['Torque'],
+                'rpm1': views['RPM1'],
+                'rpm2': views['RPM2'],
+            })
 
     def closeEvent(self, event):
+        self.bridge.detener()
         if self.is_connected:
-            self.running = False
-            time.sleep(1)
+            self.stop_reading()
             self.serial_port.close()
         event.accept()
 
@@ -0,0 +1,476 @@
+"""Capacidad de punta a punta de las rutas de adquisición, sin ventana, a ritmos crecientes.
+
+Arma cada ruta con los mismos componentes y la misma secuencia que su interfaz, con la
+gráfica en un lienzo Agg y el área de mensajes en un widget de texto en memoria:
+  alpha   MTM ALPHA.PY: equipo simulado (pruebas/simulador_mtm.py, dialecto mtm) ->
+          LectorSerial + DecodificadorBinario -> PuenteGUI (100 ms) -> App.aplicar_lote
+          (registro, BufferMuestras, valores actuales) y App.actualizar_grafica cada 500 ms;
+  cerate  interfazCERATE.py: simulador en dialecto cerate -> CerateDecoder ->
+          MiniTractionMachine.process_lines (listas) y update_graph cada 500 ms;
+  esp32   interfazESP32REAL.PY con flujo continuo: pruebas/servidor_esp32.py -> PuertoTCP
+          + DecodificadorTorque -> App.aplicar_lote (HistorialMuestras y gráfica por tick).
+Un único bucle hace de hilo de la interfaz (como Tk `after` o un QTimer): si un tick o un
+cuadro tarda, los siguientes se atrasan igual que en la ventana real. La tabla de ALPHA
+(Treeview) no se incluye.
+
+Por ruta y ritmo informa: µs por línea del decodificador (medido aparte, sin hilos),
+latencia de la muestra hasta aplicarla y hasta verla dibujada (p50/p95/p99/máx, desde el
+instante en que el equipo la genera), muestras perdidas (generadas - recibidas tras
+vaciar la cola), atraso máximo de los ticks, tiempo por cuadro y crecimiento del RSS.
+`--guardar` escribe los resultados en JSON con el commit y la plataforma; `--comparar`
+los contrasta con un JSON anterior y marca lo que empeoró más de `--tolerancia`.
+
+    python pruebas/benchmark_adquisicion.py --rutas alpha cerate esp32 --ritmos 100 1000 5000 --segundos 5
+    python pruebas/benchmark_adquisicion.py --guardar base.json
+    python pruebas/benchmark_adquisicion.py --comparar base.json --tolerancia 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import subprocess
+import sys
+import time
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.buffer_muestras import BufferMuestras
+from utilidades.decodificador_cerate import CerateDecoder
+from utilidades.flujo_torque import DecodificadorTorque, PuertoTCP
+from utilidades.graficador import GraficadorVivo
+from utilidades.historial import HistorialMuestras
+from utilidades.lector_serial import LectorSerial
+from utilidades.puente_gui import PuenteGUI
+from utilidades.registro_mensajes import RegistroMensajes, clasificar
+from utilidades.telemetria import COLUMNAS
+from utilidades.trama_binaria import COMANDO_BINARIO, DecodificadorBinario
+from servidor_esp32 import ServidorESP32
+from simulador_mtm import PuertoSimulado, SimuladorMTM
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PANELES_ALPHA = [
+    {'ylabel': 'Velocidad (m/s)', 'series': [('Velocidad Disco', 'Velocidad Disco (m/s)', 'blue'), ('Velocidad Bola', 'Velocidad Bola (m/s)', 'green')]},
+    {'ylabel': 'Torque (kg)', 'series': [('Torque', 'Torque (kg)', 'red')]},
+    {'ylabel': 'Frecuencia (Hz)', 'series': [('Freq Disco', 'Frecuencia Disco (Hz)', 'orange'), ('Freq Bola', 'Frecuencia Bola (Hz)', 'purple')]},
+    {'ylabel': 'Duty Cycle (%)', 'series': [('Duty Disco', 'Duty Disco (%)', 'cyan'), ('Duty Bola', 'Duty Bola (%)', 'magenta')]},
+]
+PANELES_CERATE = [{'ylabel': 'Valor', 'titulo': 'Torque y RPM vs Tiempo', 'series': [
+    ('torque', 'Torque (Nm)', 'blue'), ('rpm1', 'RPM Motor 1', 'red'), ('rpm2', 'RPM Motor 2', 'green')]}]
+PANELES_ESP32 = [{'ylabel': 'Torque (Nm)', 'titulo': 'Torque vs Tiempo', 'series': [('torque', 'Torque (Nm)', 'C0')]}]
+
+# Métricas que se comparan con --comparar (todas: más es peor)
+METRICAS_COMPARADAS = ('parseo_us_linea', 'latencia_pantalla_p99_ms', 'atraso_tick_max_ms', 'cuadro_p95_ms',
+                       'perdidas', 'rss_crecimiento_mb')
+
+
+class _TextoEnMemoria:
+    # Lo que RegistroMensajes usa de un tk.Text
+    def __init__(self):
+        self.lineas = 0
+
+    def insert(self, indice, texto):
+        self.lineas += texto.count('\n')
+
+    def delete(self, desde, hasta):
+        pass
+
+    def see(self, indice):
+        pass
+
+
+def rss_mb():
+    # Memoria residente del proceso (Linux: /proc; otros: psutil si está instalado)
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        return float('nan')
+
+
+def _figura(paneles):
+    fig = Figure(figsize=(8, 6))
+    return GraficadorVivo(fig, FigureCanvasAgg(fig), paneles)
+
+
+class _Ruta:
+    periodo_ms = 100          # PuenteGUI de la interfaz
+    periodo_grafica_ms = 500  # None: la interfaz redibuja dentro de aplicar
+
+    def __init__(self, ritmo):
+        self.ritmo = ritmo
+        self.cola = queue.Queue()
+        self.recibidas = 0
+        self.midiendo = True  # Lo que se vacía después de la corrida cuenta como recibido, sin latencia
+        self.latencias_aplicar = []
+        self.latencias_pantalla = []
+        self.tiempos_cuadro = []
+        self._sin_dibujar = []
+        self.puente = PuenteGUI(self.cola, self._aplicar, self.periodo_ms)
+
+    def _aplicar(self, lote):
+        vencen = self.instantes(lote)
+        self.aplicar(lote)
+        ahora = time.monotonic()
+        self.recibidas += len(vencen)
+        if not self.midiendo:
+            return
+        self.latencias_aplicar.append(ahora - vencen)
+        self._sin_dibujar.append(vencen)
+        if self.periodo_grafica_ms is None:
+            self._dibujado(ahora)
+
+    def graficar(self):
+        inicio = time.perf_counter()
+        self.redibujar()
+        self.tiempos_cuadro.append(time.perf_counter() - inicio)
+        self._dibujado(time.monotonic())
+
+    def _dibujado(self, ahora):
+        if self._sin_dibujar and self.midiendo:
+            self.latencias_pantalla.append(ahora - np.concatenate(self._sin_dibujar))
+            self._sin_dibujar = []
+
+
+class _RutaSimulada(_Ruta):
+    # Equipo simulado en el mismo proceso (PuertoSimulado)
+    def detener(self):
+        self.lector.detener()
+        # Lo que el equipo ya generó y el lector no llegó a leer
+        self.puerto.timeout = 0
+        lote = self.lector.decodificador.alimentar(self.puerto.read(1 << 30))
+        if lote:
+            self.cola.put(lote)
+        self.puerto.close()
+
+
+class RutaAlpha(_RutaSimulada):
+    nombre = 'alpha'
+
+    def __init__(self, ritmo, binario=False):
+        super().__init__(ritmo)
+        self.simulador = SimuladorMTM('mtm', ritmo=ritmo)
+        self.binario = binario
+        self.registro = RegistroMensajes(_TextoEnMemoria(), max_lineas=2000)
+        self.muestras = BufferMuestras(COLUMNAS, 1000)
+        self.graficador = _figura(PANELES_ALPHA)
+        self.total_graficado = 0
+        self.etiquetas = {}
+
+    def iniciar(self):
+        self.puerto = PuertoSimulado(self.simulador, timeout=1.0)
+        self.lector = LectorSerial(self.puerto, DecodificadorBinario(), self.cola)
+        self.lector.start()
+        if self.binario:
+            self.puerto.write(COMANDO_BINARIO.encode())
+        self.puerto.write(b"SET T=1000000\n")
+        self.puerto.write(b"START\n")
+        self.paso_start = self.puerto.pasos  # El paso k después de START tiene Tiempo = k * dt
+
+    def instantes(self, lote):
+        pasos = self.paso_start + np.round(lote.columnas['Tiempo'] / self.simulador.dt)
+        return self.puerto.inicio + pasos / self.ritmo
+
+    def aplicar(self, lote):
+        self.registro.agregar_varios(lote.mensajes)
+        self.registro.volcar()
+        if len(lote.columnas['Tiempo']) == 0:
+            return
+        self.muestras.agregar_lote(lote.columnas)
+        ultima = self.muestras.ultima()
+        for nombre in ('Velocidad Disco', 'Velocidad Bola', 'Torque', 'Freq Disco', 'Freq Bola', 'Duty Disco', 'Duty Bola'):
+            self.etiquetas[nombre] = f"{ultima[nombre]:.2f}"
+
+    def redibujar(self):
+        if len(self.muestras) and self.muestras.total != self.total_graficado:
+            self.total_graficado = self.muestras.total
+            datos = self.muestras.vistas()
+            self.graficador.actualizar(datos['Tiempo'], datos)
+
+    def generadas(self):
+        # Con el lector detenido, todo lo generado ya se leyó: el último Tiempo dice cuántos pasos hubo
+        ultimo = self.muestras.ultima()
+        return int(round(ultimo['Tiempo'] / self.simulador.dt)) if ultimo else 0
+
+    def errores(self):
+        return self.lector.decodificador.errores
+
+    @staticmethod
+    def datos_parseo(lineas, binario=False):
+        simulador = SimuladorMTM('mtm')
+        if binario:
+            simulador.comando('SET MODO=BIN')
+        simulador.comando('SET T=1000000')
+        simulador.comando('START')
+        return simulador.avanzar(lineas), DecodificadorBinario()
+
+
+class RutaCerate(_RutaSimulada):
+    nombre = 'cerate'
+
+    def __init__(self, ritmo, binario=False):
+        super().__init__(ritmo)
+        self.simulador = SimuladorMTM('cerate', ritmo=ritmo)
+        self.message_log = RegistroMensajes(_TextoEnMemoria(), max_lineas=2000)
+        self.graficador = _figura(PANELES_CERATE)
+        self.data = HistorialMuestras(('Tiempo', 'Torque', 'RPM1', 'RPM2'))
+        self.puntos_graficados = 0
+        self.etiquetas = {}
+
+    def iniciar(self):
+        self.puerto = PuertoSimulado(self.simulador, timeout=1.0)
+        self.lector = LectorSerial(self.puerto, CerateDecoder(time.time()), self.cola)
+        self.lector.start()
+        self.puerto.write(b"AL1100,1000,600\nS2800\n")
+
+    def instantes(self, lote):
+        # Las líneas no llevan tiempo del equipo: la muestra k (desde 1) vence en inicio + k / ritmo
+        n = sum(1 for _, muestra in lote if muestra is not None)
+        return self.puerto.inicio + (self.recibidas + np.arange(1, n + 1)) / self.ritmo
+
+    def aplicar(self, lines):
+        # MiniTractionMachine.process_lines
+        for line, _ in lines:
+            self.message_log.agregar(f"Recibido: {line}", clasificar(line))
+        self.message_log.volcar()
+        samples = [sample for _, sample in lines if sample is not None]
+        if not samples:
+            return
+        columns = np.array(samples, dtype=np.float64).T
+        self.data.agregar_lote(dict(zip(self.data.columnas, columns)))
+        _, _, rpm1_value, rpm2_value = samples[-1]
+        for motor_number, rpm_value in ((1, rpm1_value), (2, rpm2_value)):
+            self.etiquetas[motor_number] = f"Velocidad Lineal: {rpm_value * 2 * 3.1416 * 0.05 / 60:.2f} m/s"
+
+    def redibujar(self):
+        # MiniTractionMachine.update_graph
+        n = len(self.data)
+        if n and n != self.puntos_graficados:
+            self.puntos_graficados = n
+            views = self.data.vistas()
+            self.graficador.actualizar(views['Tiempo'], {'torque': views['Torque'], 'rpm1': views['RPM1'], 'rpm2': views['RPM2']})
+
+    def generadas(self):
+        return self.puerto.pasos
+
+    def errores(self):
+        return 0
+
+    @staticmethod
+    def datos_parseo(lineas, binario=False):
+        simulador = SimuladorMTM('cerate')
+        simulador.comando('AL1100,1000,600')
+        return simulador.avanzar(lineas), CerateDecoder(time.time())
+
+
+class RutaESP32(_Ruta):
+    nombre = 'esp32'
+    periodo_grafica_ms = None
+
+    def __init__(self, ritmo, binario=False):
+        super().__init__(ritmo)
+        self.servidor = ServidorESP32(puerto_flujo=0, ritmo=ritmo)
+        self.datos = HistorialMuestras(('Tiempo', 'Torque'))
+        self.graficador = _figura(PANELES_ESP32)
+
+    def iniciar(self):
+        self.servidor.iniciar()
+        # Como ControladorMotoresWiFi.iniciar_flujo, pero con el tiempo absoluto del equipo para medir la latencia
+        self.lector = LectorSerial(PuertoTCP('127.0.0.1', self.servidor.puerto_flujo), DecodificadorTorque(relativo=False), self.cola)
+        self.lector.start()
+
+    def instantes(self, lote):
+        return self.servidor.inicio + lote.columnas['Tiempo']
+
+    def aplicar(self, lote):
+        # App.aplicar_lote de interfazESP32REAL.PY
+        self.datos.agregar_lote(lote.columnas)
+        inicio = time.perf_counter()
+        self.graficador.actualizar(self.datos.columna('Tiempo'), {'torque': self.datos.columna('Torque')})
+        self.tiempos_cuadro.append(time.perf_counter() - inicio)
+
+    def redibujar(self):
+        pass
+
+    def detener(self):
+        # Se cuentan las tandas ya enviadas y se les da tiempo de llegar antes de cortar la conexión
+        self.enviadas = self.servidor.muestras_enviadas
+        time.sleep(2 * self.servidor.periodo_envio)
+        self.lector.detener()
+        self.lector.puerto.close()
+        self.servidor.detener()
+
+    def generadas(self):
+        return self.enviadas
+
+    def errores(self):
+        return self.lector.decodificador.errores
+
+    @staticmethod
+    def datos_parseo(lineas, binario=False):
+        tiempo = np.arange(lineas)
+        datos = ''.join(f'{t},{2.5 + 0.1 * np.sin(t * 1e-3):.3f}\n' for t in tiempo).encode()
+        return datos, DecodificadorTorque()
+
+
+RUTAS = {'alpha': RutaAlpha, 'cerate': RutaCerate, 'esp32': RutaESP32}
+
+
+def medir_parseo(clase, lineas, binario):
+    # µs por línea de decodificador.alimentar en bloques de 4 KB (lo que entrega una lectura del puerto)
+    datos, decodificador = clase.datos_parseo(lineas, binario)
+    bloques = [datos[i:i + 4096] for i in range(0, len(datos), 4096)]
+    inicio = time.perf_counter()
+    for bloque in bloques:
+        decodificador.alimentar(bloque)
+    return (time.perf_counter() - inicio) / lineas * 1e6
+
+
+def bucle_interfaz(ruta, segundos):
+    # Hace de hilo de la interfaz: cada tarea se reprograma al terminar, como Tk after
+    atrasos, rss = [], [(0.0, rss_mb())]
+    inicio = time.monotonic()
+    fin = inicio + segundos
+    proximo_tick = proximo_cuadro = proximo_rss = inicio
+    while True:
+        ahora = time.monotonic()
+        if ahora >= fin:
+            break
+        proximos = [proximo_tick, proximo_rss] + ([proximo_cuadro] if ruta.periodo_grafica_ms else [])
+        espera = min(proximos) - ahora
+        if espera > 0:
+            time.sleep(min(espera, fin - ahora))
+            continue
+        if ahora >= proximo_tick:
+            atrasos.append(ahora - proximo_tick)
+            ruta.puente.tick()
+            proximo_tick = time.monotonic() + ruta.periodo_ms / 1000
+        if ruta.periodo_grafica_ms and time.monotonic() >= proximo_cuadro:
+            ruta.graficar()
+            proximo_cuadro = time.monotonic() + ruta.periodo_grafica_ms / 1000
+        if time.monotonic() >= proximo_rss:
+            rss.append((time.monotonic() - inicio, rss_mb()))
+            proximo_rss += 1.0
+    return np.array(atrasos), np.array(rss)
+
+
+def _percentiles(muestras):
+    if not muestras or not sum(len(m) for m in muestras):
+        return {clave: float('nan') for clave in ('p50', 'p95', 'p99', 'max')}
+    ms = np.concatenate(muestras) * 1e3
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(ms.max())}
+
+
+def correr(clase, ritmo, segundos, binario):
+    ruta = clase(ritmo, binario)
+    ruta.iniciar()
+    atrasos, rss = bucle_interfaz(ruta, segundos)
+    ruta.midiendo = False
+    ruta.detener()
+    while not ruta.cola.empty():  # Lo que quedó en la cola también cuenta como recibido
+        ruta.puente.tick()
+    if ruta.periodo_grafica_ms:
+        ruta.graficar()
+    generadas = ruta.generadas()
+    aplicar = _percentiles(ruta.latencias_aplicar)
+    pantalla = _percentiles(ruta.latencias_pantalla)
+    cuadros = np.array(ruta.tiempos_cuadro) * 1e3 if ruta.tiempos_cuadro else np.array([np.nan])
+    pendiente = np.polyfit(rss[:, 0], rss[:, 1], 1)[0] if len(rss) > 2 else float('nan')
+    return {
+        'ruta': ruta.nombre, 'ritmo': ritmo, 'segundos': segundos, 'binario': binario,
+        'generadas': int(generadas), 'recibidas': int(ruta.recibidas),
+        'perdidas': int(max(0, generadas - ruta.recibidas)), 'errores_decodificacion': int(ruta.errores()),
+        'muestras_por_segundo': ruta.recibidas / segundos,
+        **{f'latencia_aplicar_{k}_ms': v for k, v in aplicar.items()},
+        **{f'latencia_pantalla_{k}_ms': v for k, v in pantalla.items()},
+        'atraso_tick_p99_ms': float(np.percentile(atrasos, 99) * 1e3) if len(atrasos) else float('nan'),
+        'atraso_tick_max_ms': float(atrasos.max() * 1e3) if len(atrasos) else float('nan'),
+        'cuadros': len(ruta.tiempos_cuadro),
+        'cuadro_medio_ms': float(np.nanmean(cuadros)), 'cuadro_p95_ms': float(np.nanpercentile(cuadros, 95)),
+        'rss_inicial_mb': float(rss[0, 1]), 'rss_final_mb': float(rss[-1, 1]),
+        'rss_crecimiento_mb': float(rss[-1, 1] - rss[0, 1]), 'rss_mb_por_minuto': float(pendiente * 60),
+    }
+
+
+def metadatos():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'fecha': time.strftime('%Y-%m-%d %H:%M:%S'), 'commit': commit, 'python': platform.python_version(),
+            'plataforma': platform.platform(), 'numpy': np.__version__, 'matplotlib': matplotlib.__version__}
+
+
+def comparar(resultados, base, tolerancia):
+    # Marca las métricas que empeoraron más que `tolerancia` (relativa) respecto de la base
+    anteriores = {(r['ruta'], r['ritmo'], r.get('binario', False)): r for r in base['resultados']}
+    regresiones = 0
+    print(f"\nComparación con {base['metadatos'].get('commit') or 'base'} ({base['metadatos'].get('fecha', '')}):")
+    for resultado in resultados:
+        anterior = anteriores.get((resultado['ruta'], resultado['ritmo'], resultado['binario']))
+        if anterior is None:
+            continue
+        for metrica in METRICAS_COMPARADAS:
+            nuevo, viejo = resultado[metrica], anterior.get(metrica)
+            if viejo is None or not np.isfinite(nuevo) or not np.isfinite(viejo):
+                continue
+            # Un margen absoluto mínimo evita marcar ruido sobre valores casi nulos
+            peor = nuevo > viejo * (1 + tolerancia) + (1 if metrica == 'perdidas' else 0.5)
+            if peor:
+                regresiones += 1
+            print(f"  {'REGRESIÓN ' if peor else '          '}{resultado['ruta']:7}{resultado['ritmo']:>8g}/s  "
+                  f"{metrica:26}{viejo:12.2f} -> {nuevo:12.2f}")
+    print(f"{regresiones} regresiones" if regresiones else "Sin regresiones")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rutas', nargs='+', choices=list(RUTAS), default=list(RUTAS))
+    parser.add_argument('--ritmos', type=float, nargs='+', default=[100, 1000, 5000], help='Muestras/s generadas')
+    parser.add_argument('--segundos', type=float, default=5.0, help='Duración de cada corrida')
+    parser.add_argument('--binario', action='store_true', help='Ruta alpha con SET MODO=BIN')
+    parser.add_argument('--lineas-parseo', type=int, default=50000)
+    parser.add_argument('--guardar', default=None, help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', default=None, help='JSON de una corrida anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Empeoramiento relativo tolerado')
+    args = parser.parse_args()
+
+    resultados = []
+    for nombre in args.rutas:
+        clase = RUTAS[nombre]
+        parseo = medir_parseo(clase, args.lineas_parseo, args.binario)
+        print(f"{nombre}: decodificador {parseo:.2f} µs/línea ({1e6 / parseo:,.0f} líneas/s en un núcleo)")
+        for ritmo in args.ritmos:
+            resultado = correr(clase, ritmo, args.segundos, args.binario)
+            resultado['parseo_us_linea'] = parseo
+            resultados.append(resultado)
+            print(f"  {ritmo:>8g}/s  recibidas {resultado['recibidas']:>8} perdidas {resultado['perdidas']:>6}  "
+                  f"latencia pantalla p50 {resultado['latencia_pantalla_p50_ms']:7.1f} p99 {resultado['latencia_pantalla_p99_ms']:7.1f} ms  "
+                  f"atraso tick máx {resultado['atraso_tick_max_ms']:6.1f} ms  cuadro p95 {resultado['cuadro_p95_ms']:6.1f} ms  "
+                  f"RSS {resultado['rss_crecimiento_mb']:+.1f} MB")
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as archivo:
+            json.dump({'metadatos': metadatos(), 'argumentos': vars(args), 'resultados': resultados}, archivo, indent=2)
+        print(f"Resultados guardados en {args.guardar}")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        if comparar(resultados, base, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Filtros de torque en tiempo real (utilidades.filtros) a 10000 muestras/s.
+
+Genera un torque sintético (rampa + ruido gaussiano + picos aislados) a --ritmo
+muestras/s y lo entrega en lotes de --lote-ms como LectorSerial. Para cada filtro:
+  - verifica que filtrar lote por lote dé lo mismo que filtrar todo junto y que
+    coincida con una referencia directa (np.convolve, np.median por ventana, el biquad
+    muestra a muestra);
+  - mide µs por muestra y la fracción de un núcleo que ocupa al ritmo pedido;
+  - lo compara con volver a filtrar todo el historial en cada cuadro de la gráfica
+    (cada --periodo-grafica ms), que crece con la duración del ensayo.
+
+    python pruebas/benchmark_filtros.py --ritmo 10000 --segundos 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades import filtros
+from utilidades.filtros import MediaMovil, Mediana, PasaBajos
+
+
+def torque_sintetico(n, ritmo, semilla=0):
+    rng = np.random.default_rng(semilla)
+    t = np.arange(n) / ritmo
+    torque = 1.0 + 0.02 * t + 0.05 * rng.standard_normal(n)
+    picos = rng.random(n) < 0.001
+    torque[picos] += rng.choice([-1.0, 1.0], picos.sum()) * 2.0
+    return torque
+
+
+def referencia(filtro, valores):
+    # Cálculo directo, sin estado entre lotes
+    if isinstance(filtro, MediaMovil):
+        w = filtro.ventana
+        completas = np.convolve(valores, np.ones(w), 'valid') / w
+        parciales = np.cumsum(valores[:w - 1]) / np.arange(1, w)
+        return np.concatenate([parciales, completas])
+    if isinstance(filtro, Mediana):
+        w = filtro.ventana
+        ventanas = np.lib.stride_tricks.sliding_window_view(valores, w)
+        parciales = [np.median(valores[:i + 1]) for i in range(min(w - 1, len(valores)))]
+        return np.concatenate([parciales, np.median(ventanas, axis=1)])
+    (b0, b1, b2), (_, a1, a2) = filtro.b, filtro.a
+    x_1 = x_2 = y_1 = y_2 = valores[0]  # En régimen con la primera muestra
+    salida = np.empty(len(valores))
+    for i, x in enumerate(valores):
+        y = b0 * x + b1 * x_1 + b2 * x_2 - a1 * y_1 - a2 * y_2
+        x_2, x_1, y_2, y_1 = x_1, x, y_1, y
+        salida[i] = y
+    return salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ritmo', type=float, default=10000.0, help='Muestras/s')
+    parser.add_argument('--segundos', type=float, default=60.0, help='Duración del ensayo simulado')
+    parser.add_argument('--lote-ms', type=float, default=50.0, help='ms de muestras por lote (LectorSerial)')
+    parser.add_argument('--periodo-grafica', type=float, default=500.0, help='ms entre cuadros de la gráfica')
+    parser.add_argument('--ventana', type=int, default=51, help='Muestras de la media móvil y la mediana')
+    parser.add_argument('--corte', type=float, default=50.0, help='Hz de corte del pasa bajos')
+    args = parser.parse_args()
+
+    n = int(args.ritmo * args.segundos)
+    por_lote = max(1, int(args.ritmo * args.lote_ms / 1000))
+    torque = torque_sintetico(n, args.ritmo)
+    print(f"{n} muestras a {args.ritmo:g}/s en lotes de {por_lote}; ventana {args.ventana}, corte {args.corte:g} Hz "
+          f"(biquad con {'scipy.signal.lfilter' if filtros.lfilter is not None else 'bucle de Python'})")
+
+    casos = {
+        'media móvil': lambda: MediaMovil(args.ventana),
+        'pasa bajos': lambda: PasaBajos(args.corte, args.ritmo),
+        'mediana': lambda: Mediana(args.ventana),
+    }
+    errores = 0
+    for nombre, crear in casos.items():
+        filtro = crear()
+        partes = []
+        inicio = time.perf_counter()
+        for i in range(0, n, por_lote):
+            partes.append(filtro.filtrar(torque[i:i + por_lote]))
+        duracion = time.perf_counter() - inicio
+        por_lotes = np.concatenate(partes)
+
+        muestra = min(n, 200000)  # La referencia directa es lenta: se compara un tramo inicial
+        diferencia_lotes = np.max(np.abs(por_lotes - crear().filtrar(torque)))
+        diferencia_referencia = np.max(np.abs(por_lotes[:muestra] - referencia(crear(), torque[:muestra])))
+        ok = diferencia_lotes < 1e-9 and diferencia_referencia < 1e-9
+        errores += not ok
+        print(f"{nombre:12} {duracion / n * 1e6:6.3f} µs/muestra  {100 * duracion / args.segundos:5.2f} % de un núcleo  "
+              f"lotes vs todo junto {diferencia_lotes:.1e}, vs referencia {diferencia_referencia:.1e}"
+              f"{'' if ok else '  ERROR'}")
+
+    # Alternativa sin estado: refiltrar todo el historial en cada cuadro (se mide el último cuadro)
+    cuadros = max(1, int(args.segundos * 1000 / args.periodo_grafica))
+    inicio = time.perf_counter()
+    np.convolve(torque, np.ones(args.ventana) / args.ventana, 'same')
+    ultimo = time.perf_counter() - inicio
+    print(f"refiltrar el historial (media móvil con np.convolve): último cuadro {ultimo * 1e3:.1f} ms, "
+          f"~{ultimo * cuadros / 2:.1f} s de CPU en los {cuadros} cuadros del ensayo (crece con n²)")
+    if errores:
+        print("ERROR: algún filtro no coincide con su referencia")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark del grabador de sesión (GrabadorSesion) como etapa del hilo lector.
+
+Pasa lotes sintéticos por GrabadorSesion igual que LectorSerial y mide el tiempo que la
+etapa agrega al hilo lector (medio, p99 y máximo por lote), el caudal de escritura hasta
+que el archivo queda cerrado y sincronizado, y la cantidad de fsync. Verifica que al
+releer el CSV la hora, millis() y la secuencia sean exactas. Con --comparar mide
+también el guardado anterior (DataFrame.to_csv de todas las muestras al final).
+
+    python pruebas/benchmark_grabador.py --muestras 500000 --lote 50
+    python pruebas/benchmark_grabador.py --ritmo 2000 --segundos 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.grabador import GrabadorSesion
+from utilidades.telemetria import COLUMNAS, COLUMNAS_RELOJ, LoteTelemetria
+
+COLUMNAS_SESION = COLUMNAS + COLUMNAS_RELOJ + ('Hora',)
+
+
+def lotes_sinteticos(total, por_lote):
+    rng = np.random.default_rng(0)
+    for inicio in range(0, total, por_lote):
+        n = min(por_lote, total - inicio)
+        indices = inicio + np.arange(n)
+        columnas = {nombre: rng.normal(size=n) for nombre in COLUMNAS}
+        columnas['Tiempo'] = indices * 0.01
+        # Reloj de un ensayo largo: secuencia y millis() de 7 cifras y hora Unix actual
+        columnas['Secuencia'] = 1234567.0 + indices
+        columnas['Millis'] = 3600000.0 + 10 * indices
+        columnas['Hora'] = 1.79e9 + 0.123456 + indices * 0.01
+        yield LoteTelemetria(columnas, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--muestras', type=int, default=200000)
+    parser.add_argument('--lote', type=int, default=50, help='Muestras por lote (por lectura del puerto)')
+    parser.add_argument('--ritmo', type=float, default=0.0, help='Muestras/s simuladas (0: lo más rápido posible)')
+    parser.add_argument('--segundos', type=float, default=0.0, help='Con --ritmo: duración en lugar de --muestras')
+    parser.add_argument('--comparar', action='store_true', help='Medir también DataFrame.to_csv al final')
+    args = parser.parse_args()
+    total = int(args.ritmo * args.segundos) if args.ritmo and args.segundos else args.muestras
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, 'sesion.csv')
+        grabador = GrabadorSesion(ruta, COLUMNAS_SESION)
+        inicio = time.perf_counter()
+        for k, lote in enumerate(lotes_sinteticos(total, args.lote)):
+            if args.ritmo:
+                # Ritmo real de llegada: se espera hasta que "lleguen" las muestras del lote
+                espera = inicio + k * args.lote / args.ritmo - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+            grabador(lote)
+        encolado = time.perf_counter() - inicio
+        grabador.cerrar(timeout=600)
+        cerrado = time.perf_counter() - inicio
+        latencia = grabador.estadisticas_latencia()
+        tam = os.path.getsize(ruta)
+
+        print(f"Muestras: {total} en lotes de {args.lote}")
+        print(f"Etapa en el hilo lector: medio {latencia['medio']:.1f} µs, p99 {latencia['p99']:.1f} µs, "
+              f"máximo {latencia['maximo']:.1f} µs por lote")
+        print(f"Encolado: {encolado:.2f} s; archivo cerrado a los {cerrado:.2f} s "
+              f"({grabador.muestras / cerrado:,.0f} muestras/s escritas)")
+        print(f"Archivo: {tam / 1e6:.1f} MB, {grabador.muestras} muestras, {grabador.fsyncs} fsync")
+        if grabador.muestras != total or grabador.error:
+            print(f"ERROR: se grabaron {grabador.muestras} de {total} muestras ({grabador.error})")
+
+        import pandas as pd
+        grabado = pd.read_csv(ruta)
+        esperado = {nombre: np.concatenate([l.columnas[nombre] for l in lotes_sinteticos(total, args.lote)])
+                    for nombre in COLUMNAS_SESION}
+        exactos = len(grabado) == total and all(np.array_equal(grabado[nombre].to_numpy(), esperado[nombre]) for nombre in COLUMNAS_RELOJ)
+        exactos = exactos and np.max(np.abs(grabado['Hora'].to_numpy() - esperado['Hora'])) < 1e-6
+        print(f"Secuencia, Millis y Hora {'exactos' if exactos else 'NO coinciden'} al releer el CSV")
+        if not exactos:
+            print("ERROR: el CSV grabado no conserva el reloj")
+
+        if args.comparar:
+            t0 = time.perf_counter()
+            datos = pd.DataFrame({nombre: np.concatenate([l.columnas[nombre] for l in lotes_sinteticos(total, args.lote)])
+                                  for nombre in COLUMNAS})
+            datos.to_csv(os.path.join(carpeta, 'guardar_datos.csv'), index=False)
+            print(f"DataFrame.to_csv al final (bloquea la interfaz): {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Tiempo por cuadro de la gráfica en vivo de MTM ALPHA: redibujado completo vs GraficadorVivo.
+
+Corre sin ventana (backend Agg). Criterio de aceptación: con 4 paneles, 7 líneas y
+`--puntos` muestras por línea, el p95 del tiempo por cuadro de GraficadorVivo debe
+quedar por debajo de `--objetivo-ms`.
+
+Como GraficadorVivo decima cada serie al ancho del eje en píxeles, el tiempo por cuadro
+debe mantenerse casi constante al aumentar `--puntos` (p. ej. 1800 s de ensayo a 100 Hz).
+
+    python pruebas/benchmark_graficador.py --puntos 1000
+    python pruebas/benchmark_graficador.py --puntos 180000 --cuadros 20 --objetivo-ms 30
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.graficador import GraficadorVivo
+
+PANELES = [
+    {'ylabel': 'Velocidad (m/s)', 'series': [('Velocidad Disco', 'Velocidad Disco (m/s)', 'blue'), ('Velocidad Bola', 'Velocidad Bola (m/s)', 'green')]},
+    {'ylabel': 'Torque (kg)', 'series': [('Torque', 'Torque (kg)', 'red')]},
+    {'ylabel': 'Frecuencia (Hz)', 'series': [('Freq Disco', 'Frecuencia Disco (Hz)', 'orange'), ('Freq Bola', 'Frecuencia Bola (Hz)', 'purple')]},
+    {'ylabel': 'Duty Cycle (%)', 'series': [('Duty Disco', 'Duty Disco (%)', 'cyan'), ('Duty Bola', 'Duty Bola (%)', 'magenta')]},
+]
+
+
+def datos_sinteticos(n):
+    t = np.arange(n) * 0.01
+    rng = np.random.default_rng(0)
+    return t, {
+        'Velocidad Disco': 0.01 * t, 'Velocidad Bola': 0.008 * t,
+        'Torque': 0.5 + 0.05 * rng.standard_normal(n),
+        'Freq Disco': 20 * t, 'Freq Bola': 16 * t,
+        'Duty Disco': np.full(n, 50.0), 'Duty Bola': np.full(n, 50.0),
+    }
+
+
+def cuadro_completo(fig, canvas, t, series):
+    # Lo que hacía App.actualizar_grafica antes: limpiar, recrear ejes, replotear y redibujar todo
+    fig.clear()
+    for k, panel in enumerate(PANELES):
+        ax = fig.add_subplot(len(PANELES), 1, k + 1)
+        for clave, etiqueta, color in panel['series']:
+            ax.plot(t, series[clave], label=etiqueta, color=color)
+        ax.set_ylabel(panel['ylabel'])
+        ax.legend()
+        ax.grid(True)
+    fig.tight_layout()
+    canvas.draw()
+
+
+def medir(funcion, cuadros):
+    tiempos = []
+    for k in range(cuadros):
+        inicio = time.perf_counter()
+        funcion(k)
+        tiempos.append(time.perf_counter() - inicio)
+    ms = np.array(tiempos) * 1000.0
+    return ms.mean(), np.percentile(ms, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--puntos', type=int, default=1000)
+    parser.add_argument('--cuadros', type=int, default=50)
+    parser.add_argument('--objetivo-ms', type=float, default=20.0)
+    args = parser.parse_args()
+
+    t, series = datos_sinteticos(args.puntos + args.cuadros)
+    n = args.puntos
+
+    fig = Figure(figsize=(7, 6))
+    canvas = FigureCanvasAgg(fig)
+    medio, p95 = medir(lambda k: cuadro_completo(fig, canvas, t[k:k + n], {c: v[k:k + n] for c, v in series.items()}), args.cuadros)
+    print(f"Redibujado completo : medio {medio:7.2f} ms  p95 {p95:7.2f} ms")
+
+    fig = Figure(figsize=(7, 6))
+    canvas = FigureCanvasAgg(fig)
+    graficador = GraficadorVivo(fig, canvas, PANELES)
+    graficador.actualizar(t[:n], {c: v[:n] for c, v in series.items()})  # Primer cuadro: dibujo completo
+    medio, p95 = medir(lambda k: graficador.actualizar(t[k:k + n], {c: v[k:k + n] for c, v in series.items()}), args.cuadros)
+    print(f"GraficadorVivo      : medio {medio:7.2f} ms  p95 {p95:7.2f} ms  (redibujados completos: {graficador.redibujados})")
+
+    ok = p95 <= args.objetivo_ms
+    print(f"Objetivo p95 <= {args.objetivo_ms:.1f} ms: {'OK' if ok else 'NO CUMPLE'}")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
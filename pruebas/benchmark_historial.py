@@ -0,0 +1,74 @@
+"""Costo de acumular un ensayo completo: np.append por muestra frente a HistorialMuestras.
+
+Simula un ensayo de interfazESP32REAL.PY (por defecto 1800 s a 1000 muestras/s) que
+llega en ticks de la interfaz de 100 ms. Compara lo que hacía actualizar_grafico
+(np.append de tiempo y torque por cada muestra de la cola) con HistorialMuestras
+(una sola copia por tick y capacidad que se duplica). np.append por muestra es O(n²):
+se mide sobre los primeros --muestras-append y se informa el costo del último tick.
+
+    python pruebas/benchmark_historial.py --segundos 1800 --ritmo 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.historial import HistorialMuestras
+
+
+def ticks_sinteticos(total, por_tick):
+    for inicio in range(0, total, por_tick):
+        n = min(por_tick, total - inicio)
+        tiempo = (inicio + np.arange(n)) * 1e-3
+        yield {'Tiempo': tiempo, 'Torque': np.sin(tiempo)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segundos', type=float, default=1800.0)
+    parser.add_argument('--ritmo', type=float, default=1000.0, help='Muestras/s')
+    parser.add_argument('--periodo', type=float, default=0.1, help='Segundos por tick de la interfaz')
+    parser.add_argument('--muestras-append', type=int, default=50000, help='Muestras medidas con np.append')
+    args = parser.parse_args()
+    total = int(args.segundos * args.ritmo)
+    por_tick = max(1, int(args.ritmo * args.periodo))
+    print(f"Ensayo: {total} muestras, {por_tick} por tick")
+
+    # Anterior: np.append de cada muestra de la cola
+    time_data, torque_data = np.array([]), np.array([])
+    medidas = min(total, args.muestras_append)
+    inicio = time.perf_counter()
+    ultimo_tick = 0.0
+    for columnas in ticks_sinteticos(medidas, por_tick):
+        t0 = time.perf_counter()
+        for tiempo, torque in zip(columnas['Tiempo'], columnas['Torque']):
+            time_data = np.append(time_data, tiempo)
+            torque_data = np.append(torque_data, torque)
+        ultimo_tick = time.perf_counter() - t0
+    total_append = time.perf_counter() - inicio
+    # El costo por tick crece con el largo: se extrapola linealmente hasta el final del ensayo
+    tick_final = ultimo_tick * total / medidas
+    print(f"np.append por muestra: {total_append:.2f} s para {medidas} muestras; último tick {ultimo_tick * 1e3:.1f} ms "
+          f"(~{tick_final * 1e3:.0f} ms por tick al final del ensayo)")
+
+    datos = HistorialMuestras(('Tiempo', 'Torque'))
+    tiempos = []
+    inicio = time.perf_counter()
+    for columnas in ticks_sinteticos(total, por_tick):
+        t0 = time.perf_counter()
+        datos.agregar_lote(columnas)
+        datos.columna('Tiempo'), datos.columna('Torque')
+        tiempos.append(time.perf_counter() - t0)
+    total_historial = time.perf_counter() - inicio
+    us = np.array(tiempos) * 1e6
+    print(f"HistorialMuestras:    {total_historial:.2f} s para {total} muestras; por tick medio {us.mean():.1f} µs, "
+          f"p99 {np.percentile(us, 99):.1f} µs, máximo {us.max():.0f} µs (duplicación a {datos.capacidad})")
+    if len(datos) != total or datos.columna('Tiempo')[-1] != (total - 1) * 1e-3:
+        print("ERROR: el historial no conserva todas las muestras")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Tamaño y tiempo de carga de una sesión .mtm (columnar, np.memmap) frente al CSV.
+
+Graba una sesión sintética de varias horas con EscritorSesion y el mismo contenido en
+CSV (formato de "Guardar Datos"), y mide: tamaño de cada archivo, tiempo de escritura,
+tiempo hasta tener una columna en memoria (abrir + leer Torque) y hasta tener todas
+las columnas (SesionBinaria.como_dict frente a pandas.read_csv). Verifica además que
+exportar_csv reproduzca las muestras, con la hora, millis() y la secuencia exactas.
+Sale con código 1 si alguna verificación falla.
+
+    python pruebas/benchmark_sesion.py --horas 3 --ritmo 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.sesion_binaria import EscritorSesion, SesionBinaria, exportar_csv, formatos_csv
+from utilidades.telemetria import COLUMNAS, COLUMNAS_RELOJ
+
+# Las columnas que graba la interfaz con el reloj del equipo y la hora de la PC
+COLUMNAS_SESION = COLUMNAS + COLUMNAS_RELOJ + ('Hora',)
+
+PARAMETROS = {'R': 5.4, 'r': 4.0, 'RPM_D_i': 0.0, 'RPM_D_f': 300.0, 'mu': 0.2, 'T': 10800.0, 'peso': 2.0}
+
+
+def lotes_sinteticos(total, por_lote, ritmo):
+    rng = np.random.default_rng(0)
+    for inicio in range(0, total, por_lote):
+        n = min(por_lote, total - inicio)
+        indices = inicio + np.arange(n)
+        columnas = {nombre: rng.normal(size=n).astype(np.float32) for nombre in COLUMNAS}
+        columnas['Tiempo'] = indices / ritmo
+        # Valores de un ensayo largo: secuencia y millis() de 7 cifras y hora Unix actual
+        columnas['Secuencia'] = (1234567 + indices).astype(np.float64)
+        columnas['Millis'] = 3600000 + np.round(indices * 1000 / ritmo)
+        columnas['Hora'] = 1.79e9 + 0.123456 + indices / ritmo
+        yield [columnas[nombre] for nombre in COLUMNAS_SESION]
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--horas', type=float, default=3.0)
+    parser.add_argument('--ritmo', type=float, default=100.0, help='Muestras/s del ensayo')
+    parser.add_argument('--lote', type=int, default=50, help='Muestras por lote escrito')
+    args = parser.parse_args()
+    total = int(args.horas * 3600 * args.ritmo)
+    print(f"Sesión de {args.horas:g} h a {args.ritmo:g} muestras/s: {total} muestras")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_mtm = os.path.join(carpeta, 'sesion.mtm')
+        ruta_csv = os.path.join(carpeta, 'sesion.csv')
+
+        def escribir_mtm():
+            escritor = EscritorSesion(ruta_mtm, COLUMNAS_SESION, PARAMETROS)
+            for valores in lotes_sinteticos(total, args.lote, args.ritmo):
+                escritor.escribir(valores)
+            escritor.cerrar()
+
+        def escribir_csv():
+            with open(ruta_csv, 'w', newline='') as archivo:
+                archivo.write(','.join(COLUMNAS_SESION) + '\n')
+                for valores in lotes_sinteticos(total, args.lote, args.ritmo):
+                    np.savetxt(archivo, np.column_stack(valores), fmt=formatos_csv(COLUMNAS_SESION), delimiter=',')
+
+        _, t_mtm = medir(escribir_mtm)
+        _, t_csv = medir(escribir_csv)
+        tam_mtm, tam_csv = os.path.getsize(ruta_mtm), os.path.getsize(ruta_csv)
+        print(f"{'':22}{'.mtm':>12}{'CSV':>12}")
+        print(f"{'Tamaño (MB)':22}{tam_mtm / 1e6:12.1f}{tam_csv / 1e6:12.1f}")
+        print(f"{'Escritura (s)':22}{t_mtm:12.2f}{t_csv:12.2f}")
+
+        torque_mtm, t1_mtm = medir(lambda: np.array(SesionBinaria(ruta_mtm).columna('Torque')))
+        torque_csv, t1_csv = medir(lambda: pd.read_csv(ruta_csv, usecols=['Torque'])['Torque'].to_numpy())
+        print(f"{'Carga de Torque (s)':22}{t1_mtm:12.3f}{t1_csv:12.3f}")
+
+        sesion, t_todo_mtm = medir(lambda: SesionBinaria(ruta_mtm))
+        datos_mtm, t = medir(lambda: {nombre: np.array(columna) for nombre, columna in sesion.como_dict().items()})
+        t_todo_mtm += t
+        _, t_todo_csv = medir(lambda: pd.read_csv(ruta_csv))
+        print(f"{'Carga completa (s)':22}{t_todo_mtm:12.3f}{t_todo_csv:12.3f}")
+        print(f"Parámetros del encabezado: {sesion.parametros}")
+
+        ruta_export = os.path.join(carpeta, 'exportada.csv')
+        _, t_export = medir(lambda: exportar_csv(ruta_mtm, ruta_export))
+        exportada = pd.read_csv(ruta_export)
+        iguales = len(exportada) == total and np.allclose(exportada['Torque'], torque_mtm, rtol=1e-5)
+        print(f"exportar_csv: {t_export:.2f} s, {'coincide' if iguales else 'NO coincide'} con la sesión")
+        # El reloj tiene que volver exacto: sin eso no se encuentran los huecos ni se alinea con otros registros
+        reloj = len(exportada) == total and all(np.array_equal(exportada[nombre].to_numpy(), datos_mtm[nombre])
+                                                 for nombre in COLUMNAS_RELOJ)
+        reloj = reloj and np.max(np.abs(exportada['Hora'].to_numpy() - datos_mtm['Hora'])) < 1e-6
+        reloj = reloj and np.max(np.abs(exportada['Tiempo'].to_numpy() - datos_mtm['Tiempo'])) < 1e-6
+        print(f"exportar_csv: Secuencia, Millis, Hora y Tiempo {'exactos' if reloj else 'NO coinciden'} al releer el CSV")
+        fallas = not iguales or not reloj
+        if len(datos_mtm['Tiempo']) != total or not np.allclose(torque_mtm, torque_csv, rtol=1e-5, atol=1e-6):
+            print("ERROR: la sesión .mtm no coincide con el CSV")
+            fallas = True
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Microbenchmark del parser de telemetría frente a la cadena de split/strip de leer_serial.
+
+Usa líneas con el formato exacto que imprime MTM_Epsilon_12.11_Dutty_Aumentado.ino
+(rampa de aceleración con T_pulse_D/T_pulse_B y fase de velocidad constante sin ellos).
+Con --archivo se puede usar una captura real del puerto serie.
+
+    python pruebas/benchmark_telemetria.py --lineas 100000
+    python pruebas/benchmark_telemetria.py --archivo captura.txt
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.telemetria import ParserTelemetria
+
+
+def linea_firmware(t, rng_torque, constante=False):
+    # Mismo texto que Serial.print(valor, 2) en actualizarFrecuencias()/mantenerVelocidadConstante()
+    omega_d = min(31.42, 0.5236 * t)
+    omega_b = 1.08 * omega_d
+    f_d = max(100.0, 1400 / (2 * math.pi) * omega_d)
+    f_b = max(100.0, 1400 / (2 * math.pi) * omega_b)
+    linea = (f"Tiempo: {t:.2f} s | Freq Disco: {f_d:.2f} Hz | Duty Disco: {49.98:.2f}%"
+             f" | Velocidad Disco: {omega_d * 0.054:.2f} m/s | Freq Bola: {f_b:.2f} Hz | Duty Bola: {49.98:.2f}%"
+             f" | Velocidad Bola: {omega_b * 0.04:.2f} m/s | Torque: {rng_torque:.2f} kg")
+    if not constante:
+        linea += f" | T_pulse_D: {0.4998 / f_d * 1e6:.2f} us | T_pulse_B: {0.4998 / f_b * 1e6:.2f} us"
+    return linea
+
+
+def lineas_sinteticas(n):
+    lineas = []
+    for k in range(n):
+        t = k * 0.01
+        lineas.append(linea_firmware(t, 0.3 + 0.01 * math.sin(k), constante=(k % 10 == 9)))
+    return lineas
+
+
+def parsear_split(line):
+    # Copia de la cadena de split/strip que usaba App.leer_serial
+    partes = line.split('|')
+    tiempo = float(partes[0].split(':')[1].strip().split(' ')[0])
+    freq_D = float(partes[1].split(':')[1].strip().split(' ')[0])
+    duty_D = float(partes[2].split(':')[1].strip().split('%')[0])
+    vel_D = float(partes[3].split(':')[1].strip().split(' ')[0])
+    freq_B = float(partes[4].split(':')[1].strip().split(' ')[0])
+    duty_B = float(partes[5].split(':')[1].strip().split('%')[0])
+    vel_B = float(partes[6].split(':')[1].strip().split(' ')[0])
+    torque = float(partes[7].split(':')[1].strip().split(' ')[0])
+    T_pulse_D = float(partes[8].split(':')[1].strip().split(' ')[0])
+    T_pulse_B = float(partes[9].split(':')[1].strip().split(' ')[0])
+    return (tiempo, freq_D, duty_D, vel_D, freq_B, duty_B, vel_B, torque, T_pulse_D, T_pulse_B)
+
+
+def medir(nombre, funcion, n):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:28s}: {segundos * 1e6 / n:6.2f} us/línea  ({n / segundos:10.0f} líneas/s)")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lineas', type=int, default=100000)
+    parser.add_argument('--archivo', help='Captura del puerto serie (una línea por renglón)')
+    args = parser.parse_args()
+
+    if args.archivo:
+        with open(args.archivo, encoding='utf-8', errors='replace') as f:
+            lineas = [linea.rstrip('\r\n') for linea in f if linea.startswith('Tiempo:')]
+    else:
+        lineas = lineas_sinteticas(args.lineas)
+    n = len(lineas)
+    bloque = ('\r\n'.join(lineas) + '\r\n').encode()
+
+    def con_split():
+        errores = 0
+        for linea in lineas:
+            try:
+                parsear_split(linea)
+            except Exception:
+                errores += 1
+        return errores
+
+    errores = medir('split/strip (anterior)', con_split, n)
+    print(f"{'':28s}  líneas descartadas por excepción: {errores}")
+
+    por_linea = ParserTelemetria()
+    medir('ParserTelemetria por línea', lambda: [por_linea.parsear_linea(linea) for linea in lineas], n)
+
+    por_bloque = ParserTelemetria()
+    lote = medir('ParserTelemetria por bloque', lambda: por_bloque.alimentar(bloque), n)
+    print(f"{'':28s}  muestras: {len(lote.columnas['Tiempo'])}  errores: {por_bloque.errores}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""GET_TORQUE en lock-step frente a la adquisición continua con pedidos en vuelo (pty).
+
+Un hilo hace de equipo sobre un par pty: atiende los GET_TORQUE de a uno (cada uno
+tarda --servicio ms) y la respuesta "TORQUE:x" tarda --latencia ms en cada sentido
+(USB/UART). Se mide durante --segundos:
+  - lock-step: ControladorMotor.obtener_datos_torque() en un bucle (una ida y vuelta
+    completa por muestra, como VentanaPrincipal);
+  - ControladorMotor.iniciar_adquisicion(en_vuelo=N) para cada N de --en-vuelo.
+Informa muestras/s, ida y vuelta (p50/p99) y pedidos perdidos. Requiere Linux/macOS.
+
+Con --tardias el equipo se traba de vez en cuando, de a una traba por vez (esa respuesta y
+las que esperan detrás llegan 1.5·--timeout tarde; dos trabas encadenadas atrasan una
+respuesta más de lo que se distingue sin número de pedido). El equipo responde con el número de pedido como torque, y se
+comprueba que ninguna muestra de la adquisición continua quede emparejada con otro pedido
+(las respuestas tardías se descartan). Sale con código 1 si alguna lo está.
+
+    python pruebas/benchmark_torque_pipeline.py --segundos 3 --servicio 2 --latencia 4
+    python pruebas/benchmark_torque_pipeline.py --tardias 0.01 --timeout 50
+"""
+import argparse
+import heapq
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from controladores.controlador_motor import ControladorMotor
+
+
+class EquipoSimulado(threading.Thread):
+    # Responde GET_TORQUE en orden: llega tras `latencia`, se atiende en `servicio`, vuelve tras `latencia`.
+    # Con probabilidad `trabas` un pedido que no espera detrás de otro tarda además `demora_traba`; el
+    # torque es el número de pedido
+    def __init__(self, maestro, servicio, latencia, trabas=0.0, demora_traba=0.0, semilla=0):
+        super().__init__(daemon=True)
+        self.maestro = maestro
+        self.servicio = servicio
+        self.latencia = latencia
+        self.trabas = trabas
+        self.demora_traba = demora_traba
+        self.rng = np.random.default_rng(semilla)
+        self.recibidos = 0  # GET_TORQUE desde el último reiniciar_cuenta()
+        self.atendidos = 0
+        self._salidas = []
+        self._condicion = threading.Condition()
+        self._activo = True
+        threading.Thread(target=self._escribir, daemon=True).start()
+
+    def run(self):
+        resto = b''
+        ocupado_hasta = 0.0
+        while self._activo:
+            try:
+                datos = os.read(self.maestro, 4096)
+            except OSError:
+                return
+            llegada = time.monotonic()
+            lineas = (resto + datos).split(b'\n')
+            resto = lineas.pop()
+            for linea in lineas:
+                if linea.strip() != b'GET_TORQUE':
+                    continue
+                libre = llegada + self.latencia >= ocupado_hasta
+                ocupado_hasta = max(llegada + self.latencia, ocupado_hasta) + self.servicio
+                if self.trabas and libre and self.rng.random() < self.trabas:
+                    ocupado_hasta += self.demora_traba
+                self.recibidos += 1
+                with self._condicion:
+                    heapq.heappush(self._salidas, (ocupado_hasta + self.latencia, f'TORQUE:{self.recibidos:.2f}\n'.encode()))
+                    self._condicion.notify()
+
+    def _escribir(self):
+        while self._activo:
+            with self._condicion:
+                while not self._salidas and self._activo:
+                    self._condicion.wait(0.1)
+                if not self._salidas:
+                    continue
+                instante, respuesta = self._salidas[0]
+                espera = instante - time.monotonic()
+                if espera > 0:
+                    self._condicion.wait(espera)
+                    continue
+                heapq.heappop(self._salidas)
+            try:
+                os.write(self.maestro, respuesta)
+            except OSError:
+                return
+            self.atendidos += 1
+
+    def reiniciar_cuenta(self):
+        self.recibidos = 0
+
+    def detener(self):
+        self._activo = False
+
+
+def resumir(nombre, muestras, segundos, latencias, perdidas, detalle=''):
+    ms = np.array(latencias) * 1e3 if len(latencias) else np.array([np.nan])
+    print(f"{nombre:16}{muestras / segundos:10.1f} muestras/s   ida y vuelta p50 {np.percentile(ms, 50):6.1f} ms, "
+          f"p99 {np.percentile(ms, 99):6.1f} ms   perdidos {perdidas}{detalle}")
+
+
+def mal_emparejadas(cola):
+    # Muestras cuyo torque (el número de pedido que respondió el equipo) no es el pedido asignado
+    lotes = []
+    while not cola.empty():
+        lotes.append(cola.get_nowait())
+    if not lotes:
+        return 0
+    torque = np.concatenate([lote.columnas['Torque'] for lote in lotes])
+    pedido = np.concatenate([lote.columnas['Pedido'] for lote in lotes])
+    return int(np.sum(~np.isnan(pedido) & (torque != pedido)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segundos', type=float, default=3.0)
+    parser.add_argument('--servicio', type=float, default=2.0, help='ms que tarda el equipo en cada pedido')
+    parser.add_argument('--latencia', type=float, default=4.0, help='ms del enlace en cada sentido')
+    parser.add_argument('--en-vuelo', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--timeout', type=float, default=1000.0, help='ms hasta dar un pedido por perdido')
+    parser.add_argument('--tardias', type=float, default=0.0, help='Probabilidad de que el equipo se trabe en un pedido')
+    args = parser.parse_args()
+
+    maestro, esclavo = os.openpty()
+    equipo = EquipoSimulado(maestro, args.servicio / 1000, args.latencia / 1000, args.tardias, 1.5 * args.timeout / 1000)
+    equipo.start()
+    controlador = ControladorMotor(os.ttyname(esclavo), 115200, timeout=args.timeout / 1000)
+    print(f"Equipo: {args.servicio:g} ms por pedido, {args.latencia:g} ms por sentido "
+          f"(máximo teórico {1000 / args.servicio:.0f} muestras/s)")
+
+    muestras, latencias = 0, []
+    fin = time.monotonic() + args.segundos
+    while time.monotonic() < fin:
+        inicio = time.monotonic()
+        if controlador.obtener_datos_torque()['tiempo']:
+            muestras += 1
+            latencias.append(time.monotonic() - inicio)
+    resumir('lock-step', muestras, args.segundos, latencias, 0)
+
+    fallas = 0
+    for en_vuelo in args.en_vuelo:
+        time.sleep(0.2 + 2 * args.latencia / 1000 + 3 * args.timeout / 1000 * (args.tardias > 0))  # Dejar llegar las respuestas tardías
+        equipo.reiniciar_cuenta()
+        adquisicion = controlador.iniciar_adquisicion(en_vuelo=en_vuelo)
+        time.sleep(args.segundos)
+        controlador.detener_adquisicion()
+        mal = mal_emparejadas(adquisicion.cola)
+        fallas += mal > 0
+        resumir(f'en vuelo = {en_vuelo}', adquisicion.muestras, args.segundos, adquisicion.latencias, adquisicion.perdidas,
+                f", {adquisicion.tardias} tardías descartadas, {mal} mal emparejadas{'  ERROR' if mal else ''}")
+
+    controlador.cerrar()
+    equipo.detener()
+    os.close(maestro)
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Prueba de loopback de la telemetría binaria (SET MODO=BIN) frente a las líneas de texto.
+
+Escribe la misma secuencia de muestras en ambos formatos en un puerto falso de pyserial
+(loop://), la lee en bloques como App.leer_serial y la decodifica. Informa bytes por
+muestra, muestras/s que entran en el enlace de 115200 baudios y el costo de decodificar
+en el host. Con --corrupcion se alteran bytes al azar para verificar la resincronización:
+las muestras recuperadas deben coincidir con las enviadas. El formato "mezclado" alterna
+tramos de tramas y de líneas (como al cambiar de MODO) y verifica que las muestras salen
+en el orden en que se enviaron.
+
+    python pruebas/benchmark_trama_binaria.py --muestras 20000
+    python pruebas/benchmark_trama_binaria.py --corrupcion 0.0005
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.telemetria import COLUMNAS, ParserTelemetria
+from utilidades.trama_binaria import DecodificadorBinario, empaquetar_trama
+from benchmark_telemetria import linea_firmware
+
+BAUDIOS = 115200
+
+
+def muestras_sinteticas(n):
+    # Mismos valores en ambos formatos: se redondean a 2 decimales como Serial.print(valor, 2)
+    lineas = [linea_firmware(k * 0.01, 0.3 + 0.01 * np.sin(k)) for k in range(n)]
+    lote = ParserTelemetria().parsear_lineas([linea.encode() for linea in lineas])
+    return lineas, np.column_stack([lote.columnas[nombre] for nombre in COLUMNAS])
+
+
+def corromper(datos, proporcion, rng):
+    datos = bytearray(datos)
+    posiciones = rng.choice(len(datos), size=int(len(datos) * proporcion), replace=False)
+    for pos in posiciones:
+        datos[pos] ^= 1 << int(rng.integers(8))
+    return bytes(datos), len(posiciones)
+
+
+def mezclar(lineas, esperadas, tramo=37):
+    # Alterna `tramo` muestras en tramas binarias y `tramo` en líneas de texto, con un eco de SET entre medio
+    partes = []
+    for k in range(0, len(lineas), tramo):
+        if k // tramo % 2:
+            partes.append(('\r\n'.join(lineas[k:k + tramo]) + '\r\nMODO actualizado a: BIN\r\n').encode())
+        else:
+            partes.extend(empaquetar_trama(m, esperadas[m]) for m in range(k, min(k + tramo, len(lineas))))
+    return b''.join(partes)
+
+
+def loopback(datos, decodificador, bloque):
+    # Escribe en loop:// de a `bloque` bytes y lee lo disponible, como App.leer_serial
+    puerto = serial.serial_for_url('loop://', timeout=0)
+    columnas = []
+    inicio = time.perf_counter()
+    decodificado = 0.0
+    for k in range(0, len(datos), bloque):
+        puerto.write(datos[k:k + bloque])
+        recibido = puerto.read(puerto.in_waiting)
+        t0 = time.perf_counter()
+        lote = decodificador.alimentar(recibido)
+        decodificado += time.perf_counter() - t0
+        if len(lote.columnas['Tiempo']):
+            columnas.append(np.column_stack([lote.columnas[nombre] for nombre in COLUMNAS]))
+    total = time.perf_counter() - inicio
+    puerto.close()
+    filas = np.concatenate(columnas) if columnas else np.empty((0, len(COLUMNAS)))
+    return filas, total, decodificado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--muestras', type=int, default=20000)
+    parser.add_argument('--bloque', type=int, default=4096, help='Bytes por escritura/lectura del puerto')
+    parser.add_argument('--corrupcion', type=float, default=0.0, help='Proporción de bytes alterados')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    lineas, esperadas = muestras_sinteticas(args.muestras)
+    formatos = {
+        'texto': (('\r\n'.join(lineas) + '\r\n').encode(), ParserTelemetria()),
+        'binario': (b''.join(empaquetar_trama(k, fila) for k, fila in enumerate(esperadas)), DecodificadorBinario()),
+        'mezclado': (mezclar(lineas, esperadas), DecodificadorBinario()),
+    }
+
+    for nombre, (datos, decodificador) in formatos.items():
+        alteradas = 0
+        if args.corrupcion:
+            datos, alteradas = corromper(datos, args.corrupcion, rng)
+        filas, total, decodificado = loopback(datos, decodificador, args.bloque)
+        bytes_muestra = len(datos) / args.muestras
+        print(f"{nombre:8s}: {bytes_muestra:6.1f} bytes/muestra -> {BAUDIOS / 10 / bytes_muestra:7.1f} muestras/s a {BAUDIOS} baudios")
+        print(f"{'':8s}  decodificación {decodificado * 1e6 / args.muestras:5.2f} us/muestra, "
+              f"loopback {args.muestras / total:9.0f} muestras/s")
+        print(f"{'':8s}  recibidas {len(filas)}/{args.muestras}, errores {decodificador.errores}, bytes alterados {alteradas}")
+        if len(filas) and not args.corrupcion:
+            # float32 conserva los 2 decimales del texto
+            assert np.allclose(filas, esperadas, rtol=1e-6, atol=1e-4, equal_nan=True), nombre
+        elif len(filas):
+            # Con corrupción, cada trama aceptada debe ser una de las enviadas (el CRC descarta las alteradas)
+            enviadas = {tuple(np.round(fila, 2)) for fila in np.nan_to_num(esperadas, nan=-1.0)}
+            extrañas = sum(tuple(np.round(fila, 2)) not in enviadas for fila in np.nan_to_num(filas, nan=-1.0))
+            print(f"{'':8s}  muestras aceptadas que no se enviaron: {extrañas}")
+
+
+if __name__ == '__main__':
+    main()
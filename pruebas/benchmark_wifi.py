@@ -0,0 +1,86 @@
+"""Latencia por tick del modo de variación automática contra el ESP32 simulado.
+
+Levanta pruebas/servidor_esp32.py en un puerto local y compara la vuelta anterior de
+actualizar_datos (obtener_torque + set_velocidad_disco + set_velocidad_bolita con
+requests.get sueltos: una conexión TCP y una espera completa por pedido) con
+ControladorMotoresWiFi.tick (sesión keep-alive, consignas en paralelo y sin esperar).
+Informa latencia por tick, conexiones abiertas en el servidor y consignas descartadas.
+Con --timeout se verifica que un equipo que no responde no bloquee más que el timeout.
+
+    python pruebas/benchmark_wifi.py --ticks 200 --retardo 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from controladores.controlador_wifi import ControladorMotoresWiFi
+from servidor_esp32 import ServidorESP32
+
+
+def tick_anterior(base_url, velocidad):
+    # Lo que hacía interfazESP32REAL.PY en cada vuelta con variación automática
+    torque = float(requests.get(f'{base_url}/get_torque').text)
+    requests.get(f'{base_url}/set_disco?rpm={velocidad}')
+    requests.get(f'{base_url}/set_bolita?rpm={velocidad}')
+    return torque
+
+
+def resumir(nombre, latencias, servidor, extra=''):
+    ms = np.array(latencias) * 1e3
+    print(f"{nombre:10} medio {ms.mean():7.2f} ms  p99 {np.percentile(ms, 99):7.2f} ms  "
+          f"máx {ms.max():7.2f} ms  conexiones {servidor.conexiones:4d}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--retardo', type=float, default=20.0, help='Demora del servidor por pedido en ms')
+    parser.add_argument('--secuencial', action='store_true', help='El servidor atiende de a un pedido (como el ESP32)')
+    parser.add_argument('--timeout', action='store_true', help='Probar también un servidor que no responde a tiempo')
+    args = parser.parse_args()
+    retardo = args.retardo / 1000
+
+    servidor = ServidorESP32(retardo=retardo, secuencial=args.secuencial).iniciar()
+    latencias = []
+    for k in range(args.ticks):
+        inicio = time.perf_counter()
+        tick_anterior(f'http://{servidor.direccion}', k * 0.01)
+        latencias.append(time.perf_counter() - inicio)
+    resumir('anterior', latencias, servidor)
+    servidor.detener()
+
+    servidor = ServidorESP32(retardo=retardo, secuencial=args.secuencial).iniciar()
+    controlador = ControladorMotoresWiFi(servidor.direccion)
+    for k in range(args.ticks):
+        controlador.tick(k * 0.01, k * 0.01)
+    time.sleep(3 * retardo + 0.05)  # Dejar salir las últimas consignas
+    estadisticas = controlador.estadisticas_latencia()
+    resumir('pool', controlador.latencias_tick, servidor,
+            f"  consignas enviadas {servidor.pedidos.get('/set_disco', 0) + servidor.pedidos.get('/set_bolita', 0)}"
+            f", descartadas {controlador.consignas_descartadas}, errores {controlador.errores}")
+    if 'consigna' in estadisticas:
+        consigna = estadisticas['consigna']
+        print(f"{'':10} consigna: medio {consigna['medio']:.2f} ms, p99 {consigna['p99']:.2f} ms")
+    if abs(servidor.velocidad_disco - (args.ticks - 1) * 0.01) > 1e-9:
+        print(f"ERROR: la última consigna del disco no llegó ({servidor.velocidad_disco})")
+    controlador.cerrar()
+    servidor.detener()
+
+    if args.timeout:
+        servidor = ServidorESP32(retardo=2.0).iniciar()
+        controlador = ControladorMotoresWiFi(servidor.direccion, timeout=(0.5, 0.3))
+        inicio = time.perf_counter()
+        torque = controlador.obtener_torque()
+        print(f"Servidor que no responde: obtener_torque() = {torque} en {time.perf_counter() - inicio:.2f} s "
+              f"({type(controlador.ultimo_error).__name__})")
+        controlador.cerrar()
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Verifica utilidades.calibracion y mide cuánto tarda calibrar una grabación.
+
+Con puntos de calibración sintéticos (varias sesiones, ruido y un --atipicos de puntos
+atípicos) comprueba para cada modelo:
+  - que el ajuste recupera la curva verdadera y descarta los atípicos (los modelos que
+    siguen la curvatura; a lo sumo un 1 % de puntos buenos descartados);
+  - que la tabla guarda versiones sucesivas y calibracion_vigente devuelve la última;
+  - que las unidades quedan en la tabla y se rechaza cargar (o guardar) una calibración
+    que no va de kg a kg, como un ajuste de cuentas del ADC a N·m;
+  - que la etapa CalibradorColumna lote por lote da lo mismo que calibrar_columnas sobre
+    la grabación completa, y que recalibrar parte de 'Torque Crudo' (no acumula);
+  - que recalibrar una sesión con tara (CompensadorTara después de la calibración, como en
+    MTM ALPHA.PY) vuelve a restar la columna 'Tara' y reproduce el torque del ensayo;
+y mide el tiempo de aplicar cada modelo a --muestras muestras. Sale con código 1 si
+alguna comprobación falla.
+
+    python pruebas/prueba_calibracion.py --muestras 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.calibracion import (CalibradorColumna, Calibracion, ajustar_calibracion, calibracion_vigente,
+                                    calibrar_columnas, guardar_calibracion)
+from utilidades.tara import CompensadorTara
+from utilidades.telemetria import LoteTelemetria
+
+fallas = 0
+
+
+def comprobar(nombre, ok, detalle=''):
+    global fallas
+    print(f"{'OK   ' if ok else 'ERROR'} {nombre}{f' ({detalle})' if detalle else ''}")
+    fallas += not ok
+
+
+def curva_verdadera(x):
+    # Celda de carga con una leve alinealidad: el factor 2280 del firmware no es exacto
+    return 1.03 * x + 0.02 * x ** 2 - 0.15
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--muestras', type=int, default=1000000, help='Muestras de la grabación a calibrar')
+    parser.add_argument('--sesiones', type=int, default=3, help='Sesiones de calibración sintéticas')
+    parser.add_argument('--atipicos', type=float, default=0.05, help='Fracción de puntos atípicos')
+    parser.add_argument('--lote', type=int, default=500, help='Muestras por lote en la comparación con la etapa')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    crudo = np.concatenate([np.repeat(np.linspace(0.0, 5.0, 11), 8) + rng.normal(0, 0.002, 88) for _ in range(args.sesiones)])
+    referencia = curva_verdadera(crudo) + rng.normal(0, 0.003, len(crudo))
+    atipicos = rng.random(len(crudo)) < args.atipicos
+    referencia[atipicos] += rng.choice([-1.0, 1.0], atipicos.sum()) * rng.uniform(0.3, 1.0, atipicos.sum())
+    grabacion = rng.uniform(0.0, 5.0, args.muestras)
+    print(f"{len(crudo)} puntos de {args.sesiones} sesiones, {atipicos.sum()} atípicos; grabación de {args.muestras} muestras")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        tabla = os.path.join(carpeta, 'calibraciones.json')
+        for modelo, tolerancia in (('lineal', 0.15), ('polinomio', 0.01), ('tramos', 0.02)):
+            calibracion = ajustar_calibracion(crudo, referencia, modelo, grado=2, tramos=5, sesiones=['a', 'b', 'c'])
+            x = np.linspace(0.0, 5.0, 1000)
+            error = np.max(np.abs(calibracion.aplicar(x) - curva_verdadera(x)))
+            comprobar(f"{modelo}: recupera la curva", error < tolerancia, f"error máximo {error:.4f}, RMS {calibracion.estadisticas['rms']:.4f}")
+            if modelo != 'lineal':  # La recta no sigue la curvatura: sus residuos no permiten separar todos los atípicos
+                descartados = ~calibracion.aceptados
+                # Con umbral 3.5 algún punto bueno del extremo de la gaussiana puede quedar afuera
+                falsos = int(descartados[~atipicos].sum())
+                comprobar(f"{modelo}: descarta los atípicos", bool(descartados[atipicos].all() and falsos <= 0.01 * len(crudo)),
+                          f"{descartados.sum()} descartados, {falsos} sin ser atípicos")
+
+            version = guardar_calibracion(tabla, calibracion)
+            vigente = calibracion_vigente(tabla)
+            iguales = np.array_equal(vigente.aplicar(grabacion[:1000]), calibracion.aplicar(grabacion[:1000]))
+            comprobar(f"{modelo}: versión {version} guardada y leída igual", vigente.version == version and iguales)
+
+            # Etapa en vivo lote por lote frente a la grabación completa
+            etapa = CalibradorColumna(vigente)
+            partes = [etapa(LoteTelemetria({'Torque': grabacion[i:i + args.lote]}, [])).columnas
+                      for i in range(0, min(len(grabacion), 100000), args.lote)]
+            en_vivo = np.concatenate([parte['Torque'] for parte in partes])
+            completa = calibrar_columnas({'Torque': grabacion[:len(en_vivo)]}, vigente)
+            comprobar(f"{modelo}: etapa lote por lote = grabación completa", np.array_equal(en_vivo, completa['Torque']))
+            otra = calibrar_columnas(completa, Calibracion('lineal', (1.0, 0.0)))
+            comprobar(f"{modelo}: recalibrar parte de 'Torque Crudo'", np.array_equal(otra['Torque'], grabacion[:len(en_vivo)]))
+
+            # Con tara: calibración y compensación en vivo; recalibrar debe dar el mismo torque
+            n = len(en_vivo)
+            velocidad = np.where(np.arange(n) % 20000 < 5000, 0.0, 100.0)
+            compensador = CompensadorTara(intervalo_deriva=10.0)
+            partes = []
+            for i in range(0, n, args.lote):
+                lote = LoteTelemetria({'Torque': grabacion[i:i + args.lote] + 0.3, 'Velocidad Disco': velocidad[i:i + args.lote],
+                                       'Velocidad Bola': velocidad[i:i + args.lote],
+                                       'Hora': 1.79e9 + 0.01 * np.arange(i, min(i + args.lote, n))}, [])
+                partes.append(compensador(etapa(lote)).columnas)
+            sesion = {nombre: np.concatenate([parte[nombre] for parte in partes]) for nombre in ('Torque', 'Torque Crudo', 'Tara')}
+            recalibrada = calibrar_columnas(sesion, vigente)
+            comprobar(f"{modelo}: recalibrar con tara resta 'Tara'", np.allclose(recalibrada['Torque'], sesion['Torque'], rtol=0, atol=1e-9),
+                      f"tara media {np.mean(sesion['Tara']):.3f}")
+
+            repeticiones = 5
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                vigente.aplicar(grabacion)
+            duracion = (time.perf_counter() - inicio) / repeticiones
+            print(f"      {modelo}: {duracion * 1e3:.1f} ms para {args.muestras} muestras ({duracion / args.muestras * 1e9:.1f} ns/muestra)")
+        comprobar("la tabla conserva las versiones anteriores", calibracion_vigente(tabla, version=1).modelo == 'lineal')
+        with open(tabla, encoding='utf-8') as archivo:
+            guardadas = json.load(archivo)['calibraciones']
+        comprobar("la tabla guarda las unidades", all(c['unidad_cruda'] == c['unidad'] == 'kg' for c in guardadas))
+
+        # Unidades que no son las de la columna Torque del equipo
+        mezclada = ajustar_calibracion(crudo, referencia, unidad_cruda='cuentas', unidad='Nm')
+        try:
+            guardar_calibracion(tabla, mezclada)
+            rechazada = False
+        except ValueError:
+            rechazada = True
+        comprobar("no se guarda una calibración de cuentas a N·m", rechazada)
+        with open(tabla, encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        datos['calibraciones'].append(dict(datos['calibraciones'][-1], version=4, unidad='Nm'))
+        for calibracion in datos['calibraciones'][:-1]:
+            del calibracion['unidad_cruda'], calibracion['unidad']  # Como las guardaba el formato 1
+        with open(tabla, 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo)
+        for version, nombre in ((4, "en N·m"), (1, "sin unidades (formato 1)")):
+            try:
+                calibracion_vigente(tabla, version=version)
+                mensaje = None
+            except ValueError as e:
+                mensaje = str(e)
+            comprobar(f"se rechaza cargar una calibración {nombre}", mensaje is not None, mensaje)
+
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Verifica utilidades.canal_comandos (CanalComandos) contra el simulador del equipo.
+
+Con PuertoSimulado leído por LectorSerial (el canal como etapa, como MTM ALPHA.PY entre
+ensayos) y perdiendo cada línea de comando camino al equipo con probabilidad --perdida,
+comprueba:
+  - que los parámetros de un ensayo salen en una sola escritura y enviar() no bloquea;
+  - que todos se confirman pese a las pérdidas (reenviando tras --timeout ms) y que el
+    equipo aplicó cada valor (el simulador recorre el SET con strtok como el firmware);
+  - que un "SET R=..." solo se confirma con su eco, sin rechazar "SET" ni el valor;
+  - que un nombre de parámetro desconocido y un segundo START se rechazan sin esperar
+    el timeout, y que STOP se confirma;
+  - lo mismo con el dialecto cerate (interfazCERATE.py: S1, AL1, P1, MSPR y un AL1 mal formado),
+    y que M y AL (no idempotentes) se escriben una sola vez aunque se pierda la respuesta;
+y muestra la latencia de ida y vuelta de cada comando frente a los ~0.8 s que el envío
+anterior (un SET por línea y 100 ms de espera) tenía congelada la interfaz.
+Sale con código 1 si alguna comprobación falla.
+
+    python pruebas/prueba_canal_comandos.py --perdida 0.2 --servicio 2
+"""
+import argparse
+import os
+import queue
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from simulador_mtm import PuertoSimulado, SimuladorMTM
+from utilidades.canal_comandos import (CONFIRMADO, RECHAZADO, SIN_RESPUESTA, CanalComandos, reenviable_cerate,
+                                       respuestas_cerate, respuestas_mtm, solo_mensajes)
+from utilidades.decodificador_cerate import CerateDecoder
+from utilidades.lector_serial import LectorSerial
+from utilidades.secuencia import lineas_set
+from utilidades.trama_binaria import COMANDO_BINARIO, DecodificadorBinario
+
+fallas = 0
+
+
+def comprobar(nombre, ok, detalle=''):
+    global fallas
+    print(f"{'OK   ' if ok else 'ERROR'} {nombre}{f' ({detalle})' if detalle else ''}")
+    fallas += not ok
+
+
+def abrir(args, dialecto, decodificador, protocolo):
+    # Canal sobre un puerto que pierde líneas de comando; devuelve (canal, lector, escrituras, entregadas, simulador)
+    simulador = SimuladorMTM(dialecto, dt=0.01, servicio=args.servicio / 1000)
+    puerto = PuertoSimulado(simulador)
+    rng = random.Random(args.semilla)
+    escrituras = []
+    entregadas = []  # Líneas que llegaron al equipo
+
+    def escribir(datos):
+        escrituras.append(datos)
+        lineas = [linea for linea in datos.split(b'\n')[:-1] if rng.random() >= args.perdida]
+        entregadas.extend(linea.decode() for linea in lineas)
+        return puerto.write(b''.join(linea + b'\n' for linea in lineas))
+
+    if protocolo is respuestas_cerate:
+        canal = CanalComandos(escribir, protocolo, timeout=args.timeout / 1000, reintentos=args.reintentos,
+                              reenviable=reenviable_cerate)
+        etapas = (lambda lineas: (canal.recibir([linea for linea, muestra in lineas if muestra is None]), lineas)[1],)
+    else:
+        canal = CanalComandos(escribir, protocolo, timeout=args.timeout / 1000, reintentos=args.reintentos)
+        etapas = (canal, solo_mensajes)
+    lector = LectorSerial(puerto, decodificador, queue.Queue(), etapas=etapas)
+    lector.start()
+    canal.start()
+    return canal, lector, escrituras, entregadas, simulador
+
+
+def describir(envio):
+    return ', '.join(f"{comando.linea.split()[0] if comando.linea.startswith('SET') else comando.linea}: {comando.estado}"
+                     f"{f' en {1000 * comando.latencia:.1f} ms' if comando.latencia is not None else ''}"
+                     f"{f' ({comando.intentos} intentos)' if comando.intentos > 1 else ''}" for comando in envio.comandos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--perdida', type=float, default=0.2, help='Probabilidad de perder cada línea de comando')
+    parser.add_argument('--servicio', type=float, default=2.0, help='ms que tarda el equipo en responder cada comando')
+    parser.add_argument('--timeout', type=float, default=200.0, help='ms hasta reenviar un comando sin respuesta')
+    parser.add_argument('--reintentos', type=int, default=4)
+    parser.add_argument('--semilla', type=int, default=3)
+    args = parser.parse_args()
+
+    canal, lector, escrituras, _, simulador = abrir(args, 'mtm', DecodificadorBinario(), respuestas_mtm)
+    pares = [('R', 5.4), ('r', 4.0), ('RPM_D_i', 0.0), ('RPM_D_f', 300.0), ('mu', 0.05), ('T', 2.0), ('DIR_DISCO', 1), ('DIR_BOLA', 1)]
+    lineas = lineas_set(pares) + [COMANDO_BINARIO]
+    inicio = time.perf_counter()
+    parametros = canal.enviar(lineas, 'Parámetros')
+    bloqueo = time.perf_counter() - inicio
+    parametros.esperar(5.0)
+    comprobar("parámetros en una sola escritura", escrituras[0] == ''.join(linea.strip() + '\n' for linea in lineas).encode(),
+              f"{len(lineas)} líneas, {len(escrituras[0])} bytes")
+    comprobar("enviar() no bloquea la interfaz", bloqueo < 0.005, f"{1e6 * bloqueo:.0f} µs; antes ~{0.1 * (len(pares) + 1):.1f} s")
+    comprobar("parámetros confirmados pese a las pérdidas", parametros.confirmado, describir(parametros))
+    aplicados = {nombre: simulador.firmware.parametros.get(nombre) for nombre, _ in pares if nombre in simulador.firmware.parametros}
+    comprobar("el equipo aplicó cada valor", all(aplicados[nombre] == valor for nombre, valor in pares if nombre in aplicados),
+              ', '.join(f"{nombre}={valor:g}" for nombre, valor in aplicados.items()))
+
+    solo = canal.enviar(["SET R=5.1"])
+    solo.esperar(5.0)
+    comando = solo.comandos[0]
+    comprobar("SET R=5.1 confirmado con su eco", comando.estado == CONFIRMADO and simulador.firmware.parametros['R'] == 5.1,
+              f"{comando.estado}: {', '.join(comando.respuestas)}")
+
+    desconocido = canal.enviar(["SET FOO=1"])
+    desconocido.esperar(5.0)
+    comando = desconocido.comandos[0]
+    comprobar("parámetro desconocido rechazado", comando.estado == RECHAZADO, f"{comando.respuesta}, {comando.intentos} intentos")
+
+    start = canal.enviar(["START"], 'START')
+    start.esperar(5.0)
+    comprobar("START confirmado", start.confirmado, describir(start))
+    otro = canal.enviar(["START"])
+    otro.esperar(5.0)
+    comando = otro.comandos[0]
+    # Si se perdió el primer envío, el reenvío encuentra la aceleración en curso y lo confirma
+    comprobar("segundo START rechazado (aceleración en curso)",
+              comando.estado == RECHAZADO or (comando.estado == CONFIRMADO and comando.intentos > 1), comando.respuesta)
+    stop = canal.enviar(["STOP"], 'STOP')
+    stop.esperar(5.0)
+    comprobar("STOP confirmado", stop.confirmado, describir(stop))
+    canal.detener()
+    lector.detener()
+    print(f"      MTM: {canal.resumen()}")
+
+    canal, lector, escrituras, entregadas, _ = abrir(args, 'cerate', CerateDecoder(time.time()), respuestas_cerate)
+    motores = canal.enviar(["MSPR1600", "S1120", "P1"], 'Motores')
+    movimientos = canal.enviar(["AL20,200,1", "M290,60"], 'Movimientos')
+    malo = canal.enviar(["AL1100"])
+    motores.esperar(5.0)
+    movimientos.esperar(5.0)
+    malo.esperar(5.0)
+    comprobar("cerate: comandos de motor confirmados", motores.confirmado, describir(motores))
+    lineas = [linea for datos in escrituras for linea in datos.decode().splitlines()]
+    comprobar("cerate: M y AL escritos una sola vez",
+              all(lineas.count(c.linea) == 1 and c.estado in (CONFIRMADO, SIN_RESPUESTA) for c in movimientos.comandos),
+              describir(movimientos))
+    comando = malo.comandos[0]
+    # AL no se reenvía: si su única escritura se perdió queda sin respuesta
+    comprobar("cerate: AL1 mal formado rechazado",
+              comando.estado == RECHAZADO or (comando.estado == SIN_RESPUESTA and comando.linea not in entregadas),
+              comando.respuesta or comando.estado)
+    canal.detener()
+    lector.detener()
+    print(f"      cerate: {canal.resumen()}")
+
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
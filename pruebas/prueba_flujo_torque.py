@@ -0,0 +1,81 @@
+"""Prueba de punta a punta del flujo continuo de torque contra el ESP32 simulado.
+
+Levanta pruebas/servidor_esp32.py con el flujo TCP y mide, durante el mismo tiempo,
+cuántas muestras se obtienen consultando /get_torque (una por ida y vuelta) y cuántas
+con ControladorMotoresWiFi.iniciar_flujo. Verifica que el flujo no pierda muestras,
+que los tiempos sean los del equipo (espaciados 1/ritmo, crecientes) y mide el
+retraso entre que el equipo genera una tanda y el lector la entrega.
+
+    python pruebas/prueba_flujo_torque.py --segundos 5 --ritmo 1000 --retardo 20
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from controladores.controlador_wifi import ControladorMotoresWiFi
+from utilidades.puente_gui import combinar_lotes
+from servidor_esp32 import ServidorESP32
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segundos', type=float, default=5.0)
+    parser.add_argument('--ritmo', type=float, default=1000.0, help='Muestras/s que genera el equipo')
+    parser.add_argument('--retardo', type=float, default=20.0, help='Demora del servidor HTTP por pedido en ms')
+    args = parser.parse_args()
+
+    servidor = ServidorESP32(retardo=args.retardo / 1000, puerto_flujo=0, ritmo=args.ritmo).iniciar()
+    controlador = ControladorMotoresWiFi(servidor.direccion)
+
+    consultas = 0
+    fin = time.monotonic() + args.segundos
+    while time.monotonic() < fin:
+        if controlador.obtener_torque() is not None:
+            consultas += 1
+    print(f"Consulta /get_torque: {consultas / args.segundos:8.1f} muestras/s (tiempo sintético del host)")
+
+    cola = queue.Queue()
+    lector = controlador.iniciar_flujo(cola, puerto=servidor.puerto_flujo)
+    lotes, llegadas = [], []
+    fin = time.monotonic() + args.segundos
+    while time.monotonic() < fin:
+        try:
+            lote = cola.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        lotes.append(lote)
+        llegadas.append((time.monotonic(), lote.columnas['Tiempo'][-1]))
+    enviadas = servidor.muestras_enviadas  # La tanda en viaje al detener puede no leerse
+    controlador.detener_flujo()
+    while not cola.empty():
+        lotes.append(cola.get_nowait())
+    servidor.detener()
+    controlador.cerrar()
+
+    lote = combinar_lotes(lotes)
+    tiempo = lote.columnas['Tiempo']
+    pasos = np.diff(tiempo)
+    print(f"Flujo TCP:         {len(tiempo) / args.segundos:8.1f} muestras/s (tiempo del equipo), "
+          f"{len(lotes)} lotes, {lector.bytes_leidos} bytes")
+    print(f"Muestras: enviadas {enviadas}, recibidas {len(tiempo)}, "
+          f"errores de decodificación {lector.decodificador.errores}")
+    if len(pasos):
+        print(f"Paso entre muestras: mín {pasos.min() * 1e3:.2f} ms, máx {pasos.max() * 1e3:.2f} ms "
+              f"(esperado {1e3 / args.ritmo:.2f} ms)")
+    # Retraso de entrega: edad de la última muestra de cada lote al llegar (respecto del mínimo observado)
+    edades = np.array([llegada - t for llegada, t in llegadas])
+    if len(edades):
+        edades -= edades.min()
+        print(f"Retraso de entrega relativo: medio {edades.mean() * 1e3:.1f} ms, p99 {np.percentile(edades, 99) * 1e3:.1f} ms")
+    # Sin huecos: todas las muestras consecutivas separadas un período del equipo
+    if len(tiempo) < enviadas - args.ritmo * servidor.periodo_envio or (len(pasos) and (np.abs(pasos * args.ritmo - 1) > 0.5).any()):
+        print("ERROR: faltan muestras o los tiempos no son los del equipo")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Prueba sin hardware de LectorSerial frente a la lectura línea por línea con readline().
+
+Un hilo escribe líneas de telemetría del firmware en un puerto falso (loop:// de pyserial,
+o un par pty en Linux/macOS con --pty) y se mide, para cada forma de leer:
+
+- líneas/s recibidas y llamadas de lectura por línea,
+- cuánto tarda el hilo lector en terminar después de pedirle que se detenga
+  (con readline() y timeout=1 puede llegar a 1 s).
+
+Además verifica que una etapa que lanza una excepción termina el hilo dejándola en
+`error` y contándola en `errores`, que un `aplicar` de PuenteGUI que falla se cuenta sin
+cortar los ticks, y que AvisoErrores informa cada falla una sola vez. Sale con código 1
+si alguna comprobación falla.
+
+    python pruebas/prueba_lector_serial.py --lineas 20000
+    python pruebas/prueba_lector_serial.py --pty
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import serial
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.lector_serial import LectorSerial
+from utilidades.puente_gui import AvisoErrores, PuenteGUI
+from utilidades.telemetria import ParserTelemetria
+from benchmark_telemetria import lineas_sinteticas
+
+
+def abrir_par(usar_pty):
+    # Devuelve (función para escribir, puerto que lee)
+    if not usar_pty:
+        puerto = serial.serial_for_url('loop://', timeout=1)
+        return puerto.write, puerto, lambda: puerto.close()
+    maestro, esclavo = os.openpty()
+    puerto = serial.Serial(os.ttyname(esclavo), 115200, timeout=1)
+
+    def cerrar():
+        puerto.close()
+        os.close(maestro)
+        os.close(esclavo)
+    return lambda datos: os.write(maestro, datos), puerto, cerrar
+
+
+def escribir(escribir_bytes, datos, bloque=512):
+    for k in range(0, len(datos), bloque):
+        escribir_bytes(datos[k:k + bloque])
+
+
+def con_readline(puerto, n):
+    # Lo que hacía App.leer_serial: una llamada y un decode por línea
+    detener = threading.Event()
+    recibidas = [0]
+
+    def leer():
+        while not detener.is_set():
+            linea = puerto.readline().decode('utf-8').strip()
+            if linea:
+                recibidas[0] += 1
+    hilo = threading.Thread(target=leer)
+    hilo.start()
+    return hilo, detener.set, lambda: recibidas[0], lambda: recibidas[0]
+
+
+def con_lector(puerto, n):
+    lector = LectorSerial(puerto, ParserTelemetria())
+    lector.start()
+    recibidas = [0]
+
+    def contar():
+        while not lector.cola.empty():
+            recibidas[0] += len(lector.cola.get().columnas['Tiempo'])
+        return recibidas[0]
+    return lector, lector.detener, contar, lambda: lector.lecturas
+
+
+def medir(nombre, iniciar, usar_pty, lineas):
+    escribir_bytes, puerto, cerrar = abrir_par(usar_pty)
+    datos = ('\r\n'.join(lineas) + '\r\n').encode()
+    hilo, detener, recibidas, llamadas = iniciar(puerto, len(lineas))
+    inicio = time.perf_counter()
+    escritor = threading.Thread(target=escribir, args=(escribir_bytes, datos))
+    escritor.start()
+    escritor.join()
+    while recibidas() < len(lineas) and time.perf_counter() - inicio < 120:
+        time.sleep(0.005)
+    segundos = time.perf_counter() - inicio
+    total = recibidas()
+    # Latencia de detención con el puerto en silencio (el peor caso para readline con timeout=1)
+    time.sleep(0.2)
+    t0 = time.perf_counter()
+    detener()
+    hilo.join()
+    parada = time.perf_counter() - t0
+    cerrar()
+    print(f"{nombre:12s}: {total}/{len(lineas)} líneas, {total / segundos:9.0f} líneas/s, "
+          f"{llamadas() / max(total, 1):5.3f} lecturas/línea, detención {parada * 1000:6.1f} ms")
+
+
+def etapa_rota(puerto):
+    # Una etapa que falla debe cortar el lector y dejar la excepción en `error`
+    def fallar(lote):
+        raise ValueError("etapa rota")
+    lector = LectorSerial(puerto, ParserTelemetria(), etapas=(fallar,))
+    lector.start()
+    puerto.write(('\r\n'.join(lineas_sinteticas(10)) + '\r\n').encode())
+    lector.join(2.0)
+    ok = not lector.is_alive() and isinstance(lector.error, ValueError) and lector.errores == 1
+    lector.detener()
+    print(f"{'OK   ' if ok else 'ERROR'} etapa con excepción: hilo {'terminado' if not lector.is_alive() else 'vivo'}, "
+          f"error={lector.error!r}, errores={lector.errores}")
+    return ok, lector
+
+
+def avisos(lector):
+    # Un aplicar que falla en cada tick se cuenta pero se informa una vez; el lector caído también
+    def aplicar(lote):
+        raise KeyError('Torque')
+    cola = queue.Queue()
+    puente = PuenteGUI(cola, aplicar)
+    aviso = AvisoErrores()
+    fuentes = (("Lectura serial", lector), ("Actualización de la interfaz", puente), ("Grabación", None))
+    informados = []
+    for _ in range(3):
+        cola.put([b'linea'])
+        puente.tick()
+        informados += aviso.nuevos(fuentes)
+    ok = puente.errores == 3 and puente.ticks == 3 and len(informados) == 2
+    print(f"{'OK   ' if ok else 'ERROR'} errores de los hilos: puente con {puente.errores} errores en {puente.ticks} ticks, "
+          f"avisos {informados}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lineas', type=int, default=20000)
+    parser.add_argument('--pty', action='store_true', help='Usar un par pty en lugar de loop://')
+    args = parser.parse_args()
+    lineas = lineas_sinteticas(args.lineas)
+    medir('readline()', con_readline, args.pty, lineas)
+    medir('LectorSerial', con_lector, args.pty, lineas)
+    puerto = serial.serial_for_url('loop://', timeout=1)
+    ok, lector = etapa_rota(puerto)
+    ok = avisos(lector) and ok
+    puerto.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Verifica utilidades.magnitudes contra las "Ecuaciones Teóricas" de MTM ALPHA.PY.
+
+Genera un ensayo con el simulador del equipo (tramas binarias, sin ruido) y comprueba
+sobre las columnas decodificadas:
+  - v = ω · R / 100 (ecuación 5) con ω_D = ω_D_i + α_D·t (ecuación 1);
+  - con ω_B = K·ω_D y K = (1 - μ)·(R / r) (ecuación 2): v_B = (1 - μ)·v_D, así que
+    SRR = 2μ / (2 - μ) y U = v_D·(2 - μ) / 2 en toda la rampa;
+  - μ medido = Torque / Peso y NaN sin carga o con las superficies quietas;
+  - derivar lote por lote da lo mismo que sobre el ensayo completo.
+Mide además el costo por muestra frente a un bucle de Python. Sale con código 1 si
+alguna comprobación falla.
+
+    python pruebas/prueba_magnitudes.py --segundos 60 --mu 0.2 --peso 2.5
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from simulador_mtm import RPM_A_RAD, SimuladorMTM
+from utilidades.magnitudes import (COLUMNAS_DERIVADAS, coeficiente_friccion, derivar, relacion_deslizamiento,
+                                   velocidad_desde_rpm, velocidad_lineal)
+from utilidades.trama_binaria import COMANDO_BINARIO, DecodificadorBinario
+
+fallas = 0
+
+
+def comprobar(nombre, ok, detalle=''):
+    global fallas
+    print(f"{'OK   ' if ok else 'ERROR'} {nombre}{f' ({detalle})' if detalle else ''}")
+    fallas += not ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segundos', type=float, default=60.0, help='Duración de la rampa simulada')
+    parser.add_argument('--mu', type=float, default=0.2)
+    parser.add_argument('--peso', type=float, default=2.5, help='Peso aplicado (kg)')
+    parser.add_argument('--lote', type=int, default=37, help='Muestras por lote en la comparación incremental')
+    args = parser.parse_args()
+
+    R, r, rpm_f = 5.4, 4.0, 300.0
+    simulador = SimuladorMTM(dt=0.01)
+    simulador.comando(COMANDO_BINARIO.strip())
+    simulador.comando(f"SET R={R} r={r} RPM_D_i=0 RPM_D_f={rpm_f} mu={args.mu} T={args.segundos}")
+    simulador.comando("START")
+    decodificador = DecodificadorBinario()
+    columnas = decodificador.alimentar(simulador.generar(args.segundos)).columnas
+    n = len(columnas['Tiempo'])
+    print(f"Ensayo simulado: {n} muestras, μ = {args.mu}, peso = {args.peso} kg")
+
+    # Ecuaciones 1 y 5: velocidad lineal del disco a partir de ω_D(t)
+    omega_d = rpm_f * RPM_A_RAD / args.segundos * columnas['Tiempo']
+    error = np.max(np.abs(velocidad_lineal(omega_d, R) - columnas['Velocidad Disco']))
+    comprobar("v_D = (ω_D_i + α_D·t)·R/100", error < 1e-5, f"error máximo {error:.1e} m/s")
+    error = np.max(np.abs(velocidad_desde_rpm(60.0, 0.1) - velocidad_lineal(2 * math.pi, 10.0)))
+    comprobar("velocidad_desde_rpm coincide con v = ω·Radio/100", error < 1e-12)
+
+    derivadas = derivar(columnas, args.peso)
+    comprobar("derivar devuelve COLUMNAS_DERIVADAS", tuple(derivadas) == COLUMNAS_DERIVADAS)
+    girando = columnas['Velocidad Disco'] > 0
+    srr = derivadas['SRR'][girando]
+    esperado = 2 * args.mu / (2 - args.mu)
+    error = np.max(np.abs(srr - esperado))
+    comprobar("SRR = 2μ/(2 - μ) con K = (1 - μ)·R/r", error < 1e-5, f"esperado {esperado:.5f}, error máximo {error:.1e}")
+    error = np.max(np.abs(derivadas['Velocidad Arrastre'] - columnas['Velocidad Disco'] * (2 - args.mu) / 2))
+    comprobar("U = (v_D + v_B)/2 = v_D·(2 - μ)/2", error < 1e-5, f"error máximo {error:.1e} m/s")
+    quietas = relacion_deslizamiento(np.array([0.0, 1.0]), np.array([0.0, 1.0]))
+    comprobar("SRR es NaN con las superficies quietas", bool(np.isnan(quietas[0]) and quietas[1] == 0.0))
+
+    error = np.max(np.abs(derivadas['Mu'] - columnas['Torque'] / args.peso))
+    comprobar("μ medido = Torque/Peso", error < 1e-12)
+    comprobar("μ es NaN sin carga", bool(np.isnan(coeficiente_friccion(columnas['Torque'], 0.0)).all()))
+    error = abs(float(coeficiente_friccion(2.0, 10.0, brazo=0.04)) - 5.0)
+    comprobar("μ con brazo: (Torque/brazo)/carga", error < 1e-12)
+    comprobar("relacion_deslizamiento acepta escalares", abs(float(relacion_deslizamiento(3.0, 1.0)) - 1.0) < 1e-12)
+
+    # Incremental: lotes de tamaño arbitrario dan lo mismo que el ensayo completo
+    partes = [derivar({nombre: valores[i:i + args.lote] for nombre, valores in columnas.items()}, args.peso)
+              for i in range(0, n, args.lote)]
+    iguales = all(np.array_equal(np.concatenate([parte[nombre] for parte in partes]), derivadas[nombre], equal_nan=True)
+                  for nombre in COLUMNAS_DERIVADAS)
+    comprobar(f"lote por lote ({args.lote} muestras) = ensayo completo", iguales)
+
+    # Costo: vectorizado frente a un bucle por muestra como el de la interfaz
+    repeticiones = max(1, 1000000 // n)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        derivar(columnas, args.peso)
+    vectorizado = (time.perf_counter() - inicio) / (repeticiones * n)
+    v_d, v_b, torque = (columnas[nombre].tolist() for nombre in ('Velocidad Disco', 'Velocidad Bola', 'Torque'))
+    inicio = time.perf_counter()
+    for vd, vb, par in zip(v_d, v_b, torque):
+        u = (vd + vb) / 2
+        _ = (par / args.peso, (vd - vb) / u if u else math.nan, u, vd - vb)
+    bucle = (time.perf_counter() - inicio) / n
+    print(f"derivar: {vectorizado * 1e9:.1f} ns/muestra; bucle de Python: {bucle * 1e9:.0f} ns/muestra")
+
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Verifica utilidades.secuencia ejecutando una receta contra el simulador del equipo.
+
+Arma un barrido de Stribeck (--velocidades de arrastre × --srr) con pasos de --rampa +
+--permanencia segundos y lo ejecuta en tiempo real con EjecutorSecuencia sobre
+PuertoSimulado, leyendo con LectorSerial + SincronizadorReloj + MarcadorPasos como
+MTM ALPHA.PY. Comprueba:
+  - una sola escritura por paso, con líneas de a lo sumo 63 caracteres (buffer del firmware);
+  - el retraso de cada paso respecto de lo programado (--retraso-maximo ms);
+  - que al final de cada paso (columna 'Paso') la velocidad de arrastre y el SRR medidos
+    sean los de la receta, y que la secuencia termine con STOP;
+y compara la duración con la de los mismos pasos cargados a mano (6 SET con 0.1 s entre
+cada uno, como enviar_parametros, más el tiempo del operador, --operador s por paso).
+Sale con código 1 si alguna comprobación falla.
+
+    python pruebas/prueba_secuencia.py --velocidades 0.1 0.2 0.4 --srr 0.02 0.05 --permanencia 1
+"""
+import argparse
+import os
+import queue
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from simulador_mtm import PuertoSimulado, SimuladorMTM
+from utilidades.lector_serial import LectorSerial
+from utilidades.magnitudes import derivar
+from utilidades.puente_gui import combinar_lotes
+from utilidades.secuencia import LARGO_COMANDO, EjecutorSecuencia, MarcadorPasos, duracion_receta, preparar_receta
+from utilidades.sincronizacion import SincronizadorReloj
+from utilidades.trama_binaria import COMANDO_BINARIO, DecodificadorBinario
+
+fallas = 0
+
+
+def comprobar(nombre, ok, detalle=''):
+    global fallas
+    print(f"{'OK   ' if ok else 'ERROR'} {nombre}{f' ({detalle})' if detalle else ''}")
+    fallas += not ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--velocidades', type=float, nargs='+', default=[0.1, 0.2, 0.4], help='Velocidades de arrastre (m/s)')
+    parser.add_argument('--srr', type=float, nargs='+', default=[0.02, 0.05])
+    parser.add_argument('--rampa', type=float, default=0.5)
+    parser.add_argument('--permanencia', type=float, default=1.0)
+    parser.add_argument('--retraso-maximo', type=float, default=5.0, help='ms de retraso admitido por paso')
+    parser.add_argument('--operador', type=float, default=15.0, help='Segundos del operador por paso manual')
+    args = parser.parse_args()
+
+    receta = preparar_receta({'nombre': 'Stribeck de prueba', 'rampa': args.rampa, 'permanencia': args.permanencia,
+                              'barrido': {'arrastre': args.velocidades, 'srr': args.srr}})
+    pasos = receta['pasos']
+    print(f"{len(pasos)} pasos, {duracion_receta(receta):g} s programados")
+
+    puerto = PuertoSimulado(SimuladorMTM(dt=0.01))
+    escrituras = []
+
+    def escribir(datos):
+        escrituras.append(datos)
+        return puerto.write(datos)
+
+    cola = queue.Queue()
+    secuencia = EjecutorSecuencia(receta, escribir, preambulo=COMANDO_BINARIO)
+    lector = LectorSerial(puerto, DecodificadorBinario(), cola, etapas=(SincronizadorReloj(), MarcadorPasos(secuencia)))
+    lector.start()
+    inicio = time.monotonic()
+    secuencia.start()
+    secuencia.join()
+    duracion = time.monotonic() - inicio
+    time.sleep(0.2)
+    lector.detener()
+    lote = combinar_lotes([cola.get_nowait() for _ in range(cola.qsize())])
+    columnas = lote.columnas
+
+    comprobar("sin errores en el ejecutor", secuencia.error is None, repr(secuencia.error))
+    comprobar("una escritura por paso más el STOP", len(escrituras) == len(pasos) + 1 and escrituras[-1] == b"STOP\n")
+    largo = max(len(linea) for datos in escrituras for linea in datos.decode().splitlines())
+    comprobar(f"líneas de a lo sumo {LARGO_COMANDO} caracteres", largo <= LARGO_COMANDO, f"la más larga: {largo}")
+    retraso = 1000 * max(secuencia.retrasos)
+    comprobar("retraso de cada paso", retraso <= args.retraso_maximo, f"máximo {retraso:.2f} ms, medio {1000 * np.mean(secuencia.retrasos):.2f} ms")
+
+    derivadas = derivar(columnas, 1.0)
+    paso_muestra = columnas['Paso']
+    for indice, paso in enumerate(pasos):
+        tramo = np.flatnonzero(paso_muestra == indice)
+        if not len(tramo):
+            comprobar(f"paso {indice}: muestras marcadas", False)
+            continue
+        final = tramo[-max(1, len(tramo) // 5):]  # Último 20 %, con la rampa ya terminada
+        arrastre = np.median(derivadas['Velocidad Arrastre'][final])
+        srr = np.median(derivadas['SRR'][final])
+        esperado = receta['pasos'][indice]
+        ok = abs(arrastre - args.velocidades[indice % len(args.velocidades)]) < 1e-3 and abs(srr - esperado['srr']) < 1e-3
+        comprobar(f"paso {indice}: U {arrastre:.3f} m/s, SRR {100 * srr:.2f} % ({len(tramo)} muestras)", ok)
+
+    manual = sum(paso['rampa'] + paso['permanencia'] + 6 * 0.1 + args.operador for paso in pasos)
+    print(f"Secuencia: {duracion:.1f} s; a mano: ~{manual:.0f} s ({manual / duracion:.1f} veces más, "
+          f"con {args.operador:g} s del operador por paso)")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Verifica utilidades.tara (CompensadorTara) con el simulador del equipo.
+
+Simula --ensayos ensayos de --minutos minutos (START, velocidad constante, STOP) con
+--reposo segundos de motores detenidos entre ellos, y la celda de carga con el cero
+desviado --cero y derivando --deriva-cero por hora. El mismo ensayo se genera sin
+desvío (misma semilla) como referencia. Comprueba:
+  - que desde el segundo ensayo (con la deriva ya estimada) el torque compensado en
+    marcha sigue al de referencia, y que estimar la deriva reduce el error frente a
+    restar sólo la última tara;
+  - que Torque + Tara reproduce el valor que envió el equipo;
+  - que compensar lote por lote da lo mismo con cualquier tamaño de lote, y que los
+    lotes sólo con mensajes (sin muestras) no cortan la ventana de reposo;
+y mide el costo por muestra. Sale con código 1 si alguna comprobación falla.
+
+    python pruebas/prueba_tara.py --ensayos 4 --minutos 30 --cero 0.3 --deriva-cero 0.2
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from simulador_mtm import SimuladorMTM
+from utilidades.tara import CompensadorTara
+from utilidades.telemetria import LoteTelemetria
+from utilidades.trama_binaria import COMANDO_BINARIO, DecodificadorBinario
+
+fallas = 0
+
+
+def comprobar(nombre, ok, detalle=''):
+    global fallas
+    print(f"{'OK   ' if ok else 'ERROR'} {nombre}{f' ({detalle})' if detalle else ''}")
+    fallas += not ok
+
+
+def simular(args, cero, deriva_cero):
+    simulador = SimuladorMTM(dt=0.01, ruido=args.ruido, cero=cero, deriva_cero=deriva_cero, semilla=1)
+    simulador.comando(COMANDO_BINARIO.strip())
+    simulador.comando("SET R=5.4 r=4 RPM_D_i=0 RPM_D_f=300 mu=0.05 T=5")
+    decodificador = DecodificadorBinario()
+    partes = []
+
+    def generar(segundos):
+        # De a 1 s, así el cero del simulador deriva en escalones chicos
+        for _ in range(int(segundos)):
+            partes.append(decodificador.alimentar(simulador.generar(1.0)).columnas)
+
+    generar(args.reposo)
+    for _ in range(args.ensayos):
+        simulador.comando("START")
+        generar(args.minutos * 60)
+        simulador.comando("STOP")
+        generar(args.reposo)
+    columnas = {nombre: np.concatenate([parte[nombre] for parte in partes]) for nombre in partes[0]}
+    columnas['Hora'] = columnas['Millis'] / 1000.0  # Sin SincronizadorReloj: el reloj del equipo alcanza
+    return columnas
+
+
+def compensar(columnas, lote, mensajes=False, **opciones):
+    # Devuelve las columnas compensadas, el compensador y los segundos que tardó (sin armar los lotes).
+    # Con mensajes=True intercala después de cada lote uno sin muestras, como los ecos de un SET
+    compensador = CompensadorTara(**opciones)
+    n = len(columnas['Torque'])
+    lotes = []
+    for i in range(0, n, lote):
+        lotes.append(LoteTelemetria({nombre: valores[i:i + lote] for nombre, valores in columnas.items()}, []))
+        if mensajes:
+            lotes.append(LoteTelemetria({nombre: valores[:0] for nombre, valores in columnas.items()}, ["R actualizado a: 5.40"]))
+    inicio = time.perf_counter()
+    partes = [compensador(lote).columnas for lote in lotes]
+    duracion = time.perf_counter() - inicio
+    return {nombre: np.concatenate([parte[nombre] for parte in partes]) for nombre in ('Torque', 'Tara')}, compensador, duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ensayos', type=int, default=4)
+    parser.add_argument('--minutos', type=float, default=30.0, help='Duración de cada ensayo')
+    parser.add_argument('--reposo', type=float, default=10.0, help='Segundos con los motores detenidos entre ensayos')
+    parser.add_argument('--cero', type=float, default=0.3, help='Desvío del cero de la celda (kg)')
+    parser.add_argument('--deriva-cero', type=float, default=0.2, help='Deriva del cero por hora (kg)')
+    parser.add_argument('--ruido', type=float, default=0.005)
+    parser.add_argument('--lote', type=int, default=5, help='Muestras por lote (como LectorSerial a 100 muestras/s)')
+    args = parser.parse_args()
+
+    crudo = simular(args, args.cero, args.deriva_cero)
+    referencia = simular(args, 0.0, 0.0)['Torque']
+    n = len(crudo['Torque'])
+    marcha = (crudo['Velocidad Disco'] > 0) | (crudo['Velocidad Bola'] > 0)
+    print(f"{n} muestras ({int((~marcha).sum())} en reposo) en {args.ensayos} ensayos de {args.minutos:g} min; "
+          f"cero {args.cero:+g} kg, deriva {args.deriva_cero:+g} kg/h")
+
+    compensado, compensador, duracion = compensar(crudo, args.lote)
+    solo_tara, _, _ = compensar(crudo, args.lote, intervalo_deriva=np.inf)
+    for correccion in compensador.correcciones:
+        print(f"      ventana de {correccion['muestras']} muestras: tara {correccion['tara']:+.4f} kg, "
+              f"deriva {correccion['deriva'] * 3600:+.4f} kg/h")
+
+    # Desde el segundo ensayo: antes hay una sola tara y la deriva todavía no se conoce
+    medido = marcha & (crudo['Hora'] > compensador.correcciones[1]['hora'])
+    sin_compensar = np.max(np.abs(crudo['Torque'][medido] - referencia[medido]))
+    error = np.max(np.abs(compensado['Torque'][medido] - referencia[medido]))
+    error_tara = np.max(np.abs(solo_tara['Torque'][medido] - referencia[medido]))
+    tolerancia = args.deriva_cero * (args.minutos / 60) / 4 + 5 * args.ruido / np.sqrt(5)
+    comprobar("en marcha sigue al torque sin desvío", error < tolerancia,
+              f"error máximo {error:.4f} kg; sin compensar {sin_compensar:.4f}, sólo tara {error_tara:.4f}")
+    if args.deriva_cero and args.ensayos > 2:
+        comprobar("estimar la deriva reduce el error", error < error_tara)
+    comprobar("Torque + Tara = valor del equipo", np.allclose(compensado['Torque'] + compensado['Tara'], crudo['Torque'], atol=1e-12))
+    otro, _, _ = compensar(crudo, 997)
+    comprobar("lote por lote: lotes de 5 y de 997 muestras iguales",
+              np.allclose(otro['Torque'], compensado['Torque'], atol=1e-9, equal_nan=True))
+    con_mensajes, compensador_mensajes, _ = compensar(crudo, args.lote, mensajes=True)
+    comprobar("lotes sólo con mensajes no cortan el reposo",
+              np.allclose(con_mensajes['Torque'], compensado['Torque'], atol=1e-9, equal_nan=True)
+              and len(compensador_mensajes.correcciones) == len(compensador.correcciones),
+              f"{len(compensador_mensajes.correcciones)} ventanas contra {len(compensador.correcciones)}")
+    print(f"CompensadorTara: {duracion / n * 1e9:.0f} ns/muestra en lotes de {args.lote} muestras")
+
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
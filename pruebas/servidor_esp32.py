@@ -0,0 +1,182 @@
+"""Servidor HTTP local que imita al ESP32 de firmware/ESP32.lnk.ino.
+
+Atiende /set_disco?rpm=, /set_bolita?rpm=, /get_torque y /set_torque (POST value=) con
+las mismas respuestas que el firmware, sobre HTTP/1.1 con keep-alive. `--retardo`
+agrega una demora por pedido (latencia de la red WiFi) y `--secuencial` atiende de a un
+pedido por vez, como el WebServer del ESP32.
+
+Con `--flujo PUERTO` atiende además el flujo continuo de torque por TCP: cada
+`--periodo-envio` ms envía las líneas "millis,torque" de las muestras generadas a
+`--ritmo` muestras/s, con el tiempo del "equipo" (milisegundos desde el arranque).
+
+    python pruebas/servidor_esp32.py --puerto 8080 --retardo 20
+    python pruebas/servidor_esp32.py --puerto 8080 --flujo 8081 --ritmo 1000
+"""
+import argparse
+import math
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class ServidorESP32(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, puerto=0, retardo=0.0, secuencial=False, puerto_flujo=None, ritmo=100.0, periodo_envio=0.05):
+        super().__init__(('127.0.0.1', puerto), _Manejador)
+        self.retardo = retardo
+        self.velocidad_disco = 0.0
+        self.velocidad_bolita = 0.0
+        self.torque = 2.5
+        self.pedidos = {}
+        self.conexiones = 0
+        self.inicio = time.monotonic()
+        self._secuencial = threading.Lock() if secuencial else None
+        self._hilo = None
+        self.ritmo = ritmo
+        self.periodo_envio = periodo_envio
+        self.muestras_enviadas = 0
+        self.activo = True
+        self.flujo = None
+        if puerto_flujo is not None:
+            self.flujo = _ServidorFlujo(('127.0.0.1', puerto_flujo), _ManejadorFlujo)
+            self.flujo.esp32 = self
+
+    @property
+    def direccion(self):
+        # Para ControladorMotoresWiFi(ip_esp32=...)
+        return f'127.0.0.1:{self.server_address[1]}'
+
+    @property
+    def puerto_flujo(self):
+        return self.flujo.server_address[1]
+
+    def torque_actual(self, instante=None):
+        # Torque fijado más una oscilación lenta, para que la gráfica no sea una recta
+        instante = time.monotonic() if instante is None else instante
+        return self.torque + 0.1 * math.sin(instante - self.inicio)
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.serve_forever, name='ServidorESP32', daemon=True)
+        self._hilo.start()
+        if self.flujo:
+            threading.Thread(target=self.flujo.serve_forever, name='FlujoESP32', daemon=True).start()
+        return self
+
+    def detener(self):
+        self.activo = False
+        self.shutdown()
+        self.server_close()
+        if self.flujo:
+            self.flujo.shutdown()
+            self.flujo.server_close()
+
+
+class _ServidorFlujo(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _ManejadorFlujo(socketserver.BaseRequestHandler):
+    # Como el firmware: acumula una línea por muestra y las envía en tandas
+    def handle(self):
+        esp32 = self.server.esp32
+        periodo = 1.0 / esp32.ritmo
+        siguiente = time.monotonic()
+        while esp32.activo:
+            time.sleep(esp32.periodo_envio)
+            ahora = time.monotonic()
+            lineas = []
+            while siguiente <= ahora:
+                lineas.append(f'{int((siguiente - esp32.inicio) * 1000)},{esp32.torque_actual(siguiente):.3f}\n')
+                siguiente += periodo
+            try:
+                self.request.sendall(''.join(lineas).encode())
+            except OSError:
+                return
+            esp32.muestras_enviadas += len(lineas)
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: la conexión sigue abierta entre pedidos
+    disable_nagle_algorithm = True  # Encabezado y cuerpo salen en escrituras separadas
+
+    def setup(self):
+        super().setup()
+        self.server.conexiones += 1
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, estado, texto):
+        cuerpo = texto.encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _atender(self, argumentos):
+        servidor = self.server
+        ruta = urlparse(self.path).path
+        servidor.pedidos[ruta] = servidor.pedidos.get(ruta, 0) + 1
+        if servidor.retardo:
+            time.sleep(servidor.retardo)
+        if ruta in ('/set_disco', '/set_bolita'):
+            if 'rpm' not in argumentos:
+                return self._responder(400, 'Falta el parámetro rpm')
+            if ruta == '/set_disco':
+                servidor.velocidad_disco = float(argumentos['rpm'][0])
+                return self._responder(200, 'Velocidad del disco ajustada')
+            servidor.velocidad_bolita = float(argumentos['rpm'][0])
+            return self._responder(200, 'Velocidad de la bolita ajustada')
+        if ruta == '/get_torque':
+            return self._responder(200, f'{servidor.torque_actual():.2f}')
+        if ruta == '/set_torque':
+            if 'value' not in argumentos:
+                return self._responder(400, 'Falta el parámetro value')
+            servidor.torque = float(argumentos['value'][0])
+            return self._responder(200, 'Torque ajustado')
+        self._responder(404, 'Not found')
+
+    def _con_turno(self, argumentos):
+        if self.server._secuencial is None:
+            return self._atender(argumentos)
+        with self.server._secuencial:
+            return self._atender(argumentos)
+
+    def do_GET(self):
+        self._con_turno(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length', 0))
+        argumentos = parse_qs(urlparse(self.path).query)
+        argumentos.update(parse_qs(self.rfile.read(largo).decode()))
+        self._con_turno(argumentos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--retardo', type=float, default=0.0, help='Demora por pedido en ms')
+    parser.add_argument('--secuencial', action='store_true', help='Atender de a un pedido por vez')
+    parser.add_argument('--flujo', type=int, default=None, help='Puerto TCP del flujo continuo de torque')
+    parser.add_argument('--ritmo', type=float, default=100.0, help='Muestras/s del flujo')
+    parser.add_argument('--periodo-envio', type=float, default=50.0, help='ms entre tandas del flujo')
+    args = parser.parse_args()
+    servidor = ServidorESP32(args.puerto, args.retardo / 1000, args.secuencial, args.flujo, args.ritmo, args.periodo_envio / 1000)
+    print(f"Imitando al ESP32 en http://{servidor.direccion} (Ctrl+C para salir)")
+    if servidor.flujo:
+        print(f"Flujo de torque en 127.0.0.1:{servidor.puerto_flujo} a {args.ritmo:g} muestras/s")
+    servidor.iniciar()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.detener()
+
+
+if __name__ == '__main__':
+    main()
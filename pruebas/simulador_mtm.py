@@ -0,0 +1,659 @@
+"""Simulador del equipo MTM: habla el protocolo serie del firmware sin hardware.
+
+Reemplaza a MTM_Epsilon_12.11_Dutty_Aumentado.ino para ensayos de carga y benchmarks:
+atiende SET R=/r/RPM_D_i/RPM_D_f/mu/T/DIR_DISCO/DIR_BOLA/MODO, START, STOP y STATUS
+con los mismos ecos, y en cada paso de control (`--dt`, 10 ms en el firmware) calcula
+ω_D = ω_D_i + α_D·t, ω_B = K·ω_D con K = (1 - μ)·(R / r), las frecuencias de pulsos
+limitadas a [F_PWM_MIN, F_PWM_MAX], las velocidades lineales y T_pulse, y envía la
+línea "Tiempo: ... | T_pulse_B: ... us" (o la trama binaria con SET MODO=BIN).
+
+`--ritmo` fija cuántos pasos de control se simulan por segundo real, sin límite: con
+el valor por defecto (1/dt) el ensayo transcurre en tiempo real y con --ritmo 10000
+se generan 10000 líneas/s. El firmware envía texto cada 500 ms (`--cada 50`); por
+defecto el simulador envía una línea por paso. El torque sale de una curva de tracción
+sintética (crece con el deslizamiento, cae con la velocidad de arrastre) más ruido
+gaussiano de desvío `--ruido`. `--perdida` y `--corrupcion` son la probabilidad de que
+cada línea o trama se pierda o llegue con un bit invertido. Cada muestra lleva la
+secuencia y millis() del equipo ("| Seq: n | Millis: m ms" o en la trama); `--deriva`
+adelanta (ppm > 0) o atrasa el reloj simulado del equipo respecto del real. Con los
+motores detenidos envía una muestra de reposo cada 500 ms (velocidades en 0), con el
+cero de la celda desviado `--cero` y derivando `--deriva-cero` por hora.
+
+Dialectos (`--dialecto`):
+  mtm         el firmware Epsilon descrito arriba (MTM ALPHA.PY, MTM Beta.py);
+  cerate      cambiadordeRes.ino: MSPR, S, AL, AS, M, P y "Torque:x,RPM1:y,RPM2:z,Seq:n,Millis:m"
+              (interfazCERATE.py; el firmware envía cada 100 ms, --cada 10);
+  get_torque  lo que espera ControladorMotor: "GET_TORQUE" -> "TORQUE:x", "SET_RPM:n".
+`--servicio` demora cada respuesta a un comando (ms), atendiendo de a uno.
+
+Transportes: por defecto crea un par pty y escribe el nombre del extremo a abrir
+(Linux/macOS), p. ej. en la lista de puertos o con serial.Serial(nombre). En el
+mismo proceso, PuertoSimulado sirve de puerto pyserial sin pty (también en Windows), y
+SimuladorMTM.generar() devuelve los bytes de un tramo de ensayo para escribirlos en un
+puerto serial_for_url('loop://'). `--prueba SEGUNDOS` se verifica a sí mismo con
+LectorSerial, el decodificador y el SincronizadorReloj de la interfaz y muestra
+muestras/s, errores, pérdidas detectadas y deriva estimada.
+
+    python pruebas/simulador_mtm.py
+    python pruebas/simulador_mtm.py --ritmo 10000 --ruido 0.05 --perdida 0.001 --corrupcion 0.001
+    python pruebas/simulador_mtm.py --dialecto cerate --cada 10
+    python pruebas/simulador_mtm.py --prueba 3 --ritmo 5000 --binario
+    python pruebas/simulador_mtm.py --prueba 10 --perdida 0.01 --deriva 80
+"""
+import argparse
+import heapq
+import itertools
+import math
+import os
+import queue
+import re
+import select
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
+from utilidades.lector_serial import LectorSerial
+from utilidades.puente_gui import combinar_lotes
+from utilidades.sincronizacion import SincronizadorReloj
+from utilidades.telemetria import COLUMNAS, formatear_lineas
+from utilidades.trama_binaria import COMANDO_BINARIO, DecodificadorBinario, empaquetar_trama
+
+# Constantes del firmware Epsilon
+PASOS_POR_REV = 200 * 7
+F_PWM_MIN = 100.0
+F_PWM_MAX = 1000000.0 / ((5 + 2.5) * 2)
+DUTY_MAX = (1 << 11) - 1
+DUTY = DUTY_MAX // 2
+T_DES = 5.0
+RPM_A_RAD = 2 * math.pi / 60
+DIALECTOS = ('mtm', 'cerate', 'get_torque')
+
+
+def _linea(texto):
+    # Serial.println termina en "\r\n"
+    return texto.encode() + b'\r\n'
+
+
+def _f2(valor):
+    # Serial.print(float) imprime dos decimales
+    return f'{valor:.2f}'
+
+
+class _FirmwareEpsilon:
+    # MTM_Epsilon_12.11_Dutty_Aumentado.ino: procesarComando() y las tres fases del lazo de control
+    def __init__(self, simulador):
+        self.sim = simulador
+        self.parametros = {'R': 5.4, 'r': 4.0, 'RPM_D_i': 0.0, 'RPM_D_f': 300.0, 'mu': 0.2, 'T': 60.0}
+        self.dir_disco = self.dir_bola = 1
+        self.binario = False
+        self.secuencia = 0
+        self.fase = None  # 'aceleracion', 'desaceleracion' o None (velocidad constante si w_d o w_b > 0)
+        self.t = 0.0
+        self.w_d = self.w_b = 0.0
+        self._cuenta = 0
+
+    def saludo(self):
+        return [_linea(texto) for texto in ("Interfaz serial inicializada.", "Ingrese comandos. Ejemplo:", "SET PARAM=valor",
+                                            "SET MODO=BIN | SET MODO=ASCII", "START", "STOP", "STATUS")]
+
+    def comando(self, comando):
+        if comando.startswith('SET'):
+            return self._set(comando)
+        if comando.startswith('START'):
+            return self._start()
+        if comando.startswith('STOP'):
+            return self._stop()
+        if comando.startswith('STATUS'):
+            p = self.parametros
+            lineas = ["=== Estado Actual ==="] + [f"{nombre}: {_f2(p[nombre])}" for nombre in p]
+            lineas += [f"DIR_DISCO: {'HIGH' if self.dir_disco else 'LOW'}", f"DIR_BOLA: {'HIGH' if self.dir_bola else 'LOW'}",
+                       f"MODO: {'BIN' if self.binario else 'ASCII'}", "====================="]
+            return [_linea(texto) for texto in lineas]
+        return [_linea(f"Comando desconocido: {comando}")]
+
+    def _set(self, comando):
+        # Lo mismo que procesarComando, sentencia por sentencia: strtok(comando, " =") da primero "SET"
+        # (que se saltea) y después cada NOMBRE seguido de su valor
+        respuestas = []
+        tokens = iter([token for token in re.split(r'[ =]+', comando) if token])
+        token = next(tokens, None)
+        token = next(tokens, None)
+        while token is not None:
+            nombre = token
+            if nombre in self.parametros or nombre in ('DIR_DISCO', 'DIR_BOLA', 'MODO'):
+                token = next(tokens, None)
+                if token is not None:
+                    if nombre in self.parametros:
+                        self.parametros[nombre] = _atof(token)
+                        respuestas.append(_linea(f"{nombre} actualizado a: {_f2(self.parametros[nombre])}"))
+                    elif nombre == 'MODO':
+                        self.binario = token.startswith('BIN')
+                        self.secuencia = 0
+                        respuestas.append(_linea(f"MODO actualizado a: {'BIN' if self.binario else 'ASCII'}"))
+                    else:
+                        nivel = 0 if int(_atof(token)) == 0 else 1
+                        setattr(self, 'dir_disco' if nombre == 'DIR_DISCO' else 'dir_bola', nivel)
+                        respuestas.append(_linea(f"{nombre} actualizado a: {'HIGH' if nivel else 'LOW'}"))
+            else:
+                respuestas.append(_linea(f"Parametro desconocido: {nombre}"))
+                token = next(tokens, None)
+            token = next(tokens, None)
+        return respuestas
+
+    def _start(self):
+        if self.fase == 'aceleracion':
+            return [_linea("La aceleración ya está en curso.")]
+        p = self.parametros
+        self.w_d_i, self.w_d_f = p['RPM_D_i'] * RPM_A_RAD, p['RPM_D_f'] * RPM_A_RAD
+        self.a_d = (self.w_d_f - self.w_d_i) / p['T'] if p['T'] else math.inf
+        k = (1 - p['mu']) * (p['R'] / p['r'])
+        self.w_b_i, self.w_b_f, self.a_b = k * self.w_d_i, k * self.w_d_f, k * self.a_d
+        self.t = 0.0
+        self.fase = 'aceleracion'
+        self._cuenta = 0
+        calculos = ["=== Cálculos Iniciales ===",
+                    f"Tiempo de aceleración: {_f2(p['T'])} s",
+                    f"Velocidad angular inicial Disco: {_f2(self.w_d_i)} rad/s",
+                    f"Velocidad angular final Disco: {_f2(self.w_d_f)} rad/s",
+                    f"Aceleración angular Disco: {_f2(self.a_d)} rad/s^2",
+                    f"Velocidad angular inicial Bola: {_f2(self.w_b_i)} rad/s",
+                    f"Velocidad angular final Bola: {_f2(self.w_b_f)} rad/s",
+                    f"Aceleración angular Bola: {_f2(self.a_b)} rad/s^2",
+                    f"Velocidad lineal máxima Disco: {_f2(self.w_d_f * p['R'] / 100)} m/s",
+                    f"Velocidad lineal máxima Bola: {_f2(self.w_b_f * p['r'] / 100)} m/s",
+                    f"Frecuencia máxima de pulsos Disco: {_f2(PASOS_POR_REV / (2 * math.pi) * self.w_d_f)} Hz",
+                    f"Frecuencia máxima de pulsos Bola: {_f2(PASOS_POR_REV / (2 * math.pi) * self.w_b_f)} Hz",
+                    "==========================", "Iniciando aceleración..."]
+        return [_linea(texto) for texto in calculos]
+
+    def _stop(self):
+        if self.fase == 'desaceleracion' or (self.fase is None and self.w_d <= 0 and self.w_b <= 0):
+            return [_linea("Motores ya están detenidos o desacelerando.")]
+        self.w_d_i, self.w_b_i = self.w_d, self.w_b
+        self.a_d, self.a_b = -self.w_d / T_DES, -self.w_b / T_DES
+        self.t = 0.0
+        self.fase = 'desaceleracion'
+        self._cuenta = 0
+        return [_linea("Iniciando desaceleración suave...")]
+
+    def pasos(self, n):
+        registros = []
+        dt = self.sim.dt
+        paso = self.sim.paso  # Pasos de control ya simulados (para millis() de cada muestra)
+        while n > 0:
+            if self.fase in ('aceleracion', 'desaceleracion'):
+                acelera = self.fase == 'aceleracion'
+                duracion = self.parametros['T'] if acelera else T_DES
+                k = min(n, max(1, math.ceil((duracion - self.t) / dt - 1e-9)))
+                t = self.t + dt * np.arange(1, k + 1)
+                if acelera:
+                    w_d = np.minimum(self.w_d_i + self.a_d * t, self.w_d_f)
+                    w_b = np.minimum(self.w_b_i + self.a_b * t, self.w_b_f)
+                else:
+                    w_d = np.maximum(self.w_d_i + self.a_d * t, 0.0)
+                    w_b = np.maximum(self.w_b_i + self.a_b * t, 0.0)
+                registros += self._telemetria(paso + np.arange(1, k + 1), t, w_d, w_b, limitar=True)
+                self.t, self.w_d, self.w_b = t[-1], w_d[-1], w_b[-1]
+                if self.t >= duracion - 1e-9:
+                    self.t = 0.0
+                    self.fase = None
+                    if acelera:
+                        self.w_d, self.w_b = self.w_d_f, self.w_b_f
+                        registros.append(_linea("Aceleración completada. Manteniendo velocidad constante."))
+                    else:
+                        self.w_d = self.w_b = 0.0
+                        registros.append(_linea("Desaceleración completada."))
+            else:
+                k = n
+                if self.w_d > 0 or self.w_b > 0:
+                    # Velocidad constante: t_global queda en 0, sin límites de frecuencia ni T_pulse
+                    registros += self._telemetria(paso + np.arange(1, k + 1), np.zeros(k), np.full(k, self.w_d),
+                                                  np.full(k, self.w_b), limitar=False)
+                else:
+                    registros += self._reposo(paso + np.arange(1, k + 1))
+            n -= k
+            paso += k
+        return registros
+
+    def _telemetria(self, pasos, t, w_d, w_b, limitar):
+        f_d = PASOS_POR_REV / (2 * math.pi) * w_d
+        f_b = PASOS_POR_REV / (2 * math.pi) * w_b
+        if limitar:
+            f_d = np.clip(f_d, F_PWM_MIN, F_PWM_MAX)
+            f_b = np.clip(f_b, F_PWM_MIN, F_PWM_MAX)
+            t_pulse_d = DUTY / DUTY_MAX / f_d * 1e6
+            t_pulse_b = DUTY / DUTY_MAX / f_b * 1e6
+        else:
+            t_pulse_d = t_pulse_b = np.full(len(t), np.nan)
+        duty = np.full(len(t), DUTY / DUTY_MAX * 100)
+        v_d = w_d * self.parametros['R'] / 100
+        v_b = w_b * self.parametros['r'] / 100
+        columnas = dict(zip(COLUMNAS, (t, f_d, duty, v_d, f_b, duty, v_b, self.sim.torque(v_d, v_b), t_pulse_d, t_pulse_b)))
+
+        millis = self.sim.millis(pasos)
+        if not self.binario:
+            # En texto sólo sale uno de cada `cada` pasos (el firmware imprime cada 500 ms)
+            indices = np.flatnonzero((self._cuenta + np.arange(1, len(t) + 1)) % self.sim.cada == 0)
+            self._cuenta += len(t)
+            if len(indices) < len(t):
+                columnas = {nombre: valores[indices] for nombre, valores in columnas.items()}
+                millis = millis[indices]
+        return self._codificar(columnas, millis)
+
+    def _reposo(self, pasos):
+        # Motores detenidos: una muestra cada 500 ms en ambos modos, con velocidades y duty en 0
+        elegidos = pasos[pasos % max(1, round(0.5 / self.sim.dt)) == 0]
+        if not len(elegidos):
+            return []
+        ceros = np.zeros(len(elegidos))
+        sin_pulso = np.full(len(elegidos), np.nan)
+        columnas = dict(zip(COLUMNAS, (ceros, ceros, ceros, ceros, ceros, ceros, ceros, self.sim.torque(ceros, ceros),
+                                       sin_pulso, sin_pulso)))
+        return self._codificar(columnas, self.sim.millis(elegidos))
+
+    def _codificar(self, columnas, millis):
+        if self.binario:
+            tabla = np.column_stack([columnas[nombre] for nombre in COLUMNAS]).astype(np.float32)
+            registros = [empaquetar_trama(self.secuencia + i, fila, ms) for i, (fila, ms) in enumerate(zip(tabla, millis.tolist()))]
+            self.secuencia += len(tabla)
+            return registros
+        registros = [f"{linea} | Seq: {self.secuencia + i} | Millis: {ms} ms\r\n".encode()
+                     for i, (linea, ms) in enumerate(zip(formatear_lineas(columnas), millis.tolist()))]
+        self.secuencia += len(registros)
+        return registros
+
+
+class _FirmwareCerate:
+    # cambiadordeRes.ino: dos motores con rampas lineales o en S y el torque analógico cada 100 ms
+    def __init__(self, simulador):
+        self.sim = simulador
+        self.t = 0.0
+        self._cuenta = 0
+        self.secuencia = 0
+        self.micropasos = 200
+        # Por motor: rpm = inicial + (final - inicial)·forma((t - t0) / duracion), 0 desde `fin`
+        self.motores = {n: {'inicial': 0.0, 'final': 0.0, 't0': 0.0, 'duracion': 0.0, 'curva_s': False, 'fin': math.inf}
+                        for n in (1, 2)}
+
+    def saludo(self):
+        return [_linea("Control de 2 Motores Paso a Paso Iniciado con MCPWM y Lectura de Torque.")]
+
+    def _fijar(self, motor, inicial, final, duracion=0.0, curva_s=False, fin=math.inf):
+        self.motores[motor] = {'inicial': inicial, 'final': final, 't0': self.t, 'duracion': duracion,
+                               'curva_s': curva_s, 'fin': fin}
+
+    def comando(self, comando):
+        comando = comando.strip()
+        if not comando:
+            return []
+        if comando.startswith('MSPR'):
+            micropasos = int(_atof(comando[4:]))
+            if micropasos <= 0:
+                return [_linea("Error: Valor de microstepsPerRevolution inválido.")]
+            self.micropasos = micropasos
+            return [_linea(f"microstepsPerRevolution actualizado a {micropasos}")]
+        motor = comando[2:3] if comando[:2] in ('AL', 'AS') else comando[1:2]
+        if motor not in ('1', '2'):
+            return [_linea("Comando no reconocido.")]
+        motor = int(motor)
+        if comando[0] == 'S':
+            rpm = _atof(comando[2:])
+            self._fijar(motor, rpm, rpm)
+            return [_linea(f"Estableciendo velocidad continua en el Motor {motor} a {_f2(rpm)} RPM.")]
+        if comando[0] == 'P':
+            self._fijar(motor, 0.0, 0.0)
+            return [_linea(f"Motor {motor} detenido.")]
+        if comando[0] == 'A':
+            valores = comando[3:].split(',')
+            if len(valores) < 3:
+                return [_linea(f"Error: Formato incorrecto. Use AL{motor}<rpmInicial>,<rpmFinal>,<tiempoSegundos> "
+                               f"o AS{motor}<rpmInicial>,<rpmFinal>,<tiempoSegundos>")]
+            inicial, final, duracion = (_atof(valor) for valor in valores[:3])
+            if duracion <= 0:
+                return [_linea("Error: Tiempo inválido.")]
+            curva_s = comando[1] == 'S'
+            self._fijar(motor, inicial, final, duracion, curva_s)
+            return [_linea(f"Acelerando el Motor {motor} de {_f2(inicial)} RPM a {_f2(final)} RPM en {_f2(duracion)} "
+                           f"segundos usando aceleración {'curva S.' if curva_s else 'lineal.'}")]
+        if comando[0] == 'M':
+            valores = comando[2:].split(',')
+            if len(valores) < 2:
+                return [_linea(f"Error: Formato incorrecto. Use M{motor}<grados>,<rpm>")]
+            grados, rpm = _atof(valores[0]), _atof(valores[1])
+            if grados == 0 or rpm == 0:
+                return [_linea("Error: Valores inválidos.")]
+            # Gira a `rpm` el tiempo que tardan los pasos de `grados` y se detiene
+            self._fijar(motor, rpm, rpm, fin=self.t + abs(grados) / 360 * 60 / abs(rpm))
+            return [_linea(f"Moviendo Motor {motor} {_f2(grados)} grados a {_f2(rpm)} RPM.")]
+        return [_linea("Comando no reconocido.")]
+
+    def _rpm(self, motor, t):
+        m = self.motores[motor]
+        avance = np.clip((t - m['t0']) / m['duracion'], 0.0, 1.0) if m['duracion'] > 0 else np.ones(len(t))
+        if m['curva_s']:
+            avance = (1 - np.cos(np.pi * avance)) / 2
+        rpm = m['inicial'] + (m['final'] - m['inicial']) * avance
+        return np.where(t >= m['fin'], 0.0, rpm)
+
+    def pasos(self, n):
+        t = self.t + self.sim.dt * np.arange(1, n + 1)
+        self.t = t[-1]
+        indices = np.flatnonzero((self._cuenta + np.arange(1, n + 1)) % self.sim.cada == 0)
+        self._cuenta += n
+        if not len(indices):
+            return []
+        t = t[indices]
+        millis = self.sim.millis(self.sim.paso + 1 + indices)
+        secuencia = self.secuencia + np.arange(len(indices))
+        self.secuencia += len(indices)
+        rpm1, rpm2 = self._rpm(1, t), self._rpm(2, t)
+        # Motor 1 mueve el disco (R = 5.4 cm) y motor 2 la bola (r = 4 cm); el sensor mide de 0 a 5 Nm
+        torque = np.clip(self.sim.torque(rpm1 * RPM_A_RAD * 0.054, rpm2 * RPM_A_RAD * 0.04), 0.0, 5.0)
+        return [f"Torque:{par:.2f},RPM1:{r1:.2f},RPM2:{r2:.2f},Seq:{n},Millis:{ms}\r\n".encode()
+                for par, r1, r2, n, ms in zip(torque, rpm1, rpm2, secuencia.tolist(), millis.tolist())]
+
+
+class _FirmwareGetTorque:
+    # Lo que espera ControladorMotor: responde cada GET_TORQUE con "TORQUE:x"; SET_RPM:n fija el disco
+    def __init__(self, simulador):
+        self.sim = simulador
+        self.rpm = 0.0
+
+    def saludo(self):
+        return []
+
+    def comando(self, comando):
+        comando = comando.strip()
+        if comando.startswith('SET_RPM:'):
+            self.rpm = _atof(comando[8:])
+        elif comando == 'GET_TORQUE':
+            # El segundo motor gira a 600 RPM, como en firmware/principal.cpp
+            par = self.sim.torque(np.array([self.rpm * RPM_A_RAD * 0.054]), np.array([600 * RPM_A_RAD * 0.04]))[0]
+            return [f"TORQUE:{par:.2f}\n".encode()]
+        return []
+
+    def pasos(self, n):
+        return []
+
+
+def _atof(texto):
+    # atof/toFloat: el prefijo numérico válido, 0 si no hay
+    coincidencia = re.match(r'\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?', texto)
+    return float(coincidencia.group(0)) if coincidencia else 0.0
+
+
+class SimuladorMTM:
+    """Modelo del equipo y su protocolo, sin reloj ni transporte.
+
+    `comando(linea)` aplica un comando y devuelve los bytes de la respuesta;
+    `avanzar(pasos)` simula esa cantidad de pasos de control y devuelve los bytes de
+    telemetría (y mensajes) que el equipo enviaría, con ruido, pérdidas y corrupción.
+    PuertoSimulado y EquipoPTY le ponen el reloj (`ritmo` pasos por segundo real).
+    Con la misma `semilla` la salida es reproducible.
+    """
+
+    def __init__(self, dialecto='mtm', dt=0.01, ritmo=None, cada=1, ruido=0.0, perdida=0.0, corrupcion=0.0,
+                 carga=2.5, servicio=0.0, deriva=0.0, cero=0.0, deriva_cero=0.0, semilla=None):
+        if dialecto not in DIALECTOS:
+            raise ValueError(f"Dialecto desconocido: {dialecto} (opciones: {', '.join(DIALECTOS)})")
+        self.dialecto = dialecto
+        self.dt = dt
+        self.ritmo = ritmo if ritmo else 1.0 / dt
+        self.cada = max(1, int(cada))
+        self.ruido = ruido
+        self.perdida = perdida
+        self.corrupcion = corrupcion
+        self.carga = carga
+        self.servicio = servicio
+        self.deriva = deriva
+        self.cero = cero  # Desvío del cero de la celda de carga y su deriva por hora de ensayo
+        self.deriva_cero = deriva_cero
+        self.paso = 0  # Pasos de control simulados desde el encendido
+        self.rng = np.random.default_rng(semilla)
+        self.registros = 0
+        self.perdidos = 0
+        self.corrompidos = 0
+        self.firmware = {'mtm': _FirmwareEpsilon, 'cerate': _FirmwareCerate, 'get_torque': _FirmwareGetTorque}[dialecto](self)
+
+    def torque(self, v_d, v_b):
+        # Curva de tracción sintética: sube con el deslizamiento (SRR) y baja con la velocidad de arrastre
+        arrastre = (np.abs(v_d) + np.abs(v_b)) / 2
+        srr = np.divide(np.abs(v_d - v_b), arrastre, out=np.zeros(len(arrastre)), where=arrastre > 0)
+        par = self.carga * np.tanh(srr / 0.05) * (0.6 + 0.4 * np.exp(-arrastre))
+        if self.cero or self.deriva_cero:
+            par = par + self.cero + self.deriva_cero * self.paso * self.dt / 3600
+        if self.ruido:
+            par = par + self.rng.normal(0.0, self.ruido, len(par))
+        return par
+
+    def saludo(self):
+        return self._deteriorar(self.firmware.saludo())
+
+    def comando(self, linea):
+        # linea: str sin el '\n' (como readBytesUntil)
+        return self._deteriorar(self.firmware.comando(linea))
+
+    def millis(self, pasos):
+        # millis() del equipo al enviar la muestra del paso k: el paso k ocurre a k / ritmo segundos reales
+        # del encendido y el reloj del equipo se adelanta `deriva` ppm
+        return np.floor(np.asarray(pasos) * (1000.0 / self.ritmo) * (1 + self.deriva * 1e-6)).astype(np.int64)
+
+    def avanzar(self, pasos):
+        if pasos <= 0:
+            return b''
+        registros = self.firmware.pasos(int(pasos))
+        self.paso += int(pasos)
+        return self._deteriorar(registros)
+
+    def generar(self, segundos):
+        # Bytes de `segundos` de ensayo simulado (para escribirlos en un puerto loop://)
+        return self.avanzar(round(segundos / self.dt))
+
+    def _deteriorar(self, registros):
+        n = len(registros)
+        if not n:
+            return b''
+        self.registros += n
+        if self.perdida or self.corrupcion:
+            sorteo = self.rng.random((2, n))
+            conservar = sorteo[0] >= self.perdida
+            self.perdidos += n - int(conservar.sum())
+            for i in np.flatnonzero(conservar & (sorteo[1] < self.corrupcion)):
+                # Un bit invertido en cualquier byte menos el terminador
+                registro = bytearray(registros[i])
+                posicion = int(self.rng.integers(max(1, len(registro) - 1)))
+                registro[posicion] ^= 1 << int(self.rng.integers(8))
+                registros[i] = bytes(registro)
+                self.corrompidos += 1
+            if not conservar.all():
+                registros = [registro for registro, ok in zip(registros, conservar) if ok]
+        return b''.join(registros)
+
+
+class PuertoSimulado:
+    """Puerto serie en memoria conectado a un SimuladorMTM, con la interfaz de pyserial
+    que usa la interfaz (timeout, in_waiting, read, write, reset_input_buffer, close).
+
+    El equipo avanza con el reloj: al leer se generan los pasos de control vencidos
+    desde la última lectura. Cada comando tarda `simulador.servicio` segundos en
+    responderse y se atienden de a uno.
+    """
+
+    def __init__(self, simulador, timeout=1.0):
+        self.simulador = simulador
+        self.timeout = timeout
+        self.is_open = True
+        self._salida = bytearray(simulador.saludo())
+        self._entrada = b''
+        self._diferidas = []  # heap de (instante, orden, bytes)
+        self._orden = itertools.count()
+        self._ocupado_hasta = 0.0
+        self.inicio = time.monotonic()
+        self.pasos = 0  # Pasos de control simulados; el paso k vence en inicio + k / ritmo
+        self._lock = threading.Lock()
+
+    def _actualizar(self, ahora):
+        vencidos = int((ahora - self.inicio) * self.simulador.ritmo) - self.pasos
+        if vencidos > 0:
+            self.pasos += vencidos
+            self._salida += self.simulador.avanzar(vencidos)
+        while self._diferidas and self._diferidas[0][0] <= ahora:
+            self._salida += heapq.heappop(self._diferidas)[2]
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            self._actualizar(time.monotonic())
+            return len(self._salida)
+
+    def read(self, n=1):
+        fin = None if self.timeout is None else time.monotonic() + self.timeout
+        while self.is_open:
+            with self._lock:
+                self._actualizar(time.monotonic())
+                if self._salida:
+                    datos = bytes(self._salida[:n])
+                    del self._salida[:n]
+                    return datos
+            if fin is not None and time.monotonic() >= fin:
+                break
+            espera = max(0.001, 1.0 / self.simulador.ritmo)
+            time.sleep(espera if fin is None else max(0.0, min(espera, fin - time.monotonic())))
+        return b''
+
+    def write(self, datos):
+        with self._lock:
+            ahora = time.monotonic()
+            self._actualizar(ahora)  # El comando llega después de los pasos ya vencidos
+            lineas = (self._entrada + bytes(datos)).split(b'\n')
+            self._entrada = lineas.pop()
+            for linea in lineas:
+                respuesta = self.simulador.comando(linea.decode('utf-8', errors='replace'))
+                if self.simulador.servicio > 0:
+                    self._ocupado_hasta = max(ahora, self._ocupado_hasta) + self.simulador.servicio
+                    heapq.heappush(self._diferidas, (self._ocupado_hasta, next(self._orden), respuesta))
+                else:
+                    self._salida += respuesta
+        return len(datos)
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._actualizar(time.monotonic())
+            self._salida.clear()
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class EquipoPTY(threading.Thread):
+    # Atiende el extremo maestro de un pty con un PuertoSimulado; la interfaz abre `nombre`
+    def __init__(self, simulador, periodo=0.002):
+        super().__init__(name='EquipoPTY', daemon=True)
+        import tty
+        self.maestro, self._esclavo = os.openpty()
+        tty.setraw(self._esclavo)  # Sin eco ni traducción de fin de línea
+        self.nombre = os.ttyname(self._esclavo)
+        self.puerto = PuertoSimulado(simulador, timeout=0)
+        self.periodo = periodo
+        self._activo = True
+
+    def run(self):
+        while self._activo:
+            try:
+                listos, _, _ = select.select([self.maestro], [], [], self.periodo)
+                if listos:
+                    self.puerto.write(os.read(self.maestro, 4096))
+                datos = memoryview(self.puerto.read(self.puerto.in_waiting or 1))
+                while datos:
+                    datos = datos[os.write(self.maestro, datos):]
+            except OSError:
+                return
+
+    def detener(self):
+        self._activo = False
+        self.join(1.0)
+        os.close(self.maestro)
+        os.close(self._esclavo)
+
+
+def autoverificar(simulador, segundos, binario):
+    # Conduce al simulador como MTM ALPHA.PY (SET, START) y decodifica con LectorSerial
+    puerto = PuertoSimulado(simulador)
+    cola = queue.Queue()
+    sincronizador = SincronizadorReloj()
+    lector = LectorSerial(puerto, DecodificadorBinario(), cola, etapas=(sincronizador,))
+    lector.start()
+    if binario:
+        puerto.write(COMANDO_BINARIO.encode())
+    puerto.write(f"SET T={max(1.0, segundos * simulador.ritmo * simulador.dt)}\nSTART\n".encode())
+    time.sleep(segundos)
+    lector.detener()
+    lotes = []
+    while not cola.empty():
+        lotes.append(cola.get_nowait())
+    lote = combinar_lotes(lotes)
+    decodificador = lector.decodificador
+    tiempo = lote.columnas['Tiempo']
+    print(f"Recibidas {len(tiempo)} muestras en {segundos:g} s ({len(tiempo) / segundos:.0f}/s), "
+          f"{len(lote.mensajes)} mensajes, {lector.bytes_leidos} bytes")
+    print(f"Simulador: {simulador.registros} registros, {simulador.perdidos} perdidos, {simulador.corrompidos} corrompidos; "
+          f"decodificador: {decodificador.errores} errores ({decodificador.errores_crc} de CRC)")
+    if len(tiempo) > 1:
+        pasos = np.round(np.diff(tiempo) / simulador.dt / simulador.cada)
+        print(f"Huecos en Tiempo: {int((pasos > 1).sum())} (muestras faltantes {int((pasos[pasos > 1] - 1).sum())})")
+    print(f"Sincronizador: {sincronizador.perdidas} muestras perdidas en {sincronizador.huecos} huecos, "
+          f"{sincronizador.reinicios} reinicios de la secuencia, deriva {sincronizador.deriva_ppm:+.1f} ppm "
+          f"(simulada {simulador.deriva:+g} ppm)")
+    if not simulador.perdida and not simulador.corrupcion and (decodificador.errores or not len(tiempo)):
+        print("ERROR: sin pérdidas ni corrupción configuradas el decodificador no debería fallar")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dialecto', choices=DIALECTOS, default='mtm')
+    parser.add_argument('--dt', type=float, default=0.01, help='Paso de control simulado en segundos')
+    parser.add_argument('--ritmo', type=float, default=None, help='Pasos de control por segundo real (por defecto 1/dt)')
+    parser.add_argument('--cada', type=int, default=1, help='Envía telemetría de texto cada N pasos')
+    parser.add_argument('--ruido', type=float, default=0.0, help='Desvío del ruido del torque')
+    parser.add_argument('--perdida', type=float, default=0.0, help='Probabilidad de perder cada línea o trama')
+    parser.add_argument('--corrupcion', type=float, default=0.0, help='Probabilidad de invertir un bit en cada línea o trama')
+    parser.add_argument('--carga', type=float, default=2.5, help='Torque máximo de la curva de tracción')
+    parser.add_argument('--servicio', type=float, default=0.0, help='ms que tarda el equipo en responder cada comando')
+    parser.add_argument('--deriva', type=float, default=0.0, help='ppm que adelanta el reloj del equipo (millis)')
+    parser.add_argument('--cero', type=float, default=0.0, help='Desvío del cero de la celda de carga')
+    parser.add_argument('--deriva-cero', type=float, default=0.0, help='Deriva del cero de la celda por hora')
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--prueba', type=float, default=None, metavar='SEGUNDOS', help='Autoverificación en el mismo proceso')
+    parser.add_argument('--binario', action='store_true', help='En la autoverificación, pedir SET MODO=BIN')
+    args = parser.parse_args()
+
+    simulador = SimuladorMTM(args.dialecto, dt=args.dt, ritmo=args.ritmo, cada=args.cada, ruido=args.ruido,
+                             perdida=args.perdida, corrupcion=args.corrupcion, carga=args.carga,
+                             servicio=args.servicio / 1000, deriva=args.deriva, cero=args.cero,
+                             deriva_cero=args.deriva_cero, semilla=args.semilla)
+    if args.prueba:
+        if args.dialecto != 'mtm':
+            parser.error("--prueba verifica el dialecto mtm")
+        autoverificar(simulador, args.prueba, args.binario)
+        return
+
+    equipo = EquipoPTY(simulador)
+    equipo.start()
+    print(f"Equipo simulado ({args.dialecto}, {simulador.ritmo:g} pasos/s) en {equipo.nombre}. Ctrl+C para terminar.")
+    try:
+        while equipo.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    equipo.detener()
+    print(f"{simulador.registros} registros enviados, {simulador.perdidos} perdidos, {simulador.corrompidos} corrompidos")
+
+
+if __name__ == '__main__':
+    main()